@@ -1,5 +1,11 @@
-from typing import Dict, Any
-from django.db import transaction  # type: ignore
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+from django.db import models, transaction  # type: ignore
+from apps.common.export import Column
+from apps.defects.models import DefectsRecord
+from apps.devices.models import Alarm
+from apps.harvest.models import HarvestRecord
 from apps.users.models import User
 from apps.users import services as user_services
 
@@ -12,3 +18,62 @@ def update_admin_user(user_id: str, data: Dict[str, Any]) -> User:
         user.is_active = data["is_active"]
     user.save(update_fields=["role", "is_active", "updated_at"])
     return user
+
+@dataclass(frozen=True)
+class ExportDataset:
+    model: Any
+    # (field for values_list, column spec)
+    fields: Sequence[str]
+    columns: Sequence[Column]
+    has_category: bool = False
+
+EXPORT_DATASETS: Dict[str, ExportDataset] = {
+    "harvest": ExportDataset(
+        model=HarvestRecord,
+        fields=["id", "device_id", "category_id", "category_name", "count", "occurred_at", "event_id", "created_at"],
+        columns=[("id", "string"), ("device_id", "string"), ("category_id", "string"), ("category_name", "string"),
+                 ("count", "int"), ("occurred_at", "datetime"), ("event_id", "string"), ("created_at", "datetime")],
+        has_category=True,
+    ),
+    "defects": ExportDataset(
+        model=DefectsRecord,
+        fields=["id", "device_id", "count", "occurred_at", "event_id", "created_at"],
+        columns=[("id", "string"), ("device_id", "string"), ("count", "int"), ("occurred_at", "datetime"),
+                 ("event_id", "string"), ("created_at", "datetime")],
+    ),
+    "alarms": ExportDataset(
+        model=Alarm,
+        fields=["alarm_id", "device_id", "type", "severity", "status", "message", "occurred_at", "event_id", "created_at"],
+        columns=[("alarm_id", "string"), ("device_id", "string"), ("type", "string"), ("severity", "string"),
+                 ("status", "string"), ("message", "string"), ("occurred_at", "datetime"), ("event_id", "string"),
+                 ("created_at", "datetime")],
+    ),
+}
+
+def export_batches(
+    dataset: ExportDataset,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    category_id: Optional[str] = None,
+    device_id: Optional[str] = None,
+    chunk_size: int = 5000,
+) -> Iterator[List[tuple]]:
+    """Rows in occurred_at order, `chunk_size` at a time, read through a server-side cursor."""
+    qs: models.QuerySet = dataset.model.objects.all()
+    if start is not None:
+        qs = qs.filter(occurred_at__gte=start)
+    if end is not None:
+        qs = qs.filter(occurred_at__lt=end)
+    if category_id is not None:
+        qs = qs.filter(category_id=category_id)
+    if device_id is not None:
+        qs = qs.filter(device_id=device_id)
+    rows = qs.order_by("occurred_at", "pk").values_list(*dataset.fields).iterator(chunk_size=chunk_size)
+    batch: List[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,6 +1,7 @@
 from django.urls import path  # type: ignore
-from .views import AdminUsersUpdateView
+from .views import AdminUsersUpdateView, AdminExportView
 
 urlpatterns = [
     path("admin/users/<uuid:userId>", AdminUsersUpdateView.as_view(), name="admin-users-update"),
+    path("admin/export/<str:dataset>", AdminExportView.as_view(), name="admin-export"),
 ]
@@ -1,9 +1,15 @@
+from django.conf import settings  # type: ignore
+from django.utils import timezone  # type: ignore
 from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
+from rest_framework.exceptions import NotFound, ValidationError  # type: ignore
 
+from apps.common import export
+from apps.common.params import parse_choice_param, parse_datetime_range
 from apps.common.permissions import RoleAdminOnly
 from apps.common.responses import success_envelope
+from apps.common.streaming import streaming_response
 from apps.users.serializers import UserSerializer
 from .serializers import UpdateAdminUsersRequestSerializer
 from . import services
@@ -17,3 +23,40 @@ class AdminUsersUpdateView(APIView):
         ser.is_valid(raise_exception=True)
         user = services.update_admin_user(str(userId), ser.validated_data)
         return Response(success_envelope(request, UserSerializer(user).data), status=status.HTTP_200_OK)
+
+class AdminExportView(APIView):
+    """GET /admin/export/{dataset} (管理者≧, OpenAPI未記載)
+
+    dataset: harvest | defects | alarms。生レコードを occurred_at 順にストリーミングで返す。
+    output: csv（既定）| parquet | arrow（pyarrow がある場合のみ）。`format` は DRF が予約しているため `output`。
+    フィルタ: from / to（日付または ISO 8601 日時）, device_id, category_id（harvest のみ）
+    """
+    permission_classes = [RoleAdminOnly]
+
+    def perform_content_negotiation(self, request, force=False):
+        # the body is CSV / Parquet / Arrow, so Accept: text/csv must not turn into 406
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset: str):
+        spec = services.EXPORT_DATASETS.get(dataset)
+        if spec is None:
+            raise NotFound()
+        params = request.query_params
+        fmt = parse_choice_param(params, "output", export.available_formats()) or export.FORMAT_CSV
+        start, end = parse_datetime_range(params)
+        category_id = params.get("category_id") or None
+        if category_id is not None and not spec.has_category:
+            raise ValidationError({"category_id": [f"not supported for {dataset}"]})
+        batches = services.export_batches(
+            spec,
+            start=start,
+            end=end,
+            category_id=category_id,
+            device_id=params.get("device_id") or None,
+            chunk_size=settings.EXPORT_CHUNK_SIZE,
+        )
+        resp = streaming_response(request, export.encode(fmt, spec.columns, batches), export.CONTENT_TYPES[fmt])
+        stamp = timezone.localtime().strftime("%Y%m%d%H%M%S")
+        resp["Content-Disposition"] = f'attachment; filename="{dataset}-{stamp}.{export.EXTENSIONS[fmt]}"'
+        resp["Cache-Control"] = "no-store"
+        return resp
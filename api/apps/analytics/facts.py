@@ -0,0 +1,74 @@
+"""Per-day, per-category harvest facts shared by the analytics and ratio endpoints.
+
+One grouped query over the daily rollups produces `DailyFacts`; the revenue
+endpoints fold it into their own periods instead of scanning `HarvestRecord`
+separately. The facts and the price index are shared across requests through
+`apps.common.cache.cached_value`, so harvest and price writes invalidate them.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Sum  # type: ignore
+
+from apps.common.cache import HARVEST, PRICES, cached_value
+from apps.common.periods import period_of_date
+from apps.harvest.models import HarvestRollup
+
+from .pricing import PriceIndex
+
+FACTS_KEY = "analytics.daily_facts"
+PRICE_INDEX_KEY = "analytics.price_index"
+
+class DailyFacts:
+    """Harvest counts per local day: `by_category[cid] = ([day ordinals], [counts])` sorted by day."""
+
+    def __init__(self, rows):
+        grouped: Dict[str, Dict[int, int]] = defaultdict(dict)
+        for cid, day, total in rows:
+            ordinal = date.fromisoformat(day).toordinal()
+            per_day = grouped[cid or ""]
+            per_day[ordinal] = per_day.get(ordinal, 0) + int(total)
+        self.by_category: Dict[str, Tuple[List[int], List[int]]] = {}
+        for cid, per_day in grouped.items():
+            days = sorted(per_day)
+            self.by_category[cid] = (days, [per_day[d] for d in days])
+
+    @classmethod
+    def load(cls, day_from: Optional[date] = None, day_to: Optional[date] = None) -> "DailyFacts":
+        qs = HarvestRollup.objects.filter(period_type=HarvestRollup.PERIOD_DAILY)
+        # daily periods are ISO dates, so the inclusive range compares as text
+        if day_from is not None:
+            qs = qs.filter(period__gte=day_from.isoformat())
+        if day_to is not None:
+            qs = qs.filter(period__lte=day_to.isoformat())
+        rows = (
+            qs.values_list("category_id", "period")
+            .annotate(total=Sum("total_count"))
+            .order_by()
+        )
+        return cls(rows.iterator())
+
+    def revenue(self, period_type: str, index: PriceIndex) -> Dict[str, int]:
+        """Revenue per period: each (day, category) is priced once with the price in effect that day."""
+        bucket: Dict[str, int] = defaultdict(int)
+        labels: Dict[int, str] = {}
+        for cid, (days, counts) in self.by_category.items():
+            prices = index.get(cid) if cid else None
+            if prices is None:
+                continue
+            for ordinal, count, unit in zip(days, counts, prices.prices_at(days)):
+                if unit is None:
+                    continue
+                label = labels.get(ordinal)
+                if label is None:
+                    label = labels[ordinal] = period_of_date(period_type, date.fromordinal(ordinal))
+                bucket[label] += count * unit
+        return dict(bucket)
+
+def daily_facts(day_from: Optional[date] = None, day_to: Optional[date] = None) -> DailyFacts:
+    return cached_value((HARVEST,), f"{FACTS_KEY}:{day_from}:{day_to}", lambda: DailyFacts.load(day_from, day_to))
+
+def price_index() -> PriceIndex:
+    return cached_value((PRICES,), PRICE_INDEX_KEY, PriceIndex.load)
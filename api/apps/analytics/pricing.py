@@ -0,0 +1,112 @@
+"""Price-interval index used by the revenue endpoints.
+
+A category's price history may overlap (an open-ended price followed by a
+bounded one, a gap, ...). The legacy rule for a day `d` is: among the prices
+with `effective_from <= d <= effective_to` (or no `effective_to`), take the one
+with the latest `effective_from`. `PriceIndex` resolves each category's history
+into non-overlapping segments once, so a lookup is a bisect (or a single
+`numpy.searchsorted` for a batch of days) instead of a scan of the history.
+"""
+from __future__ import annotations
+import heapq
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from apps.prices.models import PriceRecord
+
+# (effective_from, effective_to or None, unit_price_yen)
+PriceRow = Tuple[date, Optional[date], int]
+
+_OPEN_END = date.max.toordinal()
+
+class CategoryPrices:
+    """Resolved segments for one category: starts[i]..ends[i] (ordinals, inclusive) -> prices[i]."""
+
+    __slots__ = ("starts", "ends", "prices")
+
+    def __init__(self, rows: Sequence[PriceRow]):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.prices: List[int] = []
+        rows = sorted(rows, key=lambda r: r[0])
+        bounds = set()
+        for start, end, _ in rows:
+            bounds.add(start.toordinal())
+            if end is not None and end.toordinal() < _OPEN_END:
+                bounds.add(end.toordinal() + 1)
+        bounds_sorted = sorted(bounds)
+        # max-heap on effective_from of the prices that have started; expired ones are dropped lazily
+        active: List[Tuple[int, int, int]] = []
+        i = 0
+        for k, seg_start in enumerate(bounds_sorted):
+            while i < len(rows) and rows[i][0].toordinal() <= seg_start:
+                start, end, unit = rows[i]
+                heapq.heappush(active, (-start.toordinal(), end.toordinal() if end else _OPEN_END, unit))
+                i += 1
+            while active and active[0][1] < seg_start:
+                heapq.heappop(active)
+            if not active:
+                continue
+            seg_end = bounds_sorted[k + 1] - 1 if k + 1 < len(bounds_sorted) else _OPEN_END
+            unit = active[0][2]
+            if self.prices and self.prices[-1] == unit and self.ends[-1] + 1 == seg_start:
+                self.ends[-1] = seg_end
+            else:
+                self.starts.append(seg_start)
+                self.ends.append(seg_end)
+                self.prices.append(unit)
+
+    def price_at(self, d: date) -> Optional[int]:
+        ordinal = d.toordinal()
+        i = bisect_right(self.starts, ordinal) - 1
+        if i < 0 or ordinal > self.ends[i]:
+            return None
+        return self.prices[i]
+
+    def prices_at(self, ordinals: Sequence[int]) -> List[Optional[int]]:
+        """Vectorised `price_at` over day ordinals (uses numpy when installed)."""
+        if np is None or not self.starts:
+            out: List[Optional[int]] = []
+            for o in ordinals:
+                i = bisect_right(self.starts, o) - 1
+                out.append(self.prices[i] if i >= 0 and o <= self.ends[i] else None)
+            return out
+        days = np.asarray(ordinals, dtype=np.int64)
+        idx = np.searchsorted(np.asarray(self.starts, dtype=np.int64), days, side="right") - 1
+        safe = np.clip(idx, 0, None)
+        hit = (idx >= 0) & (days <= np.asarray(self.ends, dtype=np.int64)[safe])
+        prices = np.asarray(self.prices, dtype=np.int64)[safe]
+        return [int(p) if h else None for p, h in zip(prices.tolist(), hit.tolist())]
+
+class PriceIndex:
+    def __init__(self, rows_by_category: Dict[str, Sequence[PriceRow]]):
+        self._categories = {cid: CategoryPrices(rows) for cid, rows in rows_by_category.items()}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, date, Optional[date], int]]) -> "PriceIndex":
+        grouped: Dict[str, List[PriceRow]] = defaultdict(list)
+        for cid, start, end, unit in rows:
+            grouped[cid].append((start, end, unit))
+        return cls(grouped)
+
+    @classmethod
+    def load(cls) -> "PriceIndex":
+        return cls.from_rows(
+            PriceRecord.objects.values_list("category_id", "effective_from", "effective_to", "unit_price_yen")
+            .order_by()
+            .iterator()
+        )
+
+    def get(self, category_id: str) -> Optional[CategoryPrices]:
+        return self._categories.get(category_id)
+
+    def price_at(self, category_id: str, d: date) -> Optional[int]:
+        prices = self._categories.get(category_id)
+        return prices.price_at(d) if prices else None
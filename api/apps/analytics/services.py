@@ -1,84 +1,45 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple
-from collections import defaultdict
-from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional
 
-from apps.harvest.models import HarvestRecord
-from apps.prices.models import PriceRecord
+from django.db.models import Sum  # type: ignore
 
-def _period_monthly(dt: datetime) -> str:
-    return f"{dt.year:04d}-{dt.month:02d}"
+from apps.common.periods import PERIOD_MONTHLY, PERIOD_YEARLY, period_dates
+from apps.harvest.models import HarvestRollup
 
-def _period_yearly(dt: datetime) -> str:
-    return f"{dt.year:04d}"
+from .facts import daily_facts, price_index
 
-def _price_lookup_table() -> Dict[str, List[PriceRecord]]:
-    table: Dict[str, List[PriceRecord]] = defaultdict(list)
-    for p in PriceRecord.objects.all().order_by("category_id", "effective_from"):
-        table[p.category_id].append(p)
-    return table
-
-def _find_price(prices: List[PriceRecord], d: date) -> int | None:
-    # choose the latest effective_from <= d and effective_to >= d if set
-    best = None
-    for p in prices:
-        if p.effective_from <= d and (p.effective_to is None or p.effective_to >= d):
-            best = p
-    return best.unit_price_yen if best else None
-
-def list_revenue_monthly() -> List[Dict[str, Any]]:
-    price_table = _price_lookup_table()
-    bucket = defaultdict(int)
-    for r in HarvestRecord.objects.all().iterator():
-        cid = r.category_id
-        if not cid:
-            continue
-        prices = price_table.get(cid)
-        if not prices:
-            continue
-        unit = _find_price(prices, r.occurred_at.date())
-        if unit is None:
-            continue
-        p = _period_monthly(r.occurred_at)
-        bucket[p] += int(r.count) * int(unit)
+def _revenue_items(period_type: str, period_from: Optional[str], period_to: Optional[str]) -> List[Dict[str, Any]]:
+    # the period range narrows the daily rollups that are loaded, not just the output
+    day_from = period_dates(period_type, period_from)[0] if period_from else None
+    day_to = period_dates(period_type, period_to)[1] if period_to else None
+    bucket = daily_facts(day_from, day_to).revenue(period_type, price_index())
     items = [{"period": p, "revenue_yen": v} for p, v in bucket.items()]
     items.sort(key=lambda x: x["period"], reverse=True)
     return items
 
-def list_revenue_yearly() -> List[Dict[str, Any]]:
-    price_table = _price_lookup_table()
-    bucket = defaultdict(int)
-    for r in HarvestRecord.objects.all().iterator():
-        cid = r.category_id
-        if not cid:
-            continue
-        prices = price_table.get(cid)
-        if not prices:
-            continue
-        unit = _find_price(prices, r.occurred_at.date())
-        if unit is None:
-            continue
-        p = _period_yearly(r.occurred_at)
-        bucket[p] += int(r.count) * int(unit)
-    items = [{"period": p, "revenue_yen": v} for p, v in bucket.items()]
-    items.sort(key=lambda x: x["period"], reverse=True)
-    return items
+def list_revenue_monthly(period_from: Optional[str] = None, period_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _revenue_items(PERIOD_MONTHLY, period_from, period_to)
+
+def list_revenue_yearly(period_from: Optional[str] = None, period_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _revenue_items(PERIOD_YEARLY, period_from, period_to)
 
 def list_harvest_monthly_forecast(months_ahead: int = 1) -> List[Dict[str, Any]]:
     """Naive forecast: next month predicted = last month actual.
 
     OpenAPIにはアルゴリズム要件が無いため、暫定のベースライン実装。
     """
-    bucket = defaultdict(int)
-    for r in HarvestRecord.objects.all().iterator():
-        p = _period_monthly(r.occurred_at)
-        bucket[p] += int(r.count)
-
-    # Determine last month with data
-    if not bucket:
+    # last month with data, summed over categories from the monthly rollup
+    last = (
+        HarvestRollup.objects.filter(period_type=HarvestRollup.PERIOD_MONTHLY)
+        .values("period")
+        .annotate(total=Sum("total_count"))
+        .order_by("-period")
+        .first()
+    )
+    if last is None:
         return []
-    last_period = sorted(bucket.keys())[-1]
-    last_val = bucket[last_period]
+    last_period = last["period"]
+    last_val = int(last["total"])
 
     # Compute next period string
     y, m = map(int, last_period.split("-"))
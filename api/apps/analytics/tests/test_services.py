@@ -1,5 +1,5 @@
 import pytest
-from datetime import date
+from datetime import date, datetime
 from django.utils import timezone
 from apps.harvest import services as harvest_services
 from apps.prices import services as price_services
@@ -22,3 +22,65 @@ def test_revenue_monthly_basic():
     })
     items = analytics_services.list_revenue_monthly()
     assert items[0]["revenue_yen"] == 1000
+
+def _legacy_price(rows, d):
+    best = None
+    for start, end, unit in sorted(rows, key=lambda r: r[0]):
+        if start <= d and (end is None or end >= d):
+            best = unit
+    return best
+
+def test_price_index_matches_linear_scan():
+    import random
+    from datetime import timedelta
+    from apps.analytics.pricing import CategoryPrices
+
+    rnd = random.Random(7)
+    base = date(2024, 1, 1)
+    for _ in range(50):
+        starts = rnd.sample(range(0, 200), rnd.randrange(1, 12))
+        rows = []
+        for s in starts:
+            end = None if rnd.random() < 0.3 else base + timedelta(days=s + rnd.randrange(0, 60))
+            rows.append((base + timedelta(days=s), end, rnd.randrange(1, 500)))
+        prices = CategoryPrices(rows)
+        days = [base + timedelta(days=n) for n in range(-5, 280)]
+        assert [prices.price_at(d) for d in days] == [_legacy_price(rows, d) for d in days]
+        assert prices.prices_at([d.toordinal() for d in days]) == [_legacy_price(rows, d) for d in days]
+
+def test_revenue_uses_price_in_effect_per_day():
+    tz = timezone.get_current_timezone()
+    price_services.create_price("C1", {"unit_price_yen": 100, "effective_from": date(2025, 1, 1)})
+    price_services.create_price("C1", {"unit_price_yen": 150, "effective_from": date(2025, 2, 10),
+                                       "effective_to": date(2025, 2, 20)})
+    for day, count in [(5, 1), (15, 2), (25, 4)]:
+        harvest_services.add_record({"device_id": "DEV001", "category_id": "C1", "count": count,
+                                     "occurred_at": datetime(2025, 2, day, 12, 0, tzinfo=tz)})
+    harvest_services.add_record({"device_id": "DEV001", "category_id": "C9", "count": 10,
+                                 "occurred_at": datetime(2025, 2, 1, 12, 0, tzinfo=tz)})
+    assert analytics_services.list_revenue_monthly() == [{"period": "2025-02", "revenue_yen": 100 + 300 + 400}]
+    assert analytics_services.list_revenue_yearly() == [{"period": "2025", "revenue_yen": 800}]
+
+def test_daily_facts_are_shared_across_requests_and_invalidated_on_write():
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    tz = timezone.get_current_timezone()
+    price_services.create_price("C1", {"unit_price_yen": 10, "effective_from": date(2025, 1, 1)})
+    harvest_services.add_record({"device_id": "DEV001", "category_id": "C1", "count": 5,
+                                 "occurred_at": datetime(2025, 3, 3, 12, 0, tzinfo=tz)})
+    assert analytics_services.list_revenue_monthly() == [{"period": "2025-03", "revenue_yen": 50}]
+    with CaptureQueriesContext(connection) as ctx:
+        # another request: the facts and the price index come from the versioned cache
+        assert analytics_services.list_revenue_yearly() == [{"period": "2025", "revenue_yen": 50}]
+    assert len(ctx.captured_queries) == 0
+    with CaptureQueriesContext(connection) as ctx:
+        assert analytics_services.list_harvest_monthly_forecast() == [{"period": "2025-04", "predicted_count": 5}]
+    # one grouped query over the monthly rollup
+    assert len(ctx.captured_queries) == 1 and "harvest_rollups" in ctx.captured_queries[0]["sql"]
+
+    harvest_services.add_record({"device_id": "DEV001", "category_id": "C1", "count": 1,
+                                 "occurred_at": datetime(2025, 3, 4, 12, 0, tzinfo=tz)})
+    assert analytics_services.list_revenue_monthly() == [{"period": "2025-03", "revenue_yen": 60}]
+    price_services.update_price("C1", {"unit_price_yen": 20})
+    assert analytics_services.list_revenue_monthly() == [{"period": "2025-03", "revenue_yen": 120}]
@@ -1,30 +1,38 @@
-from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
+from asgiref.sync import sync_to_async  # type: ignore
 
+from apps.common.asyncviews import AsyncAPIView
+from apps.common.cache import HARVEST, PRICES, cache_response
 from apps.common.responses import success_envelope
-from apps.common.pagination import parse_page_params, paginate_list
+from apps.common.pagination import parse_page_params, paginate_iter
+from apps.common.params import parse_period_range
 from apps.common.permissions import RoleAdminOnly
 
 from . import services
 
-class AnalyticsHarvestMonthlyView(APIView):
+class AnalyticsHarvestMonthlyView(AsyncAPIView):
     permission_classes = [RoleAdminOnly]
-    def get(self, request):
+    @cache_response(HARVEST)
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_harvest_monthly_forecast()
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        items = await sync_to_async(services.list_harvest_monthly_forecast)()
+        return Response(success_envelope(request, paginate_iter(items, page, page_size)), status=status.HTTP_200_OK)
 
-class AnalyticsRevenueMonthlyView(APIView):
+class AnalyticsRevenueMonthlyView(AsyncAPIView):
     permission_classes = [RoleAdminOnly]
-    def get(self, request):
+    @cache_response(HARVEST, PRICES, period_type="monthly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_revenue_monthly()
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        period_from, period_to = parse_period_range(request.query_params, "monthly")
+        items = await sync_to_async(services.list_revenue_monthly)(period_from, period_to)
+        return Response(success_envelope(request, paginate_iter(items, page, page_size)), status=status.HTTP_200_OK)
 
-class AnalyticsRevenueYealyView(APIView):
+class AnalyticsRevenueYealyView(AsyncAPIView):
     permission_classes = [RoleAdminOnly]
-    def get(self, request):
+    @cache_response(HARVEST, PRICES, period_type="yearly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_revenue_yearly()
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        period_from, period_to = parse_period_range(request.query_params, "yearly")
+        items = await sync_to_async(services.list_revenue_yearly)(period_from, period_to)
+        return Response(success_envelope(request, paginate_iter(items, page, page_size)), status=status.HTTP_200_OK)
@@ -0,0 +1,51 @@
+"""APIView with an async dispatch for read endpoints served over ASGI.
+
+DRF 3.15 dispatches synchronously, so under ASGI an APIView holds a worker
+thread for the whole request. `AsyncAPIView` keeps DRF's request handling
+(authentication, permissions, content negotiation, exception handler,
+renderers) but awaits `async def` handlers on the event loop; the sync parts
+(API key lookup, exception handling) and any sync handlers run through
+`sync_to_async` (thread-sensitive, as Django's ORM requires), so a view may
+mix an async GET with a sync PATCH/POST.
+
+That sync work shares the ASGI worker with the async reads, so in deployment
+only GET/HEAD reach the ASGI pool; writes are proxied to the WSGI pool
+(gunicorn.conf.py). Under WSGI (and the test client) Django runs the view
+with `async_to_sync`, so the same class serves both deployments.
+"""
+from __future__ import annotations
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async  # type: ignore
+from rest_framework.views import APIView  # type: ignore
+
+class AsyncAPIView(APIView):
+    # a plain attribute (not Django's all-sync-or-all-async check): sync handlers are allowed
+    view_is_async = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # csrf_exempt() wraps the view in a plain function; mark it so Django awaits it
+        return markcoroutinefunction(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
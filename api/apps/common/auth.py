@@ -1,4 +1,5 @@
 from __future__ import annotations
+import hmac
 from dataclasses import dataclass
 from typing import Optional, Tuple
 from django.conf import settings  # type: ignore
@@ -9,11 +10,21 @@ from rest_framework.request import Request  # type: ignore
 class ApiKeyUser:
     """Lightweight authenticated principal used for API-key based auth."""
     role: str  # admin | user | device
+    # set for per-device keys: the principal may only write for this device
+    device_id: Optional[str] = None
 
     @property
     def is_authenticated(self) -> bool:
         return True
 
+# principals are immutable, so one instance per static role is shared by all requests
+ADMIN = ApiKeyUser(role="admin")
+USER = ApiKeyUser(role="user")
+DEVICE = ApiKeyUser(role="device")
+
+def _same(key: bytes, configured: str) -> bool:
+    return bool(configured) and hmac.compare_digest(key, configured.encode())
+
 class ApiKeyAuthentication(BaseAuthentication):
     """Authenticate with a simple API key.
 
@@ -24,7 +35,10 @@ class ApiKeyAuthentication(BaseAuthentication):
     Keys are configured by environment variables:
     - ADMIN_API_KEY
     - USER_API_KEY
-    - DEVICE_API_KEY
+    - DEVICE_API_KEY (shared by all devices; legacy)
+    or issued per device (`dk_...`, see apps.devices.keys).
+
+    Static keys are compared in constant time.
 
     NOTE: This auth scheme is not defined in openapi.yaml yet.
     It is introduced to enforce CSV role constraints (一般≧/管理者≧).
@@ -40,11 +54,16 @@ class ApiKeyAuthentication(BaseAuthentication):
         if not key:
             return None
 
-        if settings.ADMIN_API_KEY and key == settings.ADMIN_API_KEY:
-            return ApiKeyUser(role="admin"), key
-        if settings.USER_API_KEY and key == settings.USER_API_KEY:
-            return ApiKeyUser(role="user"), key
-        if settings.DEVICE_API_KEY and key == settings.DEVICE_API_KEY:
-            return ApiKeyUser(role="device"), key
+        raw = key.encode()
+        if _same(raw, settings.ADMIN_API_KEY):
+            return ADMIN, key
+        if _same(raw, settings.USER_API_KEY):
+            return USER, key
+        if _same(raw, settings.DEVICE_API_KEY):
+            return DEVICE, key
 
+        from apps.devices.keys import resolve  # devices models need the app registry
+        principal = resolve(key)
+        if principal is not None:
+            return principal, key
         return None
@@ -0,0 +1,154 @@
+"""Versioned response cache for aggregate GET endpoints.
+
+Every data domain (harvest, defects, prices, ...) has a version token in the
+Django cache. Service functions that write call `bump(domain)`; cached payloads
+are keyed by path, query string, negotiated format and the versions of the
+domains the endpoint reads, so a write makes old entries unreachable (they
+age out via TTL / MAX_ENTRIES) instead of being deleted one by one.
+
+The ETag is derived from the same key, so a matching If-None-Match is answered
+with 304 from cache metadata alone, without touching the database.
+
+`cached_value` applies the same scheme to derived data that several endpoints
+share (e.g. the analytics daily facts), so it is computed once per data
+version across requests and workers rather than once per request.
+"""
+from __future__ import annotations
+import functools
+import hashlib
+import inspect
+import uuid
+from typing import Callable, Dict, Optional, Sequence, TypeVar
+
+from django.conf import settings  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.db import transaction  # type: ignore
+from rest_framework.response import Response  # type: ignore
+
+from apps.common.conditional import etag_matches, not_modified, weak_etag
+from apps.common.params import parse_period_range
+from apps.common.responses import success_envelope
+
+HARVEST = "harvest"
+DEFECTS = "defects"
+PRICES = "prices"
+DEVICES = "devices"
+# per-device API keys (apps/devices/keys.py); no response depends on it
+DEVICE_KEYS = "device_keys"
+
+_VERSION_PREFIX = "dv:"
+_RESPONSE_PREFIX = "resp:"
+_VALUE_PREFIX = "val:"
+
+T = TypeVar("T")
+
+def data_versions(domains: Sequence[str]) -> Dict[str, str]:
+    keys = [_VERSION_PREFIX + d for d in domains]
+    found = cache.get_many(keys)
+    versions = {}
+    for domain, key in zip(domains, keys):
+        v = found.get(key)
+        if v is None:
+            # unknown (first use, restart, eviction): any fresh token invalidates older entries
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            v = cache.get(key)
+        versions[domain] = v
+    return versions
+
+async def adata_versions(domains: Sequence[str]) -> Dict[str, str]:
+    """`data_versions` through the cache's async API."""
+    keys = [_VERSION_PREFIX + d for d in domains]
+    found = await cache.aget_many(keys)
+    versions = {}
+    for domain, key in zip(domains, keys):
+        v = found.get(key)
+        if v is None:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+            v = await cache.aget(key)
+        versions[domain] = v
+    return versions
+
+def _rotate(domains: Sequence[str]) -> None:
+    cache.set_many({_VERSION_PREFIX + d: uuid.uuid4().hex for d in domains}, timeout=None)
+
+def bump(*domains: str) -> None:
+    """Mark domains as changed.
+
+    Rotates the versions immediately and again after commit: a reader that
+    cached pre-commit data under the intermediate version is superseded once
+    the transaction is visible.
+    """
+    _rotate(domains)
+    transaction.on_commit(lambda: _rotate(domains))
+
+def cached_value(domains: Sequence[str], name: str, fn: Callable[[], T]) -> T:
+    """`fn()` cached under `name` and the current versions of `domains` (must not return None)."""
+    raw = "\x1f".join([name, *(f"{d}={v}" for d, v in sorted(data_versions(domains).items()))])
+    key = _VALUE_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+    value = cache.get(key)
+    if value is None:
+        value = fn()
+        cache.set(key, value, timeout=settings.RESPONSE_CACHE_TTL)
+    return value
+
+def _cache_key(request, versions: Dict[str, str], period_type: Optional[str] = None) -> str:
+    renderer = getattr(request, "accepted_renderer", None)
+    parts = [
+        request.path,
+        request.META.get("QUERY_STRING", ""),
+        getattr(renderer, "format", "") or "",
+        *(f"{d}={v}" for d, v in sorted(versions.items())),
+    ]
+    if period_type is not None:
+        # `last=N` without `to` is relative to the current period: key on the resolved range
+        parts.append("..".join(p or "" for p in parse_period_range(request.query_params, period_type)))
+    return _RESPONSE_PREFIX + hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+
+def _cached(request, data, etag: str):
+    resp = data if isinstance(data, Response) else Response(success_envelope(request, data))
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "private, no-cache"
+    return resp
+
+def cache_response(*domains: str, period_type: Optional[str] = None) -> Callable:
+    """Decorate an APIView GET handler whose payload depends only on `domains` and the URL.
+
+    Caches the envelope `data` of 200 responses for RESPONSE_CACHE_TTL seconds.
+    Handlers that filter with `parse_period_range` pass their `period_type`, so
+    the key (and ETag) follows the resolved range of a relative `last=N`.
+    `async def` handlers get an async wrapper that uses the cache's async API.
+    """
+    def decorator(handler):
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(view, request, *args, **kwargs):
+                key = _cache_key(request, await adata_versions(domains), period_type)
+                etag = weak_etag(key)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+                data = await cache.aget(key)
+                if data is not None:
+                    return _cached(request, data, etag)
+                resp = await handler(view, request, *args, **kwargs)
+                if resp.status_code != 200:
+                    return resp
+                await cache.aset(key, resp.data["data"], timeout=settings.RESPONSE_CACHE_TTL)
+                return _cached(request, resp, etag)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = _cache_key(request, data_versions(domains), period_type)
+            etag = weak_etag(key)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            data = cache.get(key)
+            if data is not None:
+                return _cached(request, data, etag)
+            resp = handler(view, request, *args, **kwargs)
+            if resp.status_code != 200:
+                return resp
+            cache.set(key, resp.data["data"], timeout=settings.RESPONSE_CACHE_TTL)
+            return _cached(request, resp, etag)
+        return wrapper
+    return decorator
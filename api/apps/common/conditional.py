@@ -0,0 +1,108 @@
+"""ETag / If-None-Match / If-Modified-Since helpers for conditional GETs.
+
+Envelopes carry a per-request `request_id`, so bodies are never byte-identical
+and ETags are weak (W/"...") validators of the `data` payload.
+"""
+from __future__ import annotations
+import functools
+import hashlib
+import inspect
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from django.utils.http import http_date, parse_http_date_safe  # type: ignore
+from rest_framework import status  # type: ignore
+from rest_framework.response import Response  # type: ignore
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(request, etag: str) -> bool:
+    """Weak comparison against If-None-Match (RFC 9110 13.1.2)."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in header.split(","))
+
+def not_modified_since(request, last_modified: Optional[datetime]) -> bool:
+    """If-Modified-Since check; ignored when If-None-Match is present (RFC 9110 13.1.3)."""
+    if last_modified is None or request.headers.get("If-None-Match"):
+        return False
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return since is not None and int(last_modified.timestamp()) <= since
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    resp = Response(status=status.HTTP_304_NOT_MODIFIED)
+    resp["ETag"] = etag
+    if last_modified is not None:
+        resp["Last-Modified"] = http_date(last_modified.timestamp())
+    return resp
+
+# (values identifying the current state, last modification time or None)
+Validator = Tuple[Sequence[Any], Optional[datetime]]
+
+def _validator_etag(request, parts: Sequence[Any]) -> str:
+    renderer = getattr(request, "accepted_renderer", None)
+    return weak_etag(
+        request.path,
+        request.META.get("QUERY_STRING", ""),
+        getattr(renderer, "format", "") or "",
+        *(p.isoformat() if isinstance(p, datetime) else p for p in parts),
+    )
+
+def _stamp(resp, etag: str, last_modified: Optional[datetime]):
+    if resp.status_code == 200:
+        resp["ETag"] = etag
+        if last_modified is not None:
+            resp["Last-Modified"] = http_date(last_modified.timestamp())
+        resp["Cache-Control"] = "private, no-cache"
+    return resp
+
+def conditional_get(validator: Callable[..., Any]) -> Callable:
+    """Decorate an APIView GET handler with ETag / Last-Modified revalidation.
+
+    `validator(request, *args, **kwargs)` must be cheap (one aggregate query,
+    no serialization) and return None when it cannot tell, e.g. for a missing
+    resource; the handler then runs as usual. It is evaluated before the
+    handler reads the data, so a concurrent write can only make the ETag older
+    than the body (an extra 200 later), never produce a wrong 304.
+
+    `async def` handlers are supported; their validator may return an
+    awaitable of the same value (e.g. a lambda calling an async service).
+    """
+    def decorator(handler):
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(view, request, *args, **kwargs):
+                state = validator(request, *args, **kwargs)
+                if inspect.isawaitable(state):
+                    state = await state
+                if state is None:
+                    return await handler(view, request, *args, **kwargs)
+                parts, last_modified = state
+                etag = _validator_etag(request, parts)
+                if etag_matches(request, etag) or not_modified_since(request, last_modified):
+                    return not_modified(etag, last_modified)
+                return _stamp(await handler(view, request, *args, **kwargs), etag, last_modified)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            state = validator(request, *args, **kwargs)
+            if state is None:
+                return handler(view, request, *args, **kwargs)
+            parts, last_modified = state
+            etag = _validator_etag(request, parts)
+            if etag_matches(request, etag) or not_modified_since(request, last_modified):
+                return not_modified(etag, last_modified)
+            return _stamp(handler(view, request, *args, **kwargs), etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,245 @@
+"""In-process pub/sub for live updates (Server-Sent Events).
+
+Service functions call `publish(topic, device_id, data)`; the event is handed
+to the configured backend once the surrounding transaction commits, so
+subscribers never see rolled-back writes:
+
+- `local`   : dispatches straight into this process's hub (single process, tests)
+- `postgres`: `pg_notify(EVENTS_CHANNEL, json)`; every process that has
+              subscribers LISTENs on a background thread and dispatches the
+              notifications into its own hub, so writes made by gunicorn
+              workers or the MQTT worker reach the ASGI stream process.
+              NOTIFY payloads must be shorter than 8000 bytes: a larger
+              event is replaced by the `fallback` its publisher supplied
+              (e.g. a truncated alarm, a harvest `reset`), or dropped, and
+              the substitution is logged.
+
+Each subscriber owns a bounded buffer (EVENTS_CLIENT_BUFFER). When a slow
+client lets it fill up, the oldest events are dropped and counted so the
+stream can tell the client to resync, instead of growing without limit.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AbstractSet, Deque, Dict, Optional, Set
+
+from django.conf import settings  # type: ignore
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+from django.db import connection, transaction  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7999
+
+@dataclass(frozen=True)
+class Event:
+    topic: str
+    device_id: Optional[str]
+    data: Dict[str, Any]
+    # smaller stand-in for `data` when the event does not fit in a NOTIFY payload
+    fallback: Optional[Dict[str, Any]] = field(default=None, compare=False, repr=False)
+
+    def to_json(self) -> str:
+        return json.dumps({"topic": self.topic, "device_id": self.device_id, "data": self.data}, cls=DjangoJSONEncoder)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Event":
+        body = json.loads(raw)
+        return cls(topic=body["topic"], device_id=body.get("device_id"), data=body.get("data") or {})
+
+class Subscription:
+    """One client's filtered, bounded view of the hub. Consumed from its event loop."""
+
+    def __init__(
+        self,
+        hub: "Hub",
+        loop: asyncio.AbstractEventLoop,
+        topics: Optional[AbstractSet[str]],
+        device_ids: Optional[AbstractSet[str]],
+        maxsize: int,
+    ):
+        self._hub = hub
+        self._loop = loop
+        self.topics = topics
+        self.device_ids = device_ids
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._buffer: Deque[Event] = deque()
+        self._ready = asyncio.Event()
+
+    def matches(self, event: Event) -> bool:
+        if self.topics is not None and event.topic not in self.topics:
+            return False
+        return self.device_ids is None or event.device_id in self.device_ids
+
+    def offer(self, event: Event) -> None:
+        """Thread-safe: queue `event` on the subscriber's loop."""
+        try:
+            self._loop.call_soon_threadsafe(self._push, event)
+        except RuntimeError:
+            # loop already closed: the client is gone
+            self.close()
+
+    def _push(self, event: Event) -> None:
+        if len(self._buffer) >= self.maxsize:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None after `timeout` seconds without one."""
+        if not self._buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._buffer.popleft() if self._buffer else None
+
+    def take_dropped(self) -> int:
+        n, self.dropped = self.dropped, 0
+        return n
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+
+    def subscribe(
+        self,
+        topics: Optional[AbstractSet[str]] = None,
+        device_ids: Optional[AbstractSet[str]] = None,
+        maxsize: Optional[int] = None,
+    ) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        sub = Subscription(
+            self,
+            asyncio.get_running_loop(),
+            topics,
+            device_ids,
+            maxsize or settings.EVENTS_CLIENT_BUFFER,
+        )
+        with self._lock:
+            self._subscribers.add(sub)
+        get_backend().start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def dispatch(self, event: Event) -> None:
+        with self._lock:
+            targets = [s for s in self._subscribers if s.matches(event)]
+        for s in targets:
+            s.offer(event)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+hub = Hub()
+
+class LocalBackend:
+    def publish(self, event: Event) -> None:
+        hub.dispatch(event)
+
+    def start(self) -> None:
+        pass
+
+class PostgresNotifyBackend:
+    """Cross-process fan-out through PostgreSQL LISTEN/NOTIFY (payloads must stay < 8000 bytes)."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._started = False
+        self._lock = threading.Lock()
+
+    def publish(self, event: Event) -> None:
+        payload = event.to_json()
+        if len(payload.encode()) > NOTIFY_MAX_BYTES:
+            size = len(payload.encode())
+            if event.fallback is None:
+                logger.error("events: %s event of %d bytes dropped (NOTIFY limit %d)", event.topic, size, NOTIFY_MAX_BYTES)
+                return
+            payload = Event(event.topic, event.device_id, event.fallback).to_json()
+            if len(payload.encode()) > NOTIFY_MAX_BYTES:
+                logger.error("events: %s event dropped; its fallback is also over the NOTIFY limit", event.topic)
+                return
+            logger.warning("events: %s event of %d bytes exceeds the NOTIFY limit, sent its fallback", event.topic, size)
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen_forever, name="events-listen", daemon=True).start()
+
+    def _connect(self):
+        import psycopg  # type: ignore
+
+        db = settings.DATABASES["default"]
+        return psycopg.connect(
+            dbname=db.get("NAME"),
+            user=db.get("USER") or None,
+            password=db.get("PASSWORD") or None,
+            host=db.get("HOST") or None,
+            port=db.get("PORT") or None,
+            autocommit=True,
+        )
+
+    def _listen_forever(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                with self._connect() as conn:
+                    conn.execute(f'LISTEN "{self.channel}"')
+                    backoff = 1.0
+                    for note in conn.notifies():
+                        try:
+                            hub.dispatch(Event.from_json(note.payload))
+                        except (ValueError, KeyError):
+                            logger.warning("events: ignoring malformed notification")
+            except Exception:
+                logger.exception("events: LISTEN connection lost, retrying in %.0fs", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.EVENTS_BACKEND == "postgres":
+            _backend = PostgresNotifyBackend(settings.EVENTS_CHANNEL)
+        else:
+            _backend = LocalBackend()
+    return _backend
+
+def _send(event: Event) -> None:
+    try:
+        get_backend().publish(event)
+    except Exception:
+        # live updates are best effort; never fail the write that triggered them
+        logger.exception("events: publish failed (%s)", event.topic)
+
+def publish(
+    topic: str,
+    device_id: Optional[str],
+    data: Dict[str, Any],
+    fallback: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Send `data` after commit; `fallback` replaces it where it is too large to deliver (NOTIFY)."""
+    event = Event(topic=topic, device_id=device_id, data=data, fallback=fallback)
+    transaction.on_commit(lambda: _send(event))
@@ -0,0 +1,115 @@
+"""Chunked encoders for bulk exports (CSV always; Parquet / Arrow IPC with pyarrow).
+
+Each encoder takes the column spec and an iterator of row batches (lists of
+tuples, e.g. from a server-side cursor) and yields bytes as it goes, so an
+export's memory is bounded by one batch regardless of its size.
+"""
+from __future__ import annotations
+import csv
+import io
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+from django.utils import timezone  # type: ignore
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+    pq = None
+
+# (name, kind) with kind in: string | int | datetime
+Column = Tuple[str, str]
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+CONTENT_TYPES = {
+    FORMAT_CSV: "text/csv; charset=utf-8",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {FORMAT_CSV: "csv", FORMAT_PARQUET: "parquet", FORMAT_ARROW: "arrows"}
+
+def available_formats() -> List[str]:
+    return [FORMAT_CSV, FORMAT_PARQUET, FORMAT_ARROW] if pa is not None else [FORMAT_CSV]
+
+def _csv_value(v: Any) -> Any:
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return timezone.localtime(v).isoformat() if timezone.is_aware(v) else v.isoformat()
+    return v
+
+def csv_chunks(columns: Sequence[Column], batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        writer.writerows([[_csv_value(v) for v in row] for row in batch])
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+class _Sink:
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+def _arrow_schema(columns: Sequence[Column]):
+    tz = timezone.get_current_timezone_name()
+    types = {"string": pa.string(), "int": pa.int64(), "datetime": pa.timestamp("us", tz=tz)}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+def _record_batch(schema, columns: Sequence[Column], batch: Sequence[tuple]):
+    arrays = []
+    for i, (name, kind) in enumerate(columns):
+        values = [row[i] for row in batch]
+        if kind == "string":
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def arrow_chunks(columns: Sequence[Column], batches: Iterable[Sequence[tuple]], fmt: str) -> Iterator[bytes]:
+    """Parquet (one row group per batch) or Arrow IPC stream (one record batch per batch)."""
+    schema = _arrow_schema(columns)
+    sink = _Sink()
+    if fmt == FORMAT_PARQUET:
+        writer = pq.ParquetWriter(sink, schema)
+        write = lambda rb: writer.write_table(pa.Table.from_batches([rb]))  # noqa: E731
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+    for batch in batches:
+        write(_record_batch(schema, columns, batch))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield sink.drain()
+
+def encode(fmt: str, columns: Sequence[Column], batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    if fmt == FORMAT_CSV:
+        return csv_chunks(columns, batches)
+    return arrow_chunks(columns, batches, fmt)
@@ -0,0 +1,167 @@
+"""Fast-path helpers for batch ingestion endpoints.
+
+Building one DRF serializer per row dominates the cost of large batches, so
+bulk endpoints validate plain dicts with the small checkers below and report
+failures per row instead of rejecting the whole batch.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from django.conf import settings  # type: ignore
+from django.db import IntegrityError, transaction  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.utils.dateparse import parse_datetime  # type: ignore
+from rest_framework.exceptions import ValidationError  # type: ignore
+
+# models.IntegerField range (the 32-bit integer column on PostgreSQL)
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+_INT_RE = re.compile(r"-?[0-9]+")
+
+@dataclass(frozen=True)
+class InvalidRow:
+    """Placeholder for a body line that could not be decoded (NDJSON)."""
+    reason: str
+
+class RowError(Exception):
+    def __init__(self, field: str, reason: str):
+        super().__init__(reason)
+        self.field = field
+        self.reason = reason
+
+def require_str(row: Dict[str, Any], key: str, max_length: Optional[int]) -> str:
+    value = row.get(key)
+    if value is None:
+        raise RowError(key, "This field is required.")
+    value = optional_str(row, key, max_length)
+    if not value:
+        raise RowError(key, "This field may not be blank.")
+    return value
+
+def optional_str(row: Dict[str, Any], key: str, max_length: Optional[int]) -> Optional[str]:
+    value = row.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        raise RowError(key, "Not a valid string.")
+    value = str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise RowError(key, f"Ensure this field has no more than {max_length} characters.")
+    return value
+
+def require_int(row: Dict[str, Any], key: str, min_value: Optional[int] = None, max_value: int = INT_MAX) -> int:
+    value = row.get(key)
+    if value is None:
+        raise RowError(key, "This field is required.")
+    if isinstance(value, bool):
+        raise RowError(key, "A valid integer is required.")
+    if isinstance(value, str):
+        if not _INT_RE.fullmatch(value.strip()):
+            raise RowError(key, "A valid integer is required.")
+        try:
+            value = int(value)
+        except (ValueError, OverflowError):
+            # e.g. more digits than int() accepts from a string
+            raise RowError(key, "A valid integer is required.")
+    if not isinstance(value, int):
+        raise RowError(key, "A valid integer is required.")
+    lower = INT_MIN if min_value is None else min_value
+    if value < lower:
+        raise RowError(key, f"Ensure this value is greater than or equal to {lower}.")
+    if value > max_value:
+        raise RowError(key, f"Ensure this value is less than or equal to {max_value}.")
+    return value
+
+def require_bool(row: Dict[str, Any], key: str) -> bool:
+    value = row.get(key)
+    if not isinstance(value, bool):
+        raise RowError(key, "Must be a valid boolean.")
+    return value
+
+def require_choice(row: Dict[str, Any], key: str, choices: Sequence[str]) -> str:
+    value = row.get(key)
+    if value is None:
+        raise RowError(key, "This field is required.")
+    if value not in choices:
+        raise RowError(key, f'"{value}" is not a valid choice.')
+    return value
+
+def optional_datetime(row: Dict[str, Any], key: str) -> Optional[datetime]:
+    value = row.get(key)
+    if value is None:
+        return None
+    try:
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+        if parsed is not None:
+            # stored as UTC: 0001-01-01 in a positive offset does not fit
+            parsed.astimezone(dt_timezone.utc)
+    except (ValueError, OverflowError):
+        # well-formed but impossible, e.g. 2025-13-45T00:00:00
+        parsed = None
+    if parsed is None:
+        raise RowError(key, "Datetime has wrong format.")
+    return parsed
+
+def bulk_rows(data: Any) -> List[Any]:
+    """Accept a JSON array, {"records": [...]}, or the list produced by NDJSONParser."""
+    if isinstance(data, dict) and "records" in data:
+        data = data["records"]
+    if not isinstance(data, list):
+        raise ValidationError({"records": ["Expected a list of records."]})
+    max_rows = settings.INGEST_BULK_MAX_ROWS
+    if len(data) > max_rows:
+        raise ValidationError({"records": [f"Ensure this batch has no more than {max_rows} records."]})
+    return data
+
+def validate_rows(
+    rows: Sequence[Any],
+    validate_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Return ([(index, cleaned)], [{"index", "field", "reason"}])."""
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    errors: List[Dict[str, Any]] = []
+    for i, row in enumerate(rows):
+        if isinstance(row, InvalidRow):
+            errors.append({"index": i, "field": "non_field", "reason": row.reason})
+            continue
+        if not isinstance(row, dict):
+            errors.append({"index": i, "field": "non_field", "reason": "Expected an object."})
+            continue
+        try:
+            valid.append((i, validate_row(row)))
+        except RowError as e:
+            errors.append({"index": i, "field": e.field, "reason": e.reason})
+    return valid, errors
+
+def insert_once(obj: Any, conflict_lookup: Optional[Dict[str, Any]]) -> Tuple[Any, bool]:
+    """INSERT `obj`; on a unique conflict return the already stored row instead.
+
+    No read-before-write: a first delivery costs one INSERT and a retried one
+    costs one conflicting INSERT (in a savepoint) plus the lookup of the stored
+    row. Returns (row, created).
+    """
+    try:
+        with transaction.atomic():
+            obj.save(force_insert=True)
+    except IntegrityError:
+        if not conflict_lookup:
+            raise
+        return type(obj).objects.get(**conflict_lookup), False
+    return obj, True
+
+def insert_ignoring_duplicates(model, objs: Sequence[Any], batch_size: int) -> Set[Any]:
+    """bulk_create(ignore_conflicts=True) and return the pks that were really inserted.
+
+    Primary keys are generated client-side (uuid4), so rows skipped because of a
+    unique conflict (e.g. a replayed event id) are the ones whose pk is absent.
+    """
+    model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+    pks = [o.pk for o in objs]
+    return set(model.objects.filter(pk__in=pks).values_list("pk", flat=True))
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
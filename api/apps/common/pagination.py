@@ -1,5 +1,13 @@
-from typing import Any, Dict, List, Tuple
+import base64
+import binascii
+import inspect
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 from django.conf import settings  # type: ignore
+from django.core.exceptions import ValidationError as DjangoValidationError  # type: ignore
+from django.db.models import Q  # type: ignore
+from rest_framework.exceptions import ValidationError  # type: ignore
 
 def parse_page_params(query_params) -> Tuple[int, int]:
     try:
@@ -14,13 +22,139 @@ def parse_page_params(query_params) -> Tuple[int, int]:
     page_size = max(1, min(settings.MAX_PAGE_SIZE, page_size))
     return page, page_size
 
+def _page_body(items: List[Any], page: int, page_size: int, total: int) -> Dict[str, Any]:
+    return {
+        "items": items,
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+    }
+
 def paginate_list(items: List[Any], page: int, page_size: int) -> Dict[str, Any]:
     total = len(items)
     start = (page - 1) * page_size
     end = start + page_size
+    return _page_body(items[start:end], page, page_size, total)
+
+def paginate_queryset(
+    qs,
+    page: int,
+    page_size: int,
+    map_page: Optional[Callable[[List[Any]], List[Any]]] = None,
+) -> Dict[str, Any]:
+    """Paginate a (possibly grouped) queryset with LIMIT/OFFSET in SQL.
+
+    `total` is derived from the page itself when it is the last one, so the
+    COUNT query only runs when more rows may follow. `map_page` post-processes
+    just the rows of the page (formatting, overrides, ...).
+    """
+    start = (page - 1) * page_size
+    rows = list(qs[start:start + page_size])
+    if len(rows) < page_size and (rows or start == 0):
+        total = start + len(rows)
+    else:
+        total = qs.count()
+    items = map_page(rows) if map_page else rows
+    return _page_body(items, page, page_size, total)
+
+async def apaginate_queryset(
+    qs,
+    page: int,
+    page_size: int,
+    map_page: Optional[Callable[[List[Any]], Any]] = None,
+) -> Dict[str, Any]:
+    """`paginate_queryset` with the async ORM; `map_page` may be a coroutine function."""
+    start = (page - 1) * page_size
+    rows = [row async for row in qs[start:start + page_size]]
+    if len(rows) < page_size and (rows or start == 0):
+        total = start + len(rows)
+    else:
+        total = await qs.acount()
+    items = map_page(rows) if map_page else rows
+    if inspect.isawaitable(items):
+        items = await items
+    return _page_body(items, page, page_size, total)
+
+def paginate_iter(items: Iterable[Any], page: int, page_size: int) -> Dict[str, Any]:
+    """Paginate a lazily produced sequence, keeping only the requested page in memory."""
+    start = (page - 1) * page_size
+    end = start + page_size
+    page_items: List[Any] = []
+    total = 0
+    for i, item in enumerate(items):
+        if start <= i < end:
+            page_items.append(item)
+        total = i + 1
+    return _page_body(page_items, page, page_size, total)
+
+# ---------------------------------------------------------------------------
+# Keyset (cursor) pagination
+#
+# Opt-in with `?cursor=` (empty for the first page). The cursor is an opaque
+# url-safe token encoding the sort key of the last row; no COUNT is issued and
+# deep pages cost the same as the first one.
+# ---------------------------------------------------------------------------
+
+def parse_cursor_param(query_params) -> Optional[str]:
+    """Return the cursor token when cursor mode is requested, otherwise None."""
+    if "cursor" not in query_params:
+        return None
+    return query_params.get("cursor") or ""
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = [v.isoformat() if isinstance(v, (datetime, date)) else str(v) for v in values]
+    token = base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode("utf-8"))
+    return token.decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, size: int) -> List[str]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise ValidationError({"cursor": ["invalid cursor"]})
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise ValidationError({"cursor": ["invalid cursor"]})
+    return values
+
+def _keyset_filter(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    # (a, b) after (va, vb) for ORDER BY a DESC, b DESC:
+    #   a < va OR (a = va AND b < vb)
+    cond = Q()
+    for i, spec in enumerate(ordering):
+        name = spec.lstrip("-")
+        lookup = "lt" if spec.startswith("-") else "gt"
+        term = Q(**{f"{name}__{lookup}": values[i]})
+        for prev_spec, prev_value in zip(ordering[:i], values[:i]):
+            term &= Q(**{prev_spec.lstrip("-"): prev_value})
+        cond |= term
+    return cond
+
+def paginate_keyset(qs, ordering: Sequence[str], cursor: str, page_size: int) -> Tuple[List[Any], Optional[str]]:
+    """Return (rows, next_cursor) for the page following `cursor`.
+
+    `ordering` must be a unique sort key, e.g. ("-occurred_at", "-alarm_id").
+    Works on `values()` querysets too, as long as the ordering fields are selected.
+    """
+    qs = qs.order_by(*ordering)
+    if cursor:
+        raw = decode_cursor(cursor, len(ordering))
+        try:
+            values = [qs.model._meta.get_field(spec.lstrip("-")).to_python(v) for spec, v in zip(ordering, raw)]
+        except DjangoValidationError:
+            raise ValidationError({"cursor": ["invalid cursor"]})
+        qs = qs.filter(_keyset_filter(ordering, values))
+    rows = list(qs[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        get = last.__getitem__ if isinstance(last, dict) else lambda name: getattr(last, name)
+        next_cursor = encode_cursor([get(spec.lstrip("-")) for spec in ordering])
+    return rows, next_cursor
+
+def cursor_body(items: List[Any], page_size: int, next_cursor: Optional[str]) -> Dict[str, Any]:
     return {
-        "items": items[start:end],
-        "page": page,
+        "items": items,
         "page_size": page_size,
-        "total": total,
+        "next_cursor": next_cursor,
     }
@@ -0,0 +1,104 @@
+"""Query parameter parsing shared by list endpoints (invalid values -> 400)."""
+from __future__ import annotations
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Sequence, Tuple
+from django.utils import timezone  # type: ignore
+from rest_framework.exceptions import ValidationError  # type: ignore
+
+from apps.common.periods import MAX_YEAR, MIN_YEAR, parse_period, period_of, period_of_date, shift_period
+
+_TRUE = {"1", "true", "yes"}
+_FALSE = {"0", "false", "no"}
+
+def parse_bool_param(query_params, name: str) -> Optional[bool]:
+    raw = query_params.get(name)
+    if raw is None or raw == "":
+        return None
+    value = raw.strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    raise ValidationError({name: ["must be true or false"]})
+
+def parse_choice_param(query_params, name: str, choices: Sequence[str]) -> Optional[str]:
+    raw = query_params.get(name)
+    if raw is None or raw == "":
+        return None
+    if raw not in choices:
+        raise ValidationError({name: [f"must be one of: {', '.join(choices)}"]})
+    return raw
+
+_PERIOD_FORMATS = {"daily": "YYYY-MM-DD", "weekly": "YYYY-Www", "monthly": "YYYY-MM", "yearly": "YYYY"}
+MAX_LAST_PERIODS = 1000
+
+def _parse_period_bound(period_type: str, name: str, raw: str) -> str:
+    """A period string of `period_type`, or a date (YYYY-MM-DD) naming the period that contains it."""
+    raw = raw.strip()
+    try:
+        return parse_period(period_type, raw)
+    except ValueError:
+        pass
+    try:
+        return parse_period(period_type, period_of_date(period_type, date.fromisoformat(raw)))
+    except ValueError:
+        raise ValidationError({name: [
+            f"must be a {period_type} period ({_PERIOD_FORMATS[period_type]}) or a date (YYYY-MM-DD)"
+            f" between {MIN_YEAR} and {MAX_YEAR}"
+        ]})
+
+def parse_period_range(query_params, period_type: str) -> Tuple[Optional[str], Optional[str]]:
+    """Range filter shared by the aggregate endpoints: inclusive (from, to) period strings.
+
+    - `from` / `to`: a period of the endpoint's type or a date inside it; either may be omitted
+    - `last=N`: the N most recent periods, ending at `to` or at the current period
+
+    Periods follow TIME_ZONE like the aggregates themselves. (None, None) means no filter.
+    """
+    start = end = None
+    raw_from, raw_to, raw_last = (query_params.get(n) for n in ("from", "to", "last"))
+    if raw_from:
+        start = _parse_period_bound(period_type, "from", raw_from)
+    if raw_to:
+        end = _parse_period_bound(period_type, "to", raw_to)
+    if raw_last:
+        if start is not None:
+            raise ValidationError({"last": ["cannot be combined with from"]})
+        try:
+            last = int(raw_last)
+        except ValueError:
+            last = 0
+        if not 1 <= last <= MAX_LAST_PERIODS:
+            raise ValidationError({"last": [f"must be an integer between 1 and {MAX_LAST_PERIODS}"]})
+        if end is None:
+            end = period_of(period_type, timezone.now())
+        try:
+            start = shift_period(period_type, end, 1 - last)
+        except ValueError:
+            raise ValidationError({"last": [f"reaches before {MIN_YEAR}"]})
+    if start is not None and end is not None and start > end:
+        raise ValidationError({"from": ["must not be after to"]})
+    return start, end
+
+def _parse_instant(name: str, raw: str, end: bool) -> datetime:
+    raw = raw.strip()
+    try:
+        if len(raw) == 10:
+            # a date covers the whole local day: `to=2025-03-31` includes March 31
+            d = date.fromisoformat(raw) + (timedelta(days=1) if end else timedelta())
+            return timezone.make_aware(datetime.combine(d, time.min))
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValidationError({name: ["must be a date (YYYY-MM-DD) or an ISO 8601 datetime"]})
+    return value if timezone.is_aware(value) else timezone.make_aware(value)
+
+def parse_datetime_range(query_params) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """`from` / `to` as an `occurred_at` range [start, end) for record-level endpoints (exports)."""
+    start = end = None
+    if query_params.get("from"):
+        start = _parse_instant("from", query_params["from"], end=False)
+    if query_params.get("to"):
+        end = _parse_instant("to", query_params["to"], end=True)
+    if start is not None and end is not None and start >= end:
+        raise ValidationError({"from": ["must be before to"]})
+    return start, end
@@ -0,0 +1,26 @@
+import json
+from rest_framework.parsers import BaseParser  # type: ignore
+
+from .ingest import InvalidRow
+
+class NDJSONParser(BaseParser):
+    """application/x-ndjson: one JSON object per line.
+
+    Undecodable lines become `InvalidRow` so batch endpoints can report them
+    per row instead of failing the whole request.
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        rows = []
+        if stream is None:
+            return rows
+        for raw in stream:
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                rows.append(InvalidRow(reason=f"JSON parse error - {e}"))
+        return rows
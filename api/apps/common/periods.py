@@ -0,0 +1,154 @@
+"""Period bucketing shared by the aggregate endpoints.
+
+Periods are computed in the current time zone (settings.TIME_ZONE = Asia/Tokyo):
+- daily   : 'YYYY-MM-DD'
+- weekly  : 'YYYY-Www' (ISO week)
+- monthly : 'YYYY-MM'
+- yearly  : 'YYYY'
+
+`period_annotations()` produces the DB-side equivalents so that aggregation can
+run as a grouped query; `period_from_row()` formats a grouped row back into the
+same period string as `period_of()`. `parse_period()` / `period_bounds()`
+turn a period string from a query parameter into an `occurred_at` range
+(see apps.common.params.parse_period_range for `from` / `to` / `last`).
+"""
+from __future__ import annotations
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Tuple
+from django.db.models.functions import (  # type: ignore
+    ExtractIsoYear,
+    ExtractMonth,
+    ExtractWeek,
+    ExtractYear,
+    TruncDate,
+)
+from django.utils import timezone  # type: ignore
+
+PERIOD_DAILY = "daily"
+PERIOD_WEEKLY = "weekly"
+PERIOD_MONTHLY = "monthly"
+PERIOD_YEARLY = "yearly"
+
+def period_of_date(period_type: str, d: date) -> str:
+    if period_type == PERIOD_DAILY:
+        return d.isoformat()
+    if period_type == PERIOD_WEEKLY:
+        iso = d.isocalendar()
+        return f"{iso.year}-W{iso.week:02d}"
+    if period_type == PERIOD_MONTHLY:
+        return f"{d.year:04d}-{d.month:02d}"
+    return f"{d.year:04d}"
+
+def period_of(period_type: str, dt: datetime) -> str:
+    if timezone.is_aware(dt):
+        dt = timezone.localtime(dt)
+    return period_of_date(period_type, dt.date())
+
+def period_keys(period_type: str) -> List[str]:
+    """Annotation names produced by `period_annotations`, most significant first."""
+    if period_type == PERIOD_DAILY:
+        return ["p_date"]
+    if period_type == PERIOD_WEEKLY:
+        return ["p_year", "p_week"]
+    if period_type == PERIOD_MONTHLY:
+        return ["p_year", "p_month"]
+    return ["p_year"]
+
+def period_annotations(period_type: str, field: str = "occurred_at") -> Dict[str, Any]:
+    tz = timezone.get_current_timezone()
+    if period_type == PERIOD_DAILY:
+        return {"p_date": TruncDate(field, tzinfo=tz)}
+    if period_type == PERIOD_WEEKLY:
+        return {"p_year": ExtractIsoYear(field, tzinfo=tz), "p_week": ExtractWeek(field, tzinfo=tz)}
+    if period_type == PERIOD_MONTHLY:
+        return {"p_year": ExtractYear(field, tzinfo=tz), "p_month": ExtractMonth(field, tzinfo=tz)}
+    return {"p_year": ExtractYear(field, tzinfo=tz)}
+
+def period_from_row(period_type: str, row: Dict[str, Any]) -> str:
+    if period_type == PERIOD_DAILY:
+        d = row["p_date"]
+        # SQLite may hand back the truncated date as text
+        return d if isinstance(d, str) else d.isoformat()
+    if period_type == PERIOD_WEEKLY:
+        return f"{int(row['p_year'])}-W{int(row['p_week']):02d}"
+    if period_type == PERIOD_MONTHLY:
+        return f"{int(row['p_year']):04d}-{int(row['p_month']):02d}"
+    return f"{int(row['p_year']):04d}"
+
+# the period after MAX_YEAR-12 (or its last ISO week) must still be a valid date;
+# the lower bound keeps local midnights convertible to UTC
+MIN_YEAR, MAX_YEAR = 1900, 9998
+
+_PERIOD_RE = {
+    PERIOD_DAILY: re.compile(r"^\d{4}-\d{2}-\d{2}$"),
+    PERIOD_WEEKLY: re.compile(r"^(\d{4})-W(\d{2})$"),
+    PERIOD_MONTHLY: re.compile(r"^(\d{4})-(\d{2})$"),
+    PERIOD_YEARLY: re.compile(r"^(\d{4})$"),
+}
+
+def _check_year(year: int, period: str) -> None:
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError(f"{period}: year outside {MIN_YEAR}..{MAX_YEAR}")
+
+def period_start_date(period_type: str, period: str) -> date:
+    """First local date of a period string; ValueError when it is malformed or out of range."""
+    m = _PERIOD_RE[period_type].match(period)
+    if not m:
+        raise ValueError(period)
+    if period_type == PERIOD_DAILY:
+        start = date.fromisoformat(period)
+    elif period_type == PERIOD_WEEKLY:
+        start = date.fromisocalendar(int(m.group(1)), int(m.group(2)), 1)
+    elif period_type == PERIOD_MONTHLY:
+        start = date(int(m.group(1)), int(m.group(2)), 1)
+    else:
+        start = date(int(m.group(1)), 1, 1)
+    # ISO week 1 may start in December of the previous year
+    _check_year(int(period[:4]), period)
+    return start
+
+def parse_period(period_type: str, period: str) -> str:
+    """Validate a period string ('YYYY-MM-DD' / 'YYYY-Www' / 'YYYY-MM' / 'YYYY')."""
+    return period_of_date(period_type, period_start_date(period_type, period))
+
+def _next_period_start(period_type: str, d: date) -> date:
+    if period_type == PERIOD_DAILY:
+        return d + timedelta(days=1)
+    if period_type == PERIOD_WEEKLY:
+        return d + timedelta(days=7)
+    if period_type == PERIOD_MONTHLY:
+        return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+    return date(d.year + 1, 1, 1)
+
+def period_dates(period_type: str, period: str) -> Tuple[date, date]:
+    """First and last local date of a period (inclusive)."""
+    start = period_start_date(period_type, period)
+    return start, _next_period_start(period_type, start) - timedelta(days=1)
+
+def shift_period(period_type: str, period: str, n: int) -> str:
+    """The period `n` periods after (negative: before) `period`; ValueError when it leaves the year range."""
+    start = period_start_date(period_type, period)
+    try:
+        if period_type == PERIOD_DAILY:
+            shifted = period_of_date(period_type, start + timedelta(days=n))
+        elif period_type == PERIOD_WEEKLY:
+            shifted = period_of_date(period_type, start + timedelta(weeks=n))
+        elif period_type == PERIOD_MONTHLY:
+            months = start.year * 12 + start.month - 1 + n
+            shifted = f"{months // 12:04d}-{months % 12 + 1:02d}"
+        else:
+            shifted = f"{start.year + n:04d}"
+    except OverflowError:
+        raise ValueError(f"{period} {n:+d}: outside the supported range")
+    return parse_period(period_type, shifted)
+
+def period_bounds(period_type: str, period: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a period as aware datetimes in the current time zone."""
+    start = period_start_date(period_type, period)
+    end = _next_period_start(period_type, start)
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end, time.min), tz),
+    )
@@ -0,0 +1,115 @@
+"""JSON renderers: the default JSON renderer and NDJSON output (`Accept: application/x-ndjson`).
+
+`FastJSONRenderer` is the default `application/json` renderer: the same bytes
+as DRF's JSONRenderer (compact, UTF-8, DRF's formatting for datetimes and
+Decimals) encoded with orjson when it is installed. Pretty-printed responses
+(`; indent=N`, the browsable API) and non-default JSON settings take DRF's
+path.
+
+Every endpoint can answer in NDJSON through `NDJSONRenderer`: list bodies
+(`data.items`) become one line per item followed by a `{"meta": {...}}`
+trailer line carrying the rest of the envelope (request_id, page, page_size,
+total / next_cursor); any other body is a single line.
+
+Large raw lists (devices, users, alarm detail) go further when no paging
+parameter is given: `stream_ndjson()` streams every row as it comes off a
+server-side cursor, so memory stays flat whatever the size. Lines are encoded
+with orjson when it is installed (stdlib json otherwise).
+"""
+from __future__ import annotations
+import json
+from typing import Any, Callable, Dict, Iterator, List
+
+from django.conf import settings  # type: ignore
+from django.http import StreamingHttpResponse  # type: ignore
+from rest_framework.utils.encoders import JSONEncoder  # type: ignore
+from rest_framework.renderers import BaseRenderer, JSONRenderer  # type: ignore
+
+from apps.common.streaming import streaming_response
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+PAGING_PARAMS = ("page", "page_size", "cursor")
+
+# datetimes go through DRF's encoder too (orjson's own format differs, e.g. no "Z" for UTC)
+_default = JSONEncoder().default
+_ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+_LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON as bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits: let the stdlib encoder decide
+    return json.dumps(obj, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+        fast = orjson is not None and self.compact and not self.ensure_ascii
+        if not fast or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = dumps(data)
+        # like DRF, keep the output a strict JavaScript subset
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+def _meta_line(request_id: Any, meta: Dict[str, Any]) -> bytes:
+    if request_id:
+        meta = {"request_id": request_id, **meta}
+    return dumps({"meta": meta}) + b"\n"
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = NDJSON_MEDIA_TYPE
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+        inner = data.get("data") if isinstance(data, dict) else None
+        if isinstance(inner, dict) and isinstance(inner.get("items"), list):
+            lines = [dumps(item) + b"\n" for item in inner["items"]]
+            lines.append(_meta_line(data.get("request_id"), {k: v for k, v in inner.items() if k != "items"}))
+            return b"".join(lines)
+        return dumps(data) + b"\n"
+
+def streams_ndjson(request) -> bool:
+    """NDJSON was negotiated and no paging parameter was given: stream the whole list."""
+    renderer = getattr(request, "accepted_renderer", None)
+    if getattr(renderer, "format", None) != NDJSONRenderer.format:
+        return False
+    return not any(p in request.query_params for p in PAGING_PARAMS)
+
+def stream_ndjson(request, qs, serialize: Callable[[List[Any]], List[Dict[str, Any]]]) -> StreamingHttpResponse:
+    """Stream `qs` as NDJSON, `serialize`-ing EXPORT_CHUNK_SIZE rows at a time, then a meta trailer."""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    request_id = getattr(request, "request_id", None)
+
+    def lines() -> Iterator[bytes]:
+        total = 0
+        batch: List[Any] = []
+        for obj in qs.iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) >= chunk_size:
+                yield b"".join(dumps(item) + b"\n" for item in serialize(batch))
+                total += len(batch)
+                batch = []
+        if batch:
+            yield b"".join(dumps(item) + b"\n" for item in serialize(batch))
+            total += len(batch)
+        yield _meta_line(request_id, {"total": total})
+
+    resp = streaming_response(request, lines(), NDJSON_MEDIA_TYPE)
+    if request_id:
+        resp["X-Request-ID"] = request_id
+    return resp
@@ -0,0 +1,53 @@
+"""Server-Sent Events helpers for async (ASGI) stream views.
+
+Stream views are plain async Django views rather than DRF APIViews: DRF 3.15
+dispatches synchronously and would pin a worker thread per open connection.
+Authentication reuses ApiKeyAuthentication; errors keep the JSON error envelope.
+"""
+from __future__ import annotations
+import json
+from typing import Any, AsyncIterator, List, Optional
+
+from asgiref.sync import sync_to_async  # type: ignore
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+from django.http import JsonResponse, StreamingHttpResponse  # type: ignore
+
+from apps.common.auth import ApiKeyAuthentication
+from apps.common.permissions import ROLE_ORDER
+from apps.common.responses import error_envelope
+
+def frame(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+def comment(text: str) -> str:
+    return f": {text}\n\n"
+
+def retry(ms: int) -> str:
+    return f"retry: {ms}\n\n"
+
+def error_response(request, status: int, code: str, message: str, details: Optional[list] = None) -> JsonResponse:
+    return JsonResponse(error_envelope(request, code, message, details or []), status=status)
+
+async def authorize(request, min_role: str) -> Optional[JsonResponse]:
+    """Authenticate with the API key headers; an error response, or None when allowed."""
+    result = await sync_to_async(ApiKeyAuthentication().authenticate)(request)
+    if result is None:
+        return error_response(request, 401, "unauthorized", "Unauthorized")
+    request.user = result[0]
+    if ROLE_ORDER.get(result[0].role, 0) < ROLE_ORDER[min_role]:
+        return error_response(request, 403, "forbidden", "Forbidden")
+    return None
+
+def parse_list_param(query_params, name: str) -> List[str]:
+    """`?name=a,b` and/or `?name=a&name=b` -> ["a", "b"]."""
+    values: List[str] = []
+    for raw in query_params.getlist(name):
+        values.extend(v.strip() for v in raw.split(",") if v.strip())
+    return values
+
+def event_stream(frames: AsyncIterator[str]) -> StreamingHttpResponse:
+    resp = StreamingHttpResponse(frames, content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    # nginx: pass frames through instead of buffering the response
+    resp["X-Accel-Buffering"] = "no"
+    return resp
@@ -0,0 +1,41 @@
+"""StreamingHttpResponse that stays a stream under both WSGI and ASGI.
+
+Django 4.2's ASGI handler consumes a sync iterator with `sync_to_async(list)`,
+so an export built on `.iterator(chunk_size)` would be read into memory before
+the first byte goes out. For ASGI requests `streaming_response` wraps the
+chunks in an async iterator that pulls one chunk per `sync_to_async` call;
+WSGI requests (and the sync test client) keep the plain iterator.
+"""
+from __future__ import annotations
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async  # type: ignore
+from django.core.handlers.asgi import ASGIRequest  # type: ignore
+from django.http import StreamingHttpResponse  # type: ignore
+
+_DONE = object()
+
+def is_asgi(request) -> bool:
+    # DRF's Request wraps the HttpRequest
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+async def aiter_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield from a sync iterator one chunk at a time.
+
+    Thread-sensitive, so every chunk is read on the request's thread and a
+    server-side cursor stays on the connection that opened it.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await step(chunks, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+def streaming_response(request, chunks: Iterator[bytes], content_type: str) -> StreamingHttpResponse:
+    return StreamingHttpResponse(aiter_chunks(chunks) if is_asgi(request) else chunks, content_type=content_type)
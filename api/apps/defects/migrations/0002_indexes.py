@@ -0,0 +1,13 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("defects_api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="defectsrecord",
+            index=models.Index(fields=["occurred_at"], name="defects_occurred_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("defects_api", "0002_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="defectsrecord",
+            name="event_id",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="defectsrecord",
+            constraint=models.UniqueConstraint(condition=models.Q(("event_id__isnull", False)), fields=("device_id", "event_id"), name="defects_device_event_uniq"),
+        ),
+    ]
@@ -6,8 +6,20 @@ class DefectsRecord(models.Model):
     device_id = models.CharField(max_length=64)
     count = models.IntegerField()
     occurred_at = models.DateTimeField()
+    # client-supplied id (unique per device) so retried batches are not double counted
+    event_id = models.CharField(max_length=64, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "defects_records"
         ordering = ["-occurred_at"]
+        indexes = [
+            models.Index(fields=["occurred_at"], name="defects_occurred_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device_id", "event_id"],
+                condition=models.Q(event_id__isnull=False),
+                name="defects_device_event_uniq",
+            ),
+        ]
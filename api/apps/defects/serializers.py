@@ -1,12 +1,24 @@
+from typing import Any, Dict
 from rest_framework import serializers  # type: ignore
+from apps.common.ingest import optional_datetime, optional_str, require_int, require_str
 from .models import DefectsRecord
 
 class DefectsRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = DefectsRecord
-        fields = ["id", "device_id", "count", "occurred_at"]
+        fields = ["id", "device_id", "count", "occurred_at", "event_id"]
 
 class DefectsAddRequestSerializer(serializers.Serializer):
     device_id = serializers.CharField(max_length=64)
     count = serializers.IntegerField(min_value=0)
     occurred_at = serializers.DateTimeField(required=False)
+    event_id = serializers.CharField(max_length=64, required=False, allow_null=True)
+
+def validate_defects_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fast-path equivalent of DefectsAddRequestSerializer for bulk ingestion."""
+    return {
+        "device_id": require_str(row, "device_id", 64),
+        "count": require_int(row, "count", min_value=0),
+        "occurred_at": optional_datetime(row, "occurred_at"),
+        "event_id": optional_str(row, "event_id", 64) or None,
+    }
@@ -1,59 +1,120 @@
 from __future__ import annotations
-from typing import Any, Dict, List
-from collections import defaultdict
-from datetime import datetime
+import heapq
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from django.db import transaction  # type: ignore
+from django.db.models import Sum  # type: ignore
 from django.utils import timezone  # type: ignore
 
+from apps.common.cache import DEFECTS, bump
+from apps.common.ingest import chunked, insert_ignoring_duplicates, insert_once
+from apps.common.periods import period_annotations, period_bounds, period_from_row, period_keys
+from apps.harvest import services as harvest_services
 from .models import DefectsRecord
-from apps.harvest.models import HarvestRecord
-
-def _period_weekly(dt: datetime) -> str:
-    iso = dt.isocalendar()
-    return f"{iso.year}-W{iso.week:02d}"
-
-def _period_monthly(dt: datetime) -> str:
-    return f"{dt.year:04d}-{dt.month:02d}"
 
 @transaction.atomic
+def record_event(data: Dict[str, Any]) -> Tuple[DefectsRecord, bool]:
+    """Insert one record; a replayed (device_id, event_id) returns the stored row."""
+    event_id = data.get("event_id") or None
+    rec, created = insert_once(
+        DefectsRecord(
+            device_id=data["device_id"],
+            count=data["count"],
+            occurred_at=data.get("occurred_at") or timezone.now(),
+            event_id=event_id,
+        ),
+        {"device_id": data["device_id"], "event_id": event_id} if event_id else None,
+    )
+    if created:
+        bump(DEFECTS)
+    return rec, created
+
 def add_record(data: Dict[str, Any]) -> DefectsRecord:
-    occurred_at = data.get("occurred_at") or timezone.now()
-    rec = DefectsRecord.objects.create(
-        device_id=data["device_id"],
-        count=data["count"],
-        occurred_at=occurred_at,
+    return record_event(data)[0]
+
+def add_records_bulk(rows: List[Dict[str, Any]], chunk_size: int) -> List[Tuple[DefectsRecord, bool]]:
+    """Insert validated rows in chunks; returns (record, created) per input row.
+
+    Rows whose (device_id, event_id) already exists are skipped by the unique
+    constraint and reported with created=False, so replayed batches are safe.
+    """
+    now = timezone.now()
+    results: List[Tuple[DefectsRecord, bool]] = []
+    for chunk in chunked(rows, chunk_size):
+        objs = [
+            DefectsRecord(
+                device_id=r["device_id"],
+                count=r["count"],
+                occurred_at=r.get("occurred_at") or now,
+                event_id=r.get("event_id"),
+            )
+            for r in chunk
+        ]
+        with transaction.atomic():
+            inserted = insert_ignoring_duplicates(DefectsRecord, objs, chunk_size)
+            if inserted:
+                bump(DEFECTS)
+        results.extend((o, o.pk in inserted) for o in objs)
+    return results
+
+def amount_queryset(period_type: str, period_from: Optional[str] = None, period_to: Optional[str] = None):
+    """SUM(count) per period (newest first), grouped by the database.
+
+    `period_from` / `period_to` (inclusive period strings) become an
+    `occurred_at` range, so only the matching slice of the index is scanned.
+    """
+    qs = DefectsRecord.objects.all()
+    if period_from is not None:
+        qs = qs.filter(occurred_at__gte=period_bounds(period_type, period_from)[0])
+    if period_to is not None:
+        qs = qs.filter(occurred_at__lt=period_bounds(period_type, period_to)[1])
+    keys = period_keys(period_type)
+    return (
+        qs.annotate(**period_annotations(period_type))
+        .values(*keys)
+        .annotate(total_defects=Sum("count"))
+        .order_by(*[f"-{k}" for k in keys])
     )
-    return rec
+
+def amount_items(period_type: str, rows) -> List[Dict[str, Any]]:
+    return [{"period": period_from_row(period_type, r), "total_defects": int(r["total_defects"])} for r in rows]
 
 def list_amount(period_type: str) -> List[Dict[str, Any]]:
-    qs = DefectsRecord.objects.all()
-    bucket = defaultdict(int)
-    for r in qs.iterator():
-        p = _period_weekly(r.occurred_at) if period_type == "weekly" else _period_monthly(r.occurred_at)
-        bucket[p] += int(r.count)
-    items = [{"period": p, "total_defects": c} for p, c in bucket.items()]
-    items.sort(key=lambda x: x["period"], reverse=True)
-    return items
-
-def list_ratio(period_type: str) -> List[Dict[str, Any]]:
-    # defects
-    defects = list_amount(period_type)
-    d_map = {i["period"]: i["total_defects"] for i in defects}
-
-    # harvest totals
-    h_bucket = defaultdict(int)
-    for r in HarvestRecord.objects.all().iterator():
-        p = _period_weekly(r.occurred_at) if period_type == "weekly" else _period_monthly(r.occurred_at)
-        h_bucket[p] += int(r.count)
-    items = []
-    for p in sorted(set(d_map.keys()) | set(h_bucket.keys()), reverse=True):
-        total_defects = int(d_map.get(p, 0))
-        total_harvest = int(h_bucket.get(p, 0))
+    return amount_items(period_type, amount_queryset(period_type))
+
+def iter_ratio(
+    period_type: str,
+    period_from: Optional[str] = None,
+    period_to: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Defects ratio per period, newest first.
+
+    Two grouped queries -- defects from raw records, harvest from the
+    weekly / monthly rollups -- both ordered newest first, joined by a
+    streaming merge on the period string.
+    """
+    defects = (
+        (period_from_row(period_type, r), int(r["total_defects"]), 0)
+        for r in amount_queryset(period_type, period_from, period_to)
+    )
+    harvest = (
+        (r["period"], int(r["total_count"]), 1)
+        for r in harvest_services.aggregate_queryset(period_type, period_from, period_to)
+    )
+    merged = heapq.merge(defects, harvest, key=itemgetter(0), reverse=True)
+    for period, rows in groupby(merged, key=itemgetter(0)):
+        totals = [0, 0]
+        for _, n, side in rows:
+            totals[side] += n
+        total_defects, total_harvest = totals
         ratio = (total_defects / total_harvest * 100.0) if total_harvest > 0 else 0.0
-        items.append({
-            "period": p,
+        yield {
+            "period": period,
             "defects_ratio_percent": round(ratio, 3),
             "total_defects": total_defects,
             "total_harvest": total_harvest,
-        })
-    return items
+        }
+
+def list_ratio(period_type: str, period_from: Optional[str] = None, period_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    return list(iter_ratio(period_type, period_from, period_to))
@@ -1,6 +1,7 @@
 import pytest
 from django.utils import timezone
 from apps.defects import services
+from apps.defects.models import DefectsRecord
 
 pytestmark = pytest.mark.django_db
 
@@ -8,3 +9,43 @@ def test_add_record_and_list_weekly():
     services.add_record({"device_id": "DEV001", "count": 3, "occurred_at": timezone.now()})
     items = services.list_amount("weekly")
     assert items[0]["total_defects"] == 3
+
+def test_bulk_add_is_idempotent_per_device_event_id():
+    rows = [
+        {"device_id": "DEV001", "count": 1, "event_id": "e1"},
+        {"device_id": "DEV001", "count": 2, "event_id": "e2"},
+        {"device_id": "DEV002", "count": 4, "event_id": "e1"},  # same event id, other device
+        {"device_id": "DEV001", "count": 8},
+    ]
+    first = services.add_records_bulk(rows, chunk_size=2)
+    assert [created for _, created in first] == [True, True, True, True]
+
+    # replay with one new event: only that one is inserted
+    replay = services.add_records_bulk(rows[:3] + [{"device_id": "DEV001", "count": 16, "event_id": "e3"}], chunk_size=2)
+    assert [created for _, created in replay] == [False, False, False, True]
+    assert DefectsRecord.objects.count() == 5
+    assert services.list_amount("monthly")[0]["total_defects"] == 31
+
+def test_ratio_merges_grouped_totals_within_range(django_assert_num_queries):
+    from datetime import datetime
+    from apps.harvest import services as harvest_services
+
+    tz = timezone.get_current_timezone()
+    for month, harvest, defects in [(1, 100, 5), (2, 50, 0), (3, 0, 2), (4, 40, 4)]:
+        at = datetime(2025, month, 15, 12, 0, tzinfo=tz)
+        if harvest:
+            harvest_services.add_record({"device_id": "DEV001", "count": harvest, "occurred_at": at})
+        if defects:
+            services.add_record({"device_id": "DEV001", "count": defects, "occurred_at": at})
+    # local-time bucketing at the range edge: 2025-04-01 00:30 JST is April
+    services.add_record({"device_id": "DEV001", "count": 1, "occurred_at": datetime(2025, 4, 1, 0, 30, tzinfo=tz)})
+
+    with django_assert_num_queries(2):
+        items = services.list_ratio("monthly", "2025-02", "2025-04")
+    assert items == [
+        {"period": "2025-04", "defects_ratio_percent": 12.5, "total_defects": 5, "total_harvest": 40},
+        {"period": "2025-03", "defects_ratio_percent": 0.0, "total_defects": 2, "total_harvest": 0},
+        {"period": "2025-02", "defects_ratio_percent": 0.0, "total_defects": 0, "total_harvest": 50},
+    ]
+    assert [i["period"] for i in services.list_ratio("monthly")] == ["2025-04", "2025-03", "2025-02", "2025-01"]
+    assert [i["period"] for i in services.list_ratio("weekly", "2025-W07", "2025-W12")] == ["2025-W11", "2025-W07"]
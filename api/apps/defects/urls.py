@@ -1,6 +1,7 @@
 from django.urls import path  # type: ignore
 from .views import (
     DefectsAmountAddView,
+    DefectsAmountBulkView,
     DefectsAmountWeeklyView,
     DefectsAmountMonthlyView,
     DefectsRatioWeeklyView,
@@ -9,6 +10,7 @@ from .views import (
 
 urlpatterns = [
     path("defects/amount/add", DefectsAmountAddView.as_view(), name="defects-amount-add"),
+    path("defects/amount/bulk", DefectsAmountBulkView.as_view(), name="defects-amount-bulk"),
     path("defects/amount/weekly", DefectsAmountWeeklyView.as_view(), name="defects-amount-weekly"),
     path("defects/amount/monthly", DefectsAmountMonthlyView.as_view(), name="defects-amount-monthly"),
     path("defects/ratio/weekly", DefectsRatioWeeklyView.as_view(), name="defects-ratio-weekly"),
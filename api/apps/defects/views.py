@@ -1,12 +1,21 @@
 from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
+from rest_framework.parsers import JSONParser  # type: ignore
+from django.conf import settings  # type: ignore
+from asgiref.sync import sync_to_async  # type: ignore
 
+from apps.common.asyncviews import AsyncAPIView
+from apps.common.cache import DEFECTS, HARVEST, cache_response
+from apps.common.ingest import bulk_rows, validate_rows
+from apps.common.parsers import NDJSONParser
 from apps.common.responses import success_envelope
-from apps.common.pagination import parse_page_params, paginate_list
+from apps.common.pagination import apaginate_queryset, parse_page_params, paginate_iter
+from apps.common.params import parse_period_range
 from apps.common.permissions import RoleAdminOnly, RoleAtLeastUser
+from apps.devices import registry
 
-from .serializers import DefectsAddRequestSerializer, DefectsRecordSerializer
+from .serializers import DefectsAddRequestSerializer, DefectsRecordSerializer, validate_defects_row
 from . import services
 
 class DefectsAmountAddView(APIView):
@@ -17,33 +26,90 @@ class DefectsAmountAddView(APIView):
     def post(self, request):
         ser = DefectsAddRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        rec = services.add_record(ser.validated_data)
-        return Response(success_envelope(request, DefectsRecordSerializer(rec).data), status=status.HTTP_201_CREATED)
+        registry.ensure_device(request, ser.validated_data["device_id"])
+        rec, created = services.record_event(ser.validated_data)
+        code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(success_envelope(request, DefectsRecordSerializer(rec).data), status=code)
 
-class DefectsAmountWeeklyView(APIView):
+class DefectsAmountBulkView(APIView):
+    """POST /defects/amount/bulk (OpenAPI未記載・暫定)
+
+    収穫量 bulk と同じ入力形式。任意の event_id（デバイス単位で一意）で再送時の二重計上を防ぐ。
+    results は入力順に {index, status: created|duplicate|rejected, ...} を返す。
+    """
+    from apps.devices.permissions import RoleDeviceOrAdmin
+    permission_classes = [RoleDeviceOrAdmin]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        rows = bulk_rows(request.data)
+        scoped = registry.scoped(validate_defects_row, registry.known_devices(), registry.bound_device(request))
+        valid, errors = validate_rows(rows, scoped)
+        outcomes = services.add_records_bulk([r for _, r in valid], settings.INGEST_BULK_CHUNK_SIZE)
+
+        results = [
+            {"index": e["index"], "status": "rejected", "field": e["field"], "reason": e["reason"]}
+            for e in errors
+        ]
+        for (index, _), (rec, created) in zip(valid, outcomes):
+            results.append({
+                "index": index,
+                "status": "created" if created else "duplicate",
+                "id": str(rec.pk) if created else None,
+                "event_id": rec.event_id,
+            })
+        results.sort(key=lambda r: r["index"])
+        created_count = sum(1 for _, created in outcomes if created)
+        data = {
+            "accepted": created_count,
+            "duplicates": len(outcomes) - created_count,
+            "rejected": len(errors),
+            "results": results,
+        }
+        return Response(success_envelope(request, data), status=status.HTTP_201_CREATED)
+
+class DefectsAmountWeeklyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
-    def get(self, request):
+    @cache_response(DEFECTS, period_type="weekly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_amount("weekly")
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        period_from, period_to = parse_period_range(request.query_params, "weekly")
+        data = await apaginate_queryset(
+            services.amount_queryset("weekly", period_from, period_to),
+            page,
+            page_size,
+            map_page=lambda rows: services.amount_items("weekly", rows),
+        )
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class DefectsAmountMonthlyView(APIView):
+class DefectsAmountMonthlyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
-    def get(self, request):
+    @cache_response(DEFECTS, period_type="monthly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_amount("monthly")
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        period_from, period_to = parse_period_range(request.query_params, "monthly")
+        data = await apaginate_queryset(
+            services.amount_queryset("monthly", period_from, period_to),
+            page,
+            page_size,
+            map_page=lambda rows: services.amount_items("monthly", rows),
+        )
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class DefectsRatioWeeklyView(APIView):
+class DefectsRatioWeeklyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
-    def get(self, request):
+    @cache_response(DEFECTS, HARVEST, period_type="weekly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_ratio("weekly")
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        period_from, period_to = parse_period_range(request.query_params, "weekly")
+        data = await sync_to_async(paginate_iter)(services.iter_ratio("weekly", period_from, period_to), page, page_size)
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class DefectsRatioMonthlyView(APIView):
+class DefectsRatioMonthlyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
-    def get(self, request):
+    @cache_response(DEFECTS, HARVEST, period_type="monthly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_ratio("monthly")
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        period_from, period_to = parse_period_range(request.query_params, "monthly")
+        data = await sync_to_async(paginate_iter)(services.iter_ratio("monthly", period_from, period_to), page, page_size)
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
@@ -0,0 +1,81 @@
+"""Per-device API keys.
+
+Keys look like `dk_<random>`; only their SHA-256 is stored. Resolved keys are
+kept in an in-process LRU (API_KEY_CACHE_SIZE entries, API_KEY_CACHE_TTL
+seconds), so an ingesting device costs one DB lookup per TTL window, not per
+request. Each entry records the shared DEVICE_KEYS data version
+(apps.common.cache) it was resolved under; revoking a key or deleting a device
+bumps that version, so every process re-checks its cached keys on the next
+request instead of trusting them until the TTL runs out.
+"""
+from __future__ import annotations
+import hashlib
+import hmac
+import secrets
+from typing import List, Optional, Tuple
+
+from django.conf import settings  # type: ignore
+from django.shortcuts import get_object_or_404  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from apps.common.auth import ApiKeyUser
+from apps.common.cache import DEVICE_KEYS, bump, data_versions
+from apps.common.lru import TTLCache
+
+from .models import Device, DeviceApiKey
+
+KEY_PREFIX = "dk_"
+
+# key hash -> (DEVICE_KEYS version at resolution, principal)
+_resolved: TTLCache[Tuple[str, ApiKeyUser]] = TTLCache(settings.API_KEY_CACHE_SIZE, settings.API_KEY_CACHE_TTL)
+
+def hash_key(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def issue_key(device_id: str, label: str = "") -> Tuple[DeviceApiKey, str]:
+    """Create a key for the device; returns (record, raw key). The raw key is not recoverable later."""
+    device = get_object_or_404(Device, pk=device_id)
+    raw = KEY_PREFIX + secrets.token_urlsafe(32)
+    rec = DeviceApiKey.objects.create(device=device, key_hash=hash_key(raw), key_prefix=raw[:10], label=label)
+    return rec, raw
+
+def list_keys(device_id: str) -> List[DeviceApiKey]:
+    device = get_object_or_404(Device, pk=device_id)
+    return list(device.api_keys.all())
+
+def revoke_key(device_id: str, key_id: str) -> DeviceApiKey:
+    rec = get_object_or_404(DeviceApiKey, pk=key_id, device_id=device_id)
+    if rec.revoked_at is None:
+        rec.revoked_at = timezone.now()
+        rec.save(update_fields=["revoked_at"])
+    forget(rec.key_hash)
+    return rec
+
+def forget(*key_hashes: str) -> None:
+    """Drop keys here and bump DEVICE_KEYS so other processes stop trusting their cached copies."""
+    for h in key_hashes:
+        _resolved.pop(h)
+    bump(DEVICE_KEYS)
+
+def resolve(raw: str) -> Optional[ApiKeyUser]:
+    """Principal for an active device key, or None. Unknown keys are not cached."""
+    if not raw.startswith(KEY_PREFIX):
+        return None
+    digest = hash_key(raw)
+    version = data_versions([DEVICE_KEYS])[DEVICE_KEYS]
+    hit = _resolved.get(digest)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    row = (
+        DeviceApiKey.objects.filter(key_hash=digest, revoked_at__isnull=True)
+        .values_list("key_hash", "device_id")
+        .first()
+    )
+    if row is None or not hmac.compare_digest(row[0], digest):
+        return None
+    principal = ApiKeyUser(role="device", device_id=row[1])
+    _resolved.set(digest, (version, principal))
+    return principal
+
+def clear_cache() -> None:
+    _resolved.clear()
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("devices_api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="alarm",
+            index=models.Index(fields=["device", "-occurred_at", "-alarm_id"], name="alarm_dev_occurred_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="alarm",
+            index=models.Index(fields=["device", "status", "-occurred_at"], name="alarm_dev_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="alarm",
+            index=models.Index(condition=models.Q(("status", "open")), fields=["device", "-occurred_at"], name="alarm_open_dev_idx"),
+        ),
+    ]
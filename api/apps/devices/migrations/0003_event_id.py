@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("devices_api", "0002_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="alarm",
+            name="event_id",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="alarm",
+            constraint=models.UniqueConstraint(condition=models.Q(("event_id__isnull", False)), fields=("device", "event_id"), name="alarm_device_event_uniq"),
+        ),
+    ]
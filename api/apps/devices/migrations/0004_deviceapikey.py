@@ -0,0 +1,24 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("devices_api", "0003_event_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeviceApiKey",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("key_hash", models.CharField(max_length=64, unique=True)),
+                ("key_prefix", models.CharField(max_length=16)),
+                ("label", models.CharField(blank=True, default="", max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("revoked_at", models.DateTimeField(blank=True, null=True)),
+                ("device", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="api_keys", to="devices_api.device")),
+            ],
+            options={"db_table": "device_api_keys", "ordering": ["-created_at"]},
+        ),
+    ]
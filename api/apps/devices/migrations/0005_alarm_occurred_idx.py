@@ -0,0 +1,13 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("devices_api", "0004_deviceapikey"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="alarm",
+            index=models.Index(fields=["occurred_at"], name="alarm_occurred_idx"),
+        ),
+    ]
@@ -31,6 +31,21 @@ class BatteryStatus(models.Model):
     class Meta:
         db_table = "device_battery_status"
 
+class DeviceApiKey(models.Model):
+    """Per-device API key. Only the SHA-256 of the key is stored; the key itself is shown once."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name="api_keys")
+    key_hash = models.CharField(max_length=64, unique=True)
+    # first characters of the key, to tell keys apart in listings
+    key_prefix = models.CharField(max_length=16)
+    label = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "device_api_keys"
+        ordering = ["-created_at"]
+
 class Alarm(models.Model):
     TYPE_BATTERY_LOW = "battery_low"
     TYPE_SENSOR_FAILURE = "sensor_failure"
@@ -66,8 +81,31 @@ class Alarm(models.Model):
     status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=STATUS_OPEN)
     severity = models.CharField(max_length=16, choices=SEVERITY_CHOICES, null=True, blank=True)
     occurred_at = models.DateTimeField()
+    # client-supplied id (unique per device) so retried uploads are not duplicated
+    event_id = models.CharField(max_length=64, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "device_alarms"
         ordering = ["-occurred_at"]
+        indexes = [
+            # alarm history per device (page and cursor mode)
+            models.Index(fields=["device", "-occurred_at", "-alarm_id"], name="alarm_dev_occurred_idx"),
+            # (device, status) filters, e.g. acknowledged/closed history
+            models.Index(fields=["device", "status", "-occurred_at"], name="alarm_dev_status_idx"),
+            # occurred_at range scans across devices (export)
+            models.Index(fields=["occurred_at"], name="alarm_occurred_idx"),
+            # open alarms only: small and hot (alarm status polling)
+            models.Index(
+                fields=["device", "-occurred_at"],
+                name="alarm_open_dev_idx",
+                condition=models.Q(status="open"),
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device", "event_id"],
+                condition=models.Q(event_id__isnull=False),
+                name="alarm_device_event_uniq",
+            ),
+        ]
@@ -18,3 +18,9 @@ class RoleDeviceOrAdmin(BasePermission):
         if v in (ROLE_ORDER["device"], ROLE_ORDER["admin"]):
             return True
         raise PermissionDenied()
+
+def ensure_own_device(request: Request, device_id: str) -> None:
+    """A per-device key may only write for its own device (admin / shared key: any device)."""
+    bound = getattr(getattr(request, "user", None), "device_id", None)
+    if bound is not None and bound != device_id:
+        raise PermissionDenied("API key is bound to another device")
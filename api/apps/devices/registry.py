@@ -0,0 +1,75 @@
+"""Process-local registry of known device ids.
+
+Ingestion checks `device_id` against this set instead of querying `devices`
+per request or per row. The set is loaded with one query and reloaded when the
+shared DEVICES data version (apps.common.cache) changes -- `create_device` and
+`delete_device` bump it -- or after DEVICE_REGISTRY_TTL seconds. The version is
+read once per `known_devices()` call, so callers take one snapshot per
+request / batch and check every row against it.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import AbstractSet, Any, Callable, Dict, FrozenSet, Optional
+
+from django.conf import settings  # type: ignore
+from django.http import Http404  # type: ignore
+from rest_framework.exceptions import ValidationError  # type: ignore
+
+from apps.common.cache import DEVICES, data_versions
+from apps.common.ingest import RowError
+
+from .models import Device
+from .permissions import ensure_own_device
+
+_lock = threading.Lock()
+_ids: Optional[FrozenSet[str]] = None
+_version: Optional[str] = None
+_loaded_at = 0.0
+
+def known_devices() -> FrozenSet[str]:
+    global _ids, _version, _loaded_at
+    version = data_versions([DEVICES])[DEVICES]
+    with _lock:
+        fresh = time.monotonic() - _loaded_at < settings.DEVICE_REGISTRY_TTL
+        if _ids is not None and _version == version and fresh:
+            return _ids
+    ids = frozenset(Device.objects.values_list("id", flat=True))
+    with _lock:
+        _ids, _version, _loaded_at = ids, version, time.monotonic()
+    return ids
+
+def require_known(device_id: str) -> None:
+    if device_id not in known_devices():
+        raise Http404()
+
+def clear() -> None:
+    global _ids, _version
+    with _lock:
+        _ids, _version = None, None
+
+def bound_device(request) -> Optional[str]:
+    """device_id of a per-device key principal (None for admin / shared device key)."""
+    return getattr(getattr(request, "user", None), "device_id", None)
+
+def ensure_device(request, device_id: str) -> None:
+    """Single-record ingestion: 403 when the key belongs to another device, 400 for unknown ids."""
+    ensure_own_device(request, device_id)
+    if device_id not in known_devices():
+        raise ValidationError({"device_id": ["unknown device"]})
+
+def scoped(
+    validate: Callable[[Any], Dict[str, Any]],
+    known: AbstractSet[str],
+    bound: Optional[str] = None,
+) -> Callable[[Any], Dict[str, Any]]:
+    """Wrap a row validator so rows for unknown (or, with `bound`, other) devices are rejected."""
+    def check(row: Any) -> Dict[str, Any]:
+        data = validate(row)
+        device_id = data["device_id"]
+        if bound is not None and device_id != bound:
+            raise RowError("device_id", "API key is bound to another device")
+        if device_id not in known:
+            raise RowError("device_id", "unknown device")
+        return data
+    return check
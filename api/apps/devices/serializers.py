@@ -1,16 +1,40 @@
+from typing import Any, Dict, Optional
 from rest_framework import serializers  # type: ignore
-from .models import Device, BatteryStatus, Alarm
+from apps.common.ingest import (
+    RowError,
+    optional_datetime,
+    optional_str,
+    require_bool,
+    require_choice,
+    require_int,
+    require_str,
+)
+from apps.common.rows import RowSerializer
+from .models import Device, DeviceApiKey, BatteryStatus, Alarm
 
 class DeviceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Device
         fields = ["id", "name", "status", "created_at", "updated_at"]
 
+# values()-based DeviceSerializer for list responses
+DEVICE_ROWS = RowSerializer(DeviceSerializer)
+
 class CreateDeviceRequestSerializer(serializers.Serializer):
     id = serializers.CharField(max_length=64)
     name = serializers.CharField(max_length=255)
     status = serializers.ChoiceField(choices=[c[0] for c in Device.STATUS_CHOICES], required=False)
 
+class DeviceApiKeySerializer(serializers.ModelSerializer):
+    device_id = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = DeviceApiKey
+        fields = ["id", "device_id", "key_prefix", "label", "created_at", "revoked_at"]
+
+class CreateDeviceApiKeyRequestSerializer(serializers.Serializer):
+    label = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
 class BatteryUpdateRequestSerializer(serializers.Serializer):
     percent = serializers.IntegerField(min_value=0, max_value=100)
     voltage_mv = serializers.IntegerField(required=False, allow_null=True)
@@ -28,15 +52,58 @@ class AlarmCreateRequestSerializer(serializers.Serializer):
     message = serializers.CharField()
     severity = serializers.ChoiceField(choices=[c[0] for c in Alarm.SEVERITY_CHOICES], required=False, allow_null=True)
     occurred_at = serializers.DateTimeField(required=False)
+    event_id = serializers.CharField(max_length=64, required=False, allow_null=True)
 
 class AlarmItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alarm
         fields = ["alarm_id", "type", "message", "status", "occurred_at"]
 
+ALARM_ITEM_ROWS = RowSerializer(AlarmItemSerializer)
+
 class AlarmStatusSerializer(serializers.Serializer):
     device_id = serializers.CharField()
     has_active_alarm = serializers.BooleanField()
     severity = serializers.CharField(allow_null=True, required=False)
     last_alarm_at = serializers.DateTimeField(allow_null=True, required=False)
     active_alarms = AlarmItemSerializer(many=True, required=False, allow_null=True)
+
+class FleetBatterySerializer(serializers.Serializer):
+    percent = serializers.IntegerField()
+    voltage_mv = serializers.IntegerField(allow_null=True)
+    is_charging = serializers.BooleanField()
+    updated_at = serializers.DateTimeField()
+
+class FleetAlarmSummarySerializer(serializers.Serializer):
+    has_active_alarm = serializers.BooleanField()
+    open_alarms = serializers.IntegerField()
+    severity = serializers.CharField(allow_null=True)
+    last_alarm_at = serializers.DateTimeField(allow_null=True)
+
+class FleetDeviceSerializer(serializers.Serializer):
+    device_id = serializers.CharField()
+    name = serializers.CharField()
+    status = serializers.CharField()
+    battery = FleetBatterySerializer(allow_null=True)
+    alarm = FleetAlarmSummarySerializer()
+
+def validate_battery_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fast-path equivalent of BatteryUpdateRequestSerializer (MQTT ingestion)."""
+    percent = require_int(row, "percent", min_value=0)
+    if percent > 100:
+        raise RowError("percent", "Ensure this value is less than or equal to 100.")
+    voltage_mv: Optional[int] = None
+    if row.get("voltage_mv") is not None:
+        voltage_mv = require_int(row, "voltage_mv")
+    return {"percent": percent, "voltage_mv": voltage_mv, "is_charging": require_bool(row, "is_charging")}
+
+def validate_alarm_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fast-path equivalent of AlarmCreateRequestSerializer (MQTT ingestion)."""
+    severity = row.get("severity")
+    return {
+        "type": require_choice(row, "type", [c[0] for c in Alarm.TYPE_CHOICES]),
+        "message": require_str(row, "message", None),
+        "severity": None if severity is None else require_choice(row, "severity", [c[0] for c in Alarm.SEVERITY_CHOICES]),
+        "occurred_at": optional_datetime(row, "occurred_at"),
+        "event_id": optional_str(row, "event_id", 64) or None,
+    }
@@ -1,10 +1,26 @@
 from __future__ import annotations
-from typing import Any, Dict, Tuple, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from django.conf import settings  # type: ignore
 from django.db import transaction  # type: ignore
 from django.shortcuts import get_object_or_404  # type: ignore
+from django.db.models import Case, Count, IntegerField, Max, Q, Value, When  # type: ignore
+from django.db.models.functions import Coalesce  # type: ignore
+from django.http import Http404  # type: ignore
 from django.utils import timezone  # type: ignore
 
+from apps.common.cache import DEVICES, bump
+from apps.common.conditional import Validator
+from apps.common import events
+from apps.common.ingest import insert_once
+from apps.common.pagination import paginate_keyset
+from . import keys, registry
 from .models import Device, BatteryStatus, Alarm
+from .serializers import AlarmItemSerializer, BatteryLatestSerializer
+
+DEVICE_CURSOR_ORDERING = ("id",)
+ALARM_CURSOR_ORDERING = ("-occurred_at", "-alarm_id")
+# characters of an alarm message kept in a live event that is too large for NOTIFY (JSON escapes to <= 6 bytes each)
+ALARM_EVENT_MESSAGE_MAX = 500
 
 @transaction.atomic
 def create_device(data: Dict[str, Any]) -> Device:
@@ -13,31 +29,45 @@ def create_device(data: Dict[str, Any]) -> Device:
         name=data["name"],
         status=data.get("status", Device.STATUS_ACTIVE),
     )
+    bump(DEVICES)
     return device
 
-def list_devices(page: int, page_size: int) -> Tuple[list[Device], int]:
+def devices_queryset(fields: Sequence[str] = ()):
+    """Devices in list order; `values(*fields)` rows instead of instances when `fields` is given."""
     qs = Device.objects.all().order_by("id")
+    return qs.values(*fields) if fields else qs
+
+def list_devices(page: int, page_size: int, fields: Sequence[str] = ()) -> Tuple[list, int]:
+    qs = devices_queryset(fields)
     total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
     return list(qs[start:end]), total
 
+def list_devices_by_cursor(cursor: str, page_size: int, fields: Sequence[str] = ()) -> Tuple[list, Optional[str]]:
+    # same order as list_devices; the primary key is already a unique sort key
+    return paginate_keyset(devices_queryset(fields), DEVICE_CURSOR_ORDERING, cursor, page_size)
+
 @transaction.atomic
 def delete_device(device_id: str) -> None:
     device = get_object_or_404(Device, pk=device_id)
+    key_hashes = list(device.api_keys.values_list("key_hash", flat=True))
     device.delete()
+    keys.forget(*key_hashes)
+    bump(DEVICES)
 
 @transaction.atomic
 def upsert_battery(device_id: str, data: Dict[str, Any]) -> BatteryStatus:
-    device = get_object_or_404(Device, pk=device_id)
+    registry.require_known(device_id)
     obj, _ = BatteryStatus.objects.update_or_create(
-        device=device,
+        device_id=device_id,
         defaults={
             "percent": data["percent"],
             "voltage_mv": data.get("voltage_mv"),
             "is_charging": data["is_charging"],
         },
     )
+    events.publish("battery", device_id, BatteryLatestSerializer(obj).data)
     return obj
 
 def get_battery_latest(device_id: str) -> Optional[BatteryStatus]:
@@ -47,47 +77,199 @@ def get_battery_latest(device_id: str) -> Optional[BatteryStatus]:
     except BatteryStatus.DoesNotExist:
         return None
 
+async def aget_battery_latest(device_id: str) -> Optional[BatteryStatus]:
+    """`get_battery_latest` with the async ORM (the device lookup only runs when there is no battery row)."""
+    latest = await BatteryStatus.objects.filter(device_id=device_id).afirst()
+    if latest is None and not await Device.objects.filter(pk=device_id).aexists():
+        raise Http404()
+    return latest
+
 @transaction.atomic
+def record_alarm(device_id: str, data: Dict[str, Any]) -> Tuple[Alarm, bool]:
+    """Create an alarm; a replayed (device, event_id) returns the stored alarm."""
+    registry.require_known(device_id)
+    event_id = data.get("event_id") or None
+    alarm, created = insert_once(
+        Alarm(
+            device_id=device_id,
+            type=data["type"],
+            message=data["message"],
+            severity=data.get("severity"),
+            occurred_at=data.get("occurred_at") or timezone.now(),
+            status=Alarm.STATUS_OPEN,
+            event_id=event_id,
+        ),
+        {"device_id": device_id, "event_id": event_id} if event_id else None,
+    )
+    if created:
+        data = {"device_id": device_id, "severity": alarm.severity, **AlarmItemSerializer(alarm).data}
+        events.publish(
+            "alarm",
+            device_id,
+            data,
+            # a long message is cut for live delivery; the full alarm stays available over REST
+            fallback={**data, "message": data["message"][:ALARM_EVENT_MESSAGE_MAX], "truncated": True},
+        )
+    return alarm, created
+
 def create_alarm(device_id: str, data: Dict[str, Any]) -> Alarm:
-    device = get_object_or_404(Device, pk=device_id)
-    occurred_at = data.get("occurred_at") or timezone.now()
-    alarm = Alarm.objects.create(
-        device=device,
-        type=data["type"],
-        message=data["message"],
-        severity=data.get("severity"),
-        occurred_at=occurred_at,
-        status=Alarm.STATUS_OPEN,
+    return record_alarm(device_id, data)[0]
+
+SEVERITY_RANK = {Alarm.SEVERITY_INFO: 1, Alarm.SEVERITY_WARNING: 2, Alarm.SEVERITY_CRITICAL: 3}
+RANK_SEVERITY = {v: k for k, v in SEVERITY_RANK.items()}
+ACTIVE_ALARMS_LIMIT = 20
+
+def open_severity_rank(prefix: str = "alarms__"):
+    """Max over open alarms of CASE severity WHEN 'info' THEN 1 ... END (0 when none / no severity)."""
+    open_q = Q(**{f"{prefix}status": Alarm.STATUS_OPEN})
+    rank = Case(
+        *(When(open_q & Q(**{f"{prefix}severity": sev}), then=Value(r)) for sev, r in SEVERITY_RANK.items()),
+        default=Value(0),
+        output_field=IntegerField(),
     )
-    return alarm
+    return Coalesce(Max(rank), Value(0))
 
-def get_alarm_status(device_id: str) -> Dict[str, Any]:
-    device = get_object_or_404(Device, pk=device_id)
-    active_qs = device.alarms.filter(status=Alarm.STATUS_OPEN).order_by("-occurred_at")
-    has_active = active_qs.exists()
-    last_alarm = device.alarms.order_by("-occurred_at").first()
-    severity = None
-    if has_active:
-        sev_map = {Alarm.SEVERITY_INFO: 1, Alarm.SEVERITY_WARNING: 2, Alarm.SEVERITY_CRITICAL: 3}
-        # pick max severity among open alarms, if any
-        max_sev = 0
-        for a in active_qs[:20]:
-            v = sev_map.get(a.severity or "", 0)
-            if v > max_sev:
-                max_sev = v
-                severity = a.severity
+def alarm_summary_annotations(prefix: str = "alarms__") -> Dict[str, Any]:
+    """Per-device alarm summary as Device annotations (one grouped query)."""
+    return {
+        "open_alarms": Count(f"{prefix}pk", filter=Q(**{f"{prefix}status": Alarm.STATUS_OPEN})),
+        "severity_rank": open_severity_rank(prefix),
+        "last_alarm_at": Max(f"{prefix}occurred_at"),
+    }
+
+def _alarm_summary_queryset(device_id: str):
+    return (
+        Device.objects.filter(pk=device_id)
+        .annotate(**alarm_summary_annotations())
+        .values("open_alarms", "severity_rank", "last_alarm_at")
+    )
+
+def _active_alarms_queryset(device_id: str):
+    return Alarm.objects.filter(device_id=device_id, status=Alarm.STATUS_OPEN).order_by("-occurred_at")[:ACTIVE_ALARMS_LIMIT]
+
+def _alarm_status(device_id: str, summary: Dict[str, Any], active: List[Alarm]) -> Dict[str, Any]:
     return {
-        "device_id": device.id,
-        "has_active_alarm": has_active,
-        "severity": severity,
-        "last_alarm_at": last_alarm.occurred_at if last_alarm else None,
-        "active_alarms": list(active_qs[:20]),
+        "device_id": device_id,
+        "has_active_alarm": summary["open_alarms"] > 0,
+        "severity": RANK_SEVERITY.get(summary["severity_rank"]),
+        "last_alarm_at": summary["last_alarm_at"],
+        "active_alarms": active,
     }
 
-def list_alarm_items(device_id: str, page: int, page_size: int) -> Tuple[list[Alarm], int]:
+def get_alarm_status(device_id: str) -> Dict[str, Any]:
+    """Alarm status in two queries: one grouped summary, one for the newest open alarms (skipped if none)."""
+    summary = _alarm_summary_queryset(device_id).first()
+    if summary is None:
+        raise Http404()
+    active = list(_active_alarms_queryset(device_id)) if summary["open_alarms"] > 0 else []
+    return _alarm_status(device_id, summary, active)
+
+async def aget_alarm_status(device_id: str) -> Dict[str, Any]:
+    """`get_alarm_status` with the async ORM."""
+    summary = await _alarm_summary_queryset(device_id).afirst()
+    if summary is None:
+        raise Http404()
+    active = [a async for a in _active_alarms_queryset(device_id)] if summary["open_alarms"] > 0 else []
+    return _alarm_status(device_id, summary, active)
+
+def alarm_items_queryset(device_id: str, fields: Sequence[str] = ()):
+    """A device's alarms, newest first; `values(*fields)` rows when `fields` is given."""
     device = get_object_or_404(Device, pk=device_id)
-    qs = device.alarms.all().order_by("-occurred_at")
+    qs = device.alarms.all().order_by(*ALARM_CURSOR_ORDERING)
+    return qs.values(*fields) if fields else qs
+
+def list_alarm_items(device_id: str, page: int, page_size: int, fields: Sequence[str] = ()) -> Tuple[list, int]:
+    qs = alarm_items_queryset(device_id, fields)
     total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
     return list(qs[start:end]), total
+
+def list_alarm_items_by_cursor(
+    device_id: str, cursor: str, page_size: int, fields: Sequence[str] = (),
+) -> Tuple[list, Optional[str]]:
+    return paginate_keyset(alarm_items_queryset(device_id, fields), ALARM_CURSOR_ORDERING, cursor, page_size)
+
+def fleet_queryset(
+    status: Optional[str] = None,
+    low_battery: Optional[bool] = None,
+    has_active_alarm: Optional[bool] = None,
+):
+    """Devices with their battery row (JOIN) and alarm summary (GROUP BY) in one query, ordered by id."""
+    qs = Device.objects.select_related("battery_status").annotate(**alarm_summary_annotations()).order_by("id")
+    if status is not None:
+        qs = qs.filter(status=status)
+    if low_battery is not None:
+        low = Q(battery_status__percent__lt=settings.LOW_BATTERY_PERCENT)
+        qs = qs.filter(low) if low_battery else qs.exclude(low)
+    if has_active_alarm is not None:
+        qs = qs.filter(open_alarms__gt=0) if has_active_alarm else qs.filter(open_alarms=0)
+    return qs
+
+def fleet_items(devices) -> List[Dict[str, Any]]:
+    items = []
+    for d in devices:
+        try:
+            b = d.battery_status
+            battery = {
+                "percent": b.percent,
+                "voltage_mv": b.voltage_mv,
+                "is_charging": b.is_charging,
+                "updated_at": b.updated_at,
+            }
+        except BatteryStatus.DoesNotExist:
+            battery = None
+        items.append({
+            "device_id": d.id,
+            "name": d.name,
+            "status": d.status,
+            "battery": battery,
+            "alarm": {
+                "has_active_alarm": d.open_alarms > 0,
+                "open_alarms": d.open_alarms,
+                "severity": RANK_SEVERITY.get(d.severity_rank),
+                "last_alarm_at": d.last_alarm_at,
+            },
+        })
+    return items
+
+# Cheap validators for conditional GETs (ETag / Last-Modified), one query each.
+
+def devices_validator() -> Validator:
+    # count catches deletions, max(updated_at) catches inserts and updates
+    agg = Device.objects.aggregate(n=Count("id"), last=Max("updated_at"))
+    return (agg["n"], agg["last"]), None
+
+def _battery_updated_at(device_id: str):
+    return Device.objects.filter(pk=device_id).values_list("battery_status__updated_at", flat=True)
+
+def _battery_state(updated_at) -> Optional[Validator]:
+    return None if updated_at is None else ((updated_at,), updated_at)
+
+def battery_validator(device_id: str) -> Optional[Validator]:
+    return _battery_state(_battery_updated_at(device_id).first())
+
+async def abattery_validator(device_id: str) -> Optional[Validator]:
+    return _battery_state(await _battery_updated_at(device_id).afirst())
+
+def _alarms_state_queryset(device_id: str):
+    """Alarms are append-only through the API; the open count also covers status changes."""
+    return (
+        Device.objects.filter(pk=device_id)
+        .annotate(
+            n=Count("alarms"),
+            n_open=Count("alarms", filter=Q(alarms__status=Alarm.STATUS_OPEN)),
+            last_occurred=Max("alarms__occurred_at"),
+            last_created=Max("alarms__created_at"),
+        )
+        .values_list("n", "n_open", "last_occurred", "last_created")
+    )
+
+def _alarms_state(row) -> Optional[Validator]:
+    return None if row is None else (row, row[3])
+
+def alarms_validator(device_id: str) -> Optional[Validator]:
+    return _alarms_state(_alarms_state_queryset(device_id).first())
+
+async def aalarms_validator(device_id: str) -> Optional[Validator]:
+    return _alarms_state(await _alarms_state_queryset(device_id).afirst())
@@ -0,0 +1,69 @@
+"""/stream/devices : live alarm / battery updates as Server-Sent Events (ASGI only)."""
+from __future__ import annotations
+import asyncio
+from typing import AbstractSet, AsyncIterator, Optional
+
+from asgiref.sync import sync_to_async  # type: ignore
+from django.conf import settings  # type: ignore
+
+from apps.common import sse
+from apps.common.events import hub
+
+from . import registry
+
+TOPICS = ("alarm", "battery")
+
+async def device_frames(
+    topics: Optional[AbstractSet[str]],
+    device_ids: Optional[AbstractSet[str]],
+    max_seconds: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """SSE frames for matching events until `max_seconds` (EVENTS_STREAM_MAX_SECONDS) elapse.
+
+    `overflow` frames report events dropped from a full client buffer; the
+    client should reload the REST state it cares about.
+    """
+    # subscribe on the loop that iterates the response, not the one that ran the view
+    sub = hub.subscribe(topics, device_ids)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (max_seconds if max_seconds is not None else settings.EVENTS_STREAM_MAX_SECONDS)
+    try:
+        yield sse.retry(3000)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            event = await sub.get(min(settings.EVENTS_KEEPALIVE_SECONDS, remaining))
+            dropped = sub.take_dropped()
+            if dropped:
+                yield sse.frame("overflow", {"dropped": dropped})
+            if event is None:
+                yield sse.comment("keepalive")
+            else:
+                yield sse.frame(event.topic, event.data)
+    finally:
+        sub.close()
+
+async def device_stream(request):
+    """/stream/devices GET (一般≧, OpenAPI未記載)
+
+    フィルタ: device_id (カンマ区切り/複数指定), types (alarm,battery)
+    """
+    denied = await sse.authorize(request, "user")
+    if denied is not None:
+        return denied
+    topics = sse.parse_list_param(request.GET, "types")
+    unknown_topics = sorted(set(topics) - set(TOPICS))
+    if unknown_topics:
+        return sse.error_response(request, 400, "bad_request", "Bad request", [
+            {"field": "types", "reason": f"must be one of: {', '.join(TOPICS)}", "value": t} for t in unknown_topics
+        ])
+    device_ids = sse.parse_list_param(request.GET, "device_id")
+    if device_ids:
+        known = await sync_to_async(registry.known_devices)()
+        unknown = [d for d in device_ids if d not in known]
+        if unknown:
+            return sse.error_response(request, 400, "bad_request", "Bad request", [
+                {"field": "device_id", "reason": "unknown device", "value": d} for d in unknown
+            ])
+    return sse.event_stream(device_frames(frozenset(topics or TOPICS), frozenset(device_ids) or None))
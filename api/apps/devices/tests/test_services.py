@@ -1,4 +1,5 @@
 import pytest
+from datetime import timedelta
 from apps.devices import services
 from apps.devices.models import Device
 
@@ -8,3 +9,190 @@ def test_create_device():
     d = services.create_device({"id": "DEV001", "name": "X"})
     assert isinstance(d, Device)
     assert d.id == "DEV001"
+
+def test_alarm_items_cursor_walks_all_rows_once():
+    from django.utils import timezone
+    services.create_device({"id": "DEV002", "name": "Y"})
+    now = timezone.now()
+    created = set()
+    for i in range(5):
+        # two alarms share each timestamp to exercise the alarm_id tie-break
+        a = services.create_alarm("DEV002", {"type": "sensor_failure", "message": f"m{i}", "occurred_at": now - timedelta(minutes=i // 2)})
+        created.add(a.alarm_id)
+
+    seen, cursor, pages = [], "", 0
+    while cursor is not None:
+        items, cursor = services.list_alarm_items_by_cursor("DEV002", cursor, 2)
+        seen.extend(a.alarm_id for a in items)
+        pages += 1
+    assert pages == 3
+    assert len(seen) == 5 and set(seen) == created
+    page_mode, _ = services.list_alarm_items("DEV002", 1, 5)
+    assert [a.alarm_id for a in page_mode] == seen
+
+def test_row_serializers_match_model_serializers():
+    from decimal import Decimal
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+    from apps.common.renderers import FastJSONRenderer
+    from apps.devices.serializers import ALARM_ITEM_ROWS, DEVICE_ROWS, AlarmItemSerializer, DeviceSerializer
+
+    services.create_device({"id": "DEV003", "name": "Z\u2028"})
+    services.create_alarm("DEV003", {"type": "sensor_failure", "message": "m", "occurred_at": timezone.now()})
+    items, _ = services.list_alarm_items("DEV003", 1, 10, ALARM_ITEM_ROWS.fields)
+    expected = AlarmItemSerializer(services.alarm_items_queryset("DEV003"), many=True).data
+    assert ALARM_ITEM_ROWS.many(items) == expected
+    devices, _ = services.list_devices(1, 10, DEVICE_ROWS.fields)
+    assert DEVICE_ROWS.many(devices) == DeviceSerializer(services.devices_queryset(), many=True).data
+
+    body = {"items": expected, "when": timezone.now(), "price": Decimal("1.5"), "name": "Z\u2028"}
+    assert FastJSONRenderer().render(body) == JSONRenderer().render(body)
+
+def test_cursor_rejects_garbage():
+    from rest_framework.exceptions import ValidationError
+    with pytest.raises(ValidationError):
+        services.list_devices_by_cursor("not-a-cursor", 10)
+
+def test_alarm_status_summary_in_two_queries(django_assert_num_queries):
+    from django.http import Http404
+    from django.utils import timezone
+
+    services.create_device({"id": "DEV010", "name": "dev10"})
+    with django_assert_num_queries(1):
+        status = services.get_alarm_status("DEV010")
+    assert status["has_active_alarm"] is False and status["severity"] is None and status["last_alarm_at"] is None
+
+    now = timezone.now()
+    # the critical alarm is older than the 20 newest open alarms and still wins
+    services.create_alarm("DEV010", {"type": "sensor_failure", "message": "old", "severity": "critical",
+                                     "occurred_at": now - timedelta(days=1)})
+    for i in range(25):
+        services.create_alarm("DEV010", {"type": "battery_low", "message": f"m{i}", "severity": "info",
+                                         "occurred_at": now - timedelta(minutes=i)})
+    with django_assert_num_queries(2):
+        status = services.get_alarm_status("DEV010")
+    assert status["has_active_alarm"] is True
+    assert status["severity"] == "critical"
+    assert status["last_alarm_at"] == now
+    assert len(status["active_alarms"]) == 20 and status["active_alarms"][0].message == "m0"
+
+    with pytest.raises(Http404):
+        services.get_alarm_status("NOPE")
+
+def test_key_revocation_reaches_other_processes_through_the_shared_version():
+    from django.utils import timezone
+    from apps.common.cache import DEVICE_KEYS, bump
+    from apps.devices import keys
+    from apps.devices.models import DeviceApiKey
+
+    services.create_device({"id": "DEV007", "name": "K"})
+    rec, raw = keys.issue_key("DEV007")
+    assert keys.resolve(raw).device_id == "DEV007"
+    # another process revokes the key: the row changes and the shared version is bumped,
+    # but this process's cache entry is never popped
+    DeviceApiKey.objects.filter(pk=rec.pk).update(revoked_at=timezone.now())
+    assert keys.resolve(raw) is not None  # still trusted until the version changes
+    bump(DEVICE_KEYS)
+    assert keys.resolve(raw) is None
+
+    # deleting a device bumps the version as well
+    rec, raw = keys.issue_key("DEV007")
+    assert keys.resolve(raw) is not None
+    DeviceApiKey.objects.filter(pk=rec.pk).update(revoked_at=timezone.now())
+    services.create_device({"id": "DEV008", "name": "L"})
+    services.delete_device("DEV008")
+    assert keys.resolve(raw) is None
+
+def test_writes_publish_to_matching_subscribers_after_commit(django_capture_on_commit_callbacks):
+    import asyncio
+    from apps.common.events import hub
+
+    services.create_device({"id": "DEV004", "name": "W"})
+    services.create_device({"id": "DEV005", "name": "V"})
+    loop = asyncio.new_event_loop()
+    try:
+        async def subscribe():
+            return hub.subscribe(device_ids={"DEV004"}), hub.subscribe(topics={"alarm"}, maxsize=1)
+
+        mine, alarms = loop.run_until_complete(subscribe())
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            services.upsert_battery("DEV004", {"percent": 80, "is_charging": True})
+        assert loop.run_until_complete(mine.get(0.01)) is None  # nothing before commit
+        for cb in callbacks:
+            cb()
+        with django_capture_on_commit_callbacks(execute=True):
+            services.create_alarm("DEV005", {"type": "sensor_failure", "message": "a"})
+            services.create_alarm("DEV004", {"type": "sensor_failure", "message": "b", "event_id": "e1"})
+            services.create_alarm("DEV004", {"type": "sensor_failure", "message": "b", "event_id": "e1"})  # replay
+
+        got = [loop.run_until_complete(mine.get(0.01)) for _ in range(3)]
+        assert [(e.topic, e.device_id) for e in got[:2]] == [("battery", "DEV004"), ("alarm", "DEV004")]
+        assert got[0].data["percent"] == 80 and got[1].data["message"] == "b"
+        assert got[2] is None  # the replayed alarm is not published again
+
+        # bounded buffer: the oldest alarm was dropped for the slow subscriber
+        last = loop.run_until_complete(alarms.get(0.01))
+        assert last.device_id == "DEV004" and alarms.take_dropped() == 1
+        mine.close()
+        alarms.close()
+        assert len(hub) == 0
+    finally:
+        loop.close()
+
+def test_device_frames_filter_and_report_overflow(settings):
+    import asyncio
+    from apps.common.events import Event, hub
+    from apps.devices.streams import device_frames
+
+    settings.EVENTS_CLIENT_BUFFER = 2
+    settings.EVENTS_KEEPALIVE_SECONDS = 1
+
+    async def run():
+        frames = device_frames(frozenset({"battery"}), None, max_seconds=0.2)
+        out = [await frames.__anext__()]  # retry; the subscription now exists
+        hub.dispatch(Event("alarm", "D1", {"x": 0}))
+        for i in range(3):
+            hub.dispatch(Event("battery", "D1", {"x": i}))
+        out.extend([f async for f in frames])
+        return out
+
+    out = asyncio.run(run())
+    assert out[0] == "retry: 3000\n\n"
+    assert out[1] == 'event: overflow\ndata: {"dropped": 1}\n\n'
+    assert out[2:4] == ['event: battery\ndata: {"x": 1}\n\n', 'event: battery\ndata: {"x": 2}\n\n']
+    assert all(f == ": keepalive\n\n" for f in out[4:])
+    assert len(hub) == 0
+
+def test_postgres_events_stay_under_the_notify_limit(monkeypatch, caplog):
+    from apps.common import events
+    from apps.harvest import live
+
+    sent = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params):
+            sent.append(params[1])
+
+    monkeypatch.setattr(events, "connection", type("Conn", (), {"cursor": lambda self: Cursor()})())
+    monkeypatch.setattr(events, "_backend", events.PostgresNotifyBackend("test"))
+    monkeypatch.setattr(events.transaction, "on_commit", lambda fn: fn())
+
+    services.create_device({"id": "DEV006", "name": "N"})
+    services.create_alarm("DEV006", {"type": "sensor_failure", "message": "short"})
+    services.create_alarm("DEV006", {"type": "sensor_failure", "message": "あ" * 5000})
+    today = live.current_periods()["daily"]
+    live.publish_deltas({("daily", today, f"C{i}", "x" * 40): 1 for i in range(500)})
+    events.publish("alarm", "DEV006", {"message": "x" * 9000})
+
+    assert all(len(p.encode()) < 8000 for p in sent) and len(sent) == 3
+    short, long, harvest = (events.Event.from_json(p) for p in sent)
+    assert short.data["message"] == "short" and "truncated" not in short.data
+    assert long.data["truncated"] is True and long.data["message"] == "あ" * services.ALARM_EVENT_MESSAGE_MAX
+    assert harvest.data == {"kind": "reset"}
+    assert "alarm event of 9066 bytes dropped" in caplog.text
@@ -2,14 +2,22 @@ from django.urls import path  # type: ignore
 from .views import (
     DevicesListCreateView,
     DevicesDeleteView,
+    FleetDevicesView,
+    DeviceKeysView,
+    DeviceKeyRevokeView,
     DevicesBatteryView,
     DevicesAlermView,
     DevicesAlermDetailView,
 )
+from .streams import device_stream
 
 urlpatterns = [
     path("devices", DevicesListCreateView.as_view(), name="devices-list-create"),
+    path("fleet/devices", FleetDevicesView.as_view(), name="fleet-devices"),
+    path("stream/devices", device_stream, name="stream-devices"),
     path("devices/<str:deviceId>", DevicesDeleteView.as_view(), name="devices-delete"),
+    path("devices/<str:deviceId>/keys", DeviceKeysView.as_view(), name="devices-keys"),
+    path("devices/<str:deviceId>/keys/<uuid:keyId>", DeviceKeyRevokeView.as_view(), name="devices-key-revoke"),
     path("devices/<str:deviceId>/battery", DevicesBatteryView.as_view(), name="devices-battery"),
     path("devices/<str:deviceId>/alerm", DevicesAlermView.as_view(), name="devices-alerm"),
     path("devices/<str:deviceId>/alerm/detail", DevicesAlermDetailView.as_view(), name="devices-alerm-detail"),
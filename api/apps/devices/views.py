@@ -2,31 +2,49 @@ from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
 
+from apps.common.asyncviews import AsyncAPIView
+from apps.common.conditional import conditional_get
 from apps.common.responses import success_envelope
-from apps.common.pagination import parse_page_params
+from apps.common.pagination import cursor_body, paginate_queryset, parse_cursor_param, parse_page_params
+from apps.common.params import parse_bool_param, parse_choice_param
 from apps.common.permissions import RoleAdminOnly, RoleAtLeastUser
+from apps.common.renderers import stream_ndjson, streams_ndjson
 
 from .serializers import (
+    ALARM_ITEM_ROWS,
+    DEVICE_ROWS,
     DeviceSerializer,
     CreateDeviceRequestSerializer,
+    DeviceApiKeySerializer,
+    CreateDeviceApiKeyRequestSerializer,
     BatteryUpdateRequestSerializer,
     BatteryLatestSerializer,
     AlarmCreateRequestSerializer,
     AlarmItemSerializer,
     AlarmStatusSerializer,
+    FleetDeviceSerializer,
 )
-from . import services
-from .permissions import RoleDeviceOrAdmin
+from .models import Device
+from . import keys, services
+from .permissions import RoleDeviceOrAdmin, ensure_own_device
 
 class DevicesListCreateView(APIView):
     """/devices GET, POST (管理者≧)"""
     permission_classes = [RoleAdminOnly]
 
+    @conditional_get(lambda request: services.devices_validator())
     def get(self, request):
+        if streams_ndjson(request):
+            return stream_ndjson(request, services.devices_queryset(DEVICE_ROWS.fields), DEVICE_ROWS.many)
         page, page_size = parse_page_params(request.query_params)
-        items, total = services.list_devices(page, page_size)
+        cursor = parse_cursor_param(request.query_params)
+        if cursor is not None:
+            items, next_cursor = services.list_devices_by_cursor(cursor, page_size, DEVICE_ROWS.fields)
+            data = cursor_body(DEVICE_ROWS.many(items), page_size, next_cursor)
+            return Response(success_envelope(request, data), status=status.HTTP_200_OK)
+        items, total = services.list_devices(page, page_size, DEVICE_ROWS.fields)
         data = {
-            "items": DeviceSerializer(items, many=True).data,
+            "items": DEVICE_ROWS.many(items),
             "page": page,
             "page_size": page_size,
             "total": total,
@@ -39,6 +57,25 @@ class DevicesListCreateView(APIView):
         device = services.create_device(ser.validated_data)
         return Response(success_envelope(request, DeviceSerializer(device).data), status=status.HTTP_201_CREATED)
 
+class FleetDevicesView(APIView):
+    """/fleet/devices GET (一般≧, OpenAPI未記載)
+
+    デバイス一覧に最新バッテリーとアラーム要約を付けて返す（デバイスごとの battery/alerm 呼び出しの置き換え）。
+    フィルタ: status, low_battery, has_active_alarm
+    """
+    permission_classes = [RoleAtLeastUser]
+
+    def get(self, request):
+        page, page_size = parse_page_params(request.query_params)
+        qs = services.fleet_queryset(
+            status=parse_choice_param(request.query_params, "status", [c[0] for c in Device.STATUS_CHOICES]),
+            low_battery=parse_bool_param(request.query_params, "low_battery"),
+            has_active_alarm=parse_bool_param(request.query_params, "has_active_alarm"),
+        )
+        data = paginate_queryset(qs, page, page_size, map_page=services.fleet_items)
+        data["items"] = FleetDeviceSerializer(data["items"], many=True).data
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
+
 class DevicesDeleteView(APIView):
     """/devices/{deviceId} DELETE (管理者≧)"""
     permission_classes = [RoleAdminOnly]
@@ -48,7 +85,33 @@ class DevicesDeleteView(APIView):
         data = {"deleted": True, "device_id": deviceId}
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class DevicesBatteryView(APIView):
+class DeviceKeysView(APIView):
+    """/devices/{deviceId}/keys GET, POST (管理者≧, OpenAPI未記載)
+
+    POST の応答にだけ平文の `key` を含める（以後は取得不可）。
+    """
+    permission_classes = [RoleAdminOnly]
+
+    def get(self, request, deviceId: str):
+        data = DeviceApiKeySerializer(keys.list_keys(deviceId), many=True).data
+        return Response(success_envelope(request, {"items": data}), status=status.HTTP_200_OK)
+
+    def post(self, request, deviceId: str):
+        ser = CreateDeviceApiKeyRequestSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        rec, raw = keys.issue_key(deviceId, ser.validated_data.get("label", ""))
+        data = {**DeviceApiKeySerializer(rec).data, "key": raw}
+        return Response(success_envelope(request, data), status=status.HTTP_201_CREATED)
+
+class DeviceKeyRevokeView(APIView):
+    """/devices/{deviceId}/keys/{keyId} DELETE (管理者≧, OpenAPI未記載)"""
+    permission_classes = [RoleAdminOnly]
+
+    def delete(self, request, deviceId: str, keyId: str):
+        rec = keys.revoke_key(deviceId, keyId)
+        return Response(success_envelope(request, DeviceApiKeySerializer(rec).data), status=status.HTTP_200_OK)
+
+class DevicesBatteryView(AsyncAPIView):
     """/devices/{deviceId}/battery GET (一般≧), POST (TBD)"""
 
     def get_permissions(self):
@@ -56,8 +119,9 @@ class DevicesBatteryView(APIView):
             return [RoleAtLeastUser()]
         return [RoleDeviceOrAdmin()]
 
-    def get(self, request, deviceId: str):
-        latest = services.get_battery_latest(deviceId)
+    @conditional_get(lambda request, deviceId: services.abattery_validator(deviceId))
+    async def get(self, request, deviceId: str):
+        latest = await services.aget_battery_latest(deviceId)
         if latest is None:
             data = {
                 "device_id": deviceId,
@@ -82,6 +146,7 @@ class DevicesBatteryView(APIView):
     def post(self, request, deviceId: str):
         ser = BatteryUpdateRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
+        ensure_own_device(request, deviceId)
         latest = services.upsert_battery(deviceId, ser.validated_data)
         data = {
             "device_id": deviceId,
@@ -92,7 +157,7 @@ class DevicesBatteryView(APIView):
         }
         return Response(success_envelope(request, data), status=status.HTTP_201_CREATED)
 
-class DevicesAlermView(APIView):
+class DevicesAlermView(AsyncAPIView):
     """/devices/{deviceId}/alerm GET (一般≧), POST (TBD)"""
 
     def get_permissions(self):
@@ -100,8 +165,9 @@ class DevicesAlermView(APIView):
             return [RoleAtLeastUser()]
         return [RoleDeviceOrAdmin()]
 
-    def get(self, request, deviceId: str):
-        status_dict = services.get_alarm_status(deviceId)
+    @conditional_get(lambda request, deviceId: services.aalarms_validator(deviceId))
+    async def get(self, request, deviceId: str):
+        status_dict = await services.aget_alarm_status(deviceId)
         data = {
             "device_id": status_dict["device_id"],
             "has_active_alarm": status_dict["has_active_alarm"],
@@ -114,18 +180,29 @@ class DevicesAlermView(APIView):
     def post(self, request, deviceId: str):
         ser = AlarmCreateRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        alarm = services.create_alarm(deviceId, ser.validated_data)
-        return Response(success_envelope(request, AlarmItemSerializer(alarm).data), status=status.HTTP_201_CREATED)
+        ensure_own_device(request, deviceId)
+        alarm, created = services.record_alarm(deviceId, ser.validated_data)
+        code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(success_envelope(request, AlarmItemSerializer(alarm).data), status=code)
 
 class DevicesAlermDetailView(APIView):
     """/devices/{deviceId}/alerm/detail GET (一般≧)"""
     permission_classes = [RoleAtLeastUser]
 
+    @conditional_get(lambda request, deviceId: services.alarms_validator(deviceId))
     def get(self, request, deviceId: str):
+        if streams_ndjson(request):
+            qs = services.alarm_items_queryset(deviceId, ALARM_ITEM_ROWS.fields)
+            return stream_ndjson(request, qs, ALARM_ITEM_ROWS.many)
         page, page_size = parse_page_params(request.query_params)
-        items, total = services.list_alarm_items(deviceId, page, page_size)
+        cursor = parse_cursor_param(request.query_params)
+        if cursor is not None:
+            items, next_cursor = services.list_alarm_items_by_cursor(deviceId, cursor, page_size, ALARM_ITEM_ROWS.fields)
+            data = cursor_body(ALARM_ITEM_ROWS.many(items), page_size, next_cursor)
+            return Response(success_envelope(request, data), status=status.HTTP_200_OK)
+        items, total = services.list_alarm_items(deviceId, page, page_size, ALARM_ITEM_ROWS.fields)
         data = {
-            "items": AlarmItemSerializer(items, many=True).data,
+            "items": ALARM_ITEM_ROWS.many(items),
             "page": page,
             "page_size": page_size,
             "total": total,
@@ -0,0 +1,238 @@
+"""Live harvest counters for the dashboard stream (/stream/harvest).
+
+Writers (any process) publish small `harvest` events through apps.common.events
+once their transaction commits:
+
+- `delta`   : rollup deltas, limited to the current day / week / month
+- `override`: a PATCHed category total for a period
+- `target`  : an updated HarvestTarget
+- `reset`   : rollups were rebuilt; reload everything
+
+The ASGI process keeps one `Counters` per process, seeded from HarvestRollup /
+overrides / targets (3 queries) when the first client connects, and applies
+the events to it. Clients get full snapshots, coalesced to at most one per
+HARVEST_STREAM_MIN_INTERVAL_MS, so a burst of ingestion costs one frame.
+
+Counters are reseeded when the day rolls over, when the internal subscription
+overflowed, and every HARVEST_STREAM_RESEED_SECONDS, which also corrects a delta
+counted twice because it committed while a seed query was running.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async  # type: ignore
+from django.conf import settings  # type: ignore
+from django.db.models import Q  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from apps.common import events
+from apps.common.events import hub
+from apps.common.periods import PERIOD_DAILY, PERIOD_MONTHLY, PERIOD_WEEKLY, period_of
+
+from .models import HarvestAggregateOverride, HarvestRollup, HarvestTarget
+
+logger = logging.getLogger(__name__)
+
+TOPIC = "harvest"
+LIVE_PERIODS = (PERIOD_DAILY, PERIOD_WEEKLY, PERIOD_MONTHLY)
+
+def current_periods(now=None) -> Dict[str, str]:
+    now = now or timezone.now()
+    return {pt: period_of(pt, now) for pt in LIVE_PERIODS}
+
+# --- writer side -----------------------------------------------------------
+
+def publish_deltas(deltas: Dict[Tuple[str, str, str, str], int]) -> None:
+    """Publish rollup deltas (see rollups.deltas_for) that touch the current periods."""
+    current = current_periods()
+    rows = [
+        [pt, period, cid, cname, n]
+        for (pt, period, cid, cname), n in deltas.items()
+        if current.get(pt) == period and n
+    ]
+    if rows:
+        # a bulk insert over many categories may not fit in one notification: reseed instead
+        events.publish(TOPIC, None, {"kind": "delta", "deltas": rows}, fallback={"kind": "reset"})
+
+def publish_override(period_type: str, period: str, category_id: str, total_count: int) -> None:
+    if current_periods().get(period_type) == period:
+        events.publish(TOPIC, None, {
+            "kind": "override", "period_type": period_type, "period": period,
+            "category_id": category_id, "total_count": total_count,
+        })
+
+def publish_target(target_type: str, target_count: int) -> None:
+    events.publish(TOPIC, None, {"kind": "target", "target_type": target_type, "target_count": target_count})
+
+def publish_reset() -> None:
+    events.publish(TOPIC, None, {"kind": "reset"})
+
+# --- counters --------------------------------------------------------------
+
+class Counters:
+    """Running totals for the current periods. Not thread-safe: owned by the stream loop."""
+
+    def __init__(self):
+        self.periods: Dict[str, str] = {}
+        # (period_type, category_id) -> [category_name, raw total]
+        self._categories: Dict[Tuple[str, str], List[Any]] = {}
+        self._overrides: Dict[Tuple[str, str], int] = {}
+        self._targets: Dict[str, int] = {}
+
+    def seed(self, now=None) -> None:
+        periods = current_periods(now)
+        current = Q()
+        for pt, period in periods.items():
+            current |= Q(period_type=pt, period=period)
+        categories: Dict[Tuple[str, str], List[Any]] = {}
+        rows = HarvestRollup.objects.filter(current).values_list("period_type", "category_id", "category_name", "total_count")
+        for pt, cid, cname, total in rows:
+            self._add(categories, pt, cid, cname, int(total))
+        self._categories = categories
+        self._overrides = {
+            (pt, cid): total
+            for pt, cid, total in HarvestAggregateOverride.objects.filter(current).values_list("period_type", "category_id", "total_count")
+        }
+        self._targets = dict(HarvestTarget.objects.values_list("target_type", "target_count"))
+        self.periods = periods
+
+    @staticmethod
+    def _add(categories, period_type: str, category_id: str, category_name: str, n: int) -> None:
+        entry = categories.setdefault((period_type, category_id), [category_name or None, 0])
+        if category_name and not entry[0]:
+            entry[0] = category_name
+        entry[1] += n
+
+    def apply(self, data: Dict[str, Any]) -> bool:
+        """Apply one event payload; False when the counters must be reseeded instead."""
+        kind = data.get("kind")
+        if kind == "delta":
+            for pt, period, cid, cname, n in data["deltas"]:
+                if self.periods.get(pt) == period:
+                    self._add(self._categories, pt, cid, cname, int(n))
+            return True
+        if kind == "override":
+            if self.periods.get(data["period_type"]) == data["period"]:
+                self._overrides[(data["period_type"], data["category_id"])] = int(data["total_count"])
+            return True
+        if kind == "target":
+            self._targets[data["target_type"]] = int(data["target_count"])
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per period: raw total (as /harvest/amount/*), per-category totals (overrides applied) and target progress."""
+        out: Dict[str, Any] = {}
+        for pt in LIVE_PERIODS:
+            total = 0
+            categories = []
+            for (cpt, cid), (cname, raw) in sorted(self._categories.items()):
+                if cpt != pt:
+                    continue
+                total += raw
+                categories.append({
+                    "category_id": cid,
+                    "category_name": cname,
+                    "total_count": self._overrides.get((pt, cid), raw),
+                })
+            target = self._targets.get(pt)
+            out[pt] = {
+                "period": self.periods.get(pt),
+                "total_count": total,
+                "target_count": target,
+                "progress": round(total / target, 4) if target else None,
+                "categories": categories,
+            }
+        return out
+
+# --- broadcaster -----------------------------------------------------------
+
+class LiveHarvest:
+    """Feeds the per-process Counters from the hub and hands out coalesced snapshots."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self.version = 0
+        self.snapshot: Optional[Dict[str, Any]] = None
+
+    async def start(self) -> None:
+        """Start the updater on the running loop (once) and wait for the first snapshot."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._changed = asyncio.Event()
+            self.version, self.snapshot = 0, None
+            self._task = loop.create_task(self._run())
+        while self.snapshot is None:
+            if self._task.done():
+                self._task.result()  # re-raise why seeding failed
+            await self.wait(self.version, 1.0)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait(self, seen: int, timeout: float) -> bool:
+        """True once a snapshot newer than version `seen` is available."""
+        if self.version > seen:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.version > seen
+
+    def _publish(self, snapshot: Dict[str, Any]) -> None:
+        self.snapshot = snapshot
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = settings.HARVEST_STREAM_MIN_INTERVAL_MS / 1000
+        # subscribe before seeding so nothing committed after the seed is missed
+        sub = hub.subscribe(frozenset({TOPIC}), maxsize=settings.HARVEST_STREAM_BUFFER)
+        counters = Counters()
+        try:
+            while True:
+                await sync_to_async(counters.seed)()
+                seeded_at = loop.time()
+                self._publish(counters.snapshot())
+                last_sent, dirty = loop.time(), False
+                while True:
+                    now = loop.time()
+                    if now - seeded_at >= settings.HARVEST_STREAM_RESEED_SECONDS:
+                        break
+                    if counters.periods != current_periods():
+                        break
+                    if dirty and now - last_sent >= interval:
+                        self._publish(counters.snapshot())
+                        last_sent, dirty = now, False
+                    timeout = max(interval - (now - last_sent), 0.01) if dirty else interval
+                    event = await sub.get(timeout)
+                    if sub.take_dropped():
+                        break
+                    if event is None:
+                        continue
+                    if not counters.apply(event.data):
+                        break
+                    dirty = True
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("live harvest counters stopped")
+            raise
+        finally:
+            sub.close()
+
+live = LiveHarvest()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+
+from apps.harvest import rollups
+
+class Command(BaseCommand):
+    """Rebuild or verify harvest rollups from raw HarvestRecord rows.
+
+    - rebuild: recompute and replace every rollup row (run after migrate / repair)
+    - verify : compare rollups with raw records; exits non-zero on mismatch (cron)
+    """
+    help = "Rebuild or verify harvest_rollups from harvest_records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["rebuild", "verify"])
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--show", type=int, default=20, help="max mismatches to print (verify)")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["action"] == "rebuild":
+            n = rollups.rebuild(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"rebuilt {n} rollup rows"))
+            return
+
+        mismatches = rollups.verify(batch_size=batch_size)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("harvest rollups are consistent"))
+            return
+        for m in mismatches[: options["show"]]:
+            self.stderr.write(f"{m.key}: expected={m.expected} actual={m.actual}")
+        raise CommandError(f"{len(mismatches)} harvest rollup rows are inconsistent")
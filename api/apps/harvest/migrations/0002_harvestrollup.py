@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+def backfill_rollups(apps, schema_editor):
+    # same bucketing as `harvest_rollups rebuild`, over the historical model
+    from apps.harvest.rollups import compute_from_raw
+
+    HarvestRecord = apps.get_model("harvest_api", "HarvestRecord")
+    HarvestRollup = apps.get_model("harvest_api", "HarvestRollup")
+    HarvestRollup.objects.bulk_create(
+        [
+            HarvestRollup(period_type=pt, period=p, category_id=cid, category_name=cname, total_count=total)
+            for (pt, p, cid, cname), total in compute_from_raw(record_model=HarvestRecord).items()
+        ],
+        batch_size=2000,
+    )
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("harvest_api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HarvestRollup",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False, auto_created=True, verbose_name="ID")),
+                ("period_type", models.CharField(choices=[("daily","daily"),("weekly","weekly"),("monthly","monthly")], max_length=16)),
+                ("period", models.CharField(max_length=16)),
+                ("category_id", models.CharField(max_length=32, blank=True, default="")),
+                ("category_name", models.CharField(max_length=255, blank=True, default="")),
+                ("total_count", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={"db_table":"harvest_rollups","unique_together":{("period_type","period","category_id","category_name")}},
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
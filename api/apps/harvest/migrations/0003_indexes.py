@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("harvest_api", "0002_harvestrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="harvestrecord",
+            index=models.Index(fields=["category_id", "-occurred_at"], name="harvest_cat_occurred_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="harvestrecord",
+            index=models.Index(fields=["occurred_at"], name="harvest_occurred_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="harvestrollup",
+            index=models.Index(fields=["period_type", "category_id", "-period"], name="harvest_rollup_cat_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("harvest_api", "0003_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="harvestrecord",
+            name="event_id",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="harvestrecord",
+            constraint=models.UniqueConstraint(condition=models.Q(("event_id__isnull", False)), fields=("device_id", "event_id"), name="harvest_device_event_uniq"),
+        ),
+    ]
@@ -9,12 +9,27 @@ class HarvestRecord(models.Model):
     category_name = models.CharField(max_length=255, null=True, blank=True)
     count = models.IntegerField()
     occurred_at = models.DateTimeField()
+    # client-supplied id (unique per device) so retried uploads are not double counted
+    event_id = models.CharField(max_length=64, null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "harvest_records"
         ordering = ["-occurred_at"]
+        indexes = [
+            # category listings / revenue per category, newest first
+            models.Index(fields=["category_id", "-occurred_at"], name="harvest_cat_occurred_idx"),
+            # occurred_at range scans (aggregation, rebuild, export)
+            models.Index(fields=["occurred_at"], name="harvest_occurred_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device_id", "event_id"],
+                condition=models.Q(event_id__isnull=False),
+                name="harvest_device_event_uniq",
+            ),
+        ]
 
 class HarvestAggregateOverride(models.Model):
     PERIOD_DAILY = "daily"
@@ -56,3 +71,32 @@ class HarvestTarget(models.Model):
 
     class Meta:
         db_table = "harvest_targets"
+
+class HarvestRollup(models.Model):
+    """SUM(count) per (period_type, period, category), maintained on insert.
+
+    NULL category_id / category_name are stored as "" so the unique key works
+    on every backend.
+    """
+    PERIOD_DAILY = "daily"
+    PERIOD_WEEKLY = "weekly"
+    PERIOD_MONTHLY = "monthly"
+    PERIOD_CHOICES = [
+        (PERIOD_DAILY, "daily"),
+        (PERIOD_WEEKLY, "weekly"),
+        (PERIOD_MONTHLY, "monthly"),
+    ]
+
+    period_type = models.CharField(max_length=16, choices=PERIOD_CHOICES)
+    period = models.CharField(max_length=16)
+    category_id = models.CharField(max_length=32, blank=True, default="")
+    category_name = models.CharField(max_length=255, blank=True, default="")
+    total_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "harvest_rollups"
+        unique_together = ("period_type", "period", "category_id", "category_name")
+        indexes = [
+            models.Index(fields=["period_type", "category_id", "-period"], name="harvest_rollup_cat_idx"),
+        ]
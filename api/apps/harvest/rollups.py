@@ -0,0 +1,115 @@
+"""Incrementally maintained harvest rollups (daily/weekly/monthly x category).
+
+`add_record` applies per-bucket deltas in the same transaction as the raw
+insert, so `HarvestRollup` always matches `SUM(count)` over `HarvestRecord`.
+`rebuild()` / `verify()` recompute the rollups from raw records for repair and
+cron-driven consistency checks.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db import IntegrityError, connection, transaction  # type: ignore
+from django.db.models import F, Sum  # type: ignore
+
+from apps.common.cache import HARVEST, bump
+from apps.common.periods import period_annotations, period_from_row, period_keys, period_of
+
+from .models import HarvestRecord, HarvestRollup
+from . import live
+
+ROLLUP_PERIODS = (HarvestRollup.PERIOD_DAILY, HarvestRollup.PERIOD_WEEKLY, HarvestRollup.PERIOD_MONTHLY)
+
+# (period_type, period, category_id, category_name)
+RollupKey = Tuple[str, str, str, str]
+
+@dataclass(frozen=True)
+class RollupMismatch:
+    key: RollupKey
+    expected: int
+    actual: int
+
+def deltas_for(records: Iterable[Tuple[datetime, Optional[str], Optional[str], int]]) -> Dict[RollupKey, int]:
+    """Fold (occurred_at, category_id, category_name, count) tuples into rollup deltas."""
+    deltas: Dict[RollupKey, int] = {}
+    for occurred_at, category_id, category_name, count in records:
+        for period_type in ROLLUP_PERIODS:
+            key = (period_type, period_of(period_type, occurred_at), category_id or "", category_name or "")
+            deltas[key] = deltas.get(key, 0) + int(count)
+    return deltas
+
+def apply_deltas(deltas: Dict[RollupKey, int]) -> None:
+    """Upsert counters: UPDATE ... SET total_count = total_count + n, INSERT when missing."""
+    if deltas:
+        bump(HARVEST)
+        live.publish_deltas(deltas)
+    for (period_type, period, category_id, category_name), n in deltas.items():
+        lookup = {
+            "period_type": period_type,
+            "period": period,
+            "category_id": category_id,
+            "category_name": category_name,
+        }
+        if HarvestRollup.objects.filter(**lookup).update(total_count=F("total_count") + n):
+            continue
+        try:
+            with transaction.atomic():
+                HarvestRollup.objects.create(total_count=n, **lookup)
+        except IntegrityError:
+            # a concurrent writer created the row first
+            HarvestRollup.objects.filter(**lookup).update(total_count=F("total_count") + n)
+
+def compute_from_raw(batch_size: int = 2000, record_model=HarvestRecord) -> Dict[RollupKey, int]:
+    """Recompute rollups from HarvestRecord.
+
+    Uses one grouped query per period type and streams the grouped rows, so
+    memory is bounded by the number of buckets, not the number of records.
+    `record_model` lets migrations pass their historical model.
+    """
+    expected: Dict[RollupKey, int] = {}
+    for period_type in ROLLUP_PERIODS:
+        rows = (
+            record_model.objects.annotate(**period_annotations(period_type))
+            .values(*period_keys(period_type), "category_id", "category_name")
+            .annotate(total_count=Sum("count"))
+            .order_by()
+        )
+        for r in rows.iterator(chunk_size=batch_size):
+            key = (period_type, period_from_row(period_type, r), r["category_id"] or "", r["category_name"] or "")
+            expected[key] = expected.get(key, 0) + int(r["total_count"])
+    return expected
+
+def current_rollups(batch_size: int = 2000) -> Dict[RollupKey, int]:
+    actual: Dict[RollupKey, int] = {}
+    rows = HarvestRollup.objects.values_list("period_type", "period", "category_id", "category_name", "total_count")
+    for period_type, period, category_id, category_name, total in rows.iterator(chunk_size=batch_size):
+        actual[(period_type, period, category_id, category_name)] = int(total)
+    return actual
+
+def verify(batch_size: int = 2000) -> List[RollupMismatch]:
+    expected = compute_from_raw(batch_size)
+    actual = current_rollups(batch_size)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        e, a = expected.get(key, 0), actual.get(key, 0)
+        if e != a:
+            mismatches.append(RollupMismatch(key=key, expected=e, actual=a))
+    return mismatches
+
+@transaction.atomic
+def rebuild(batch_size: int = 2000) -> int:
+    """Replace every rollup row with values recomputed from raw records."""
+    if connection.vendor == "postgresql":
+        # block concurrent inserts so no delta is lost between recompute and swap
+        with connection.cursor() as cur:
+            cur.execute(f"LOCK TABLE {HarvestRecord._meta.db_table} IN SHARE MODE")
+    expected = compute_from_raw(batch_size)
+    bump(HARVEST)
+    live.publish_reset()
+    HarvestRollup.objects.all().delete()
+    objs = [
+        HarvestRollup(period_type=pt, period=p, category_id=cid, category_name=cname, total_count=total)
+        for (pt, p, cid, cname), total in expected.items()
+    ]
+    HarvestRollup.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
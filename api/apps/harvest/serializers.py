@@ -1,10 +1,15 @@
+from typing import Any, Dict
 from rest_framework import serializers  # type: ignore
+from apps.common.ingest import optional_datetime, optional_str, require_int, require_str
+from apps.common.rows import RowSerializer
 from .models import HarvestRecord
 
 class HarvestRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = HarvestRecord
-        fields = ["id", "device_id", "category_id", "category_name", "count", "occurred_at"]
+        fields = ["id", "device_id", "category_id", "category_name", "count", "occurred_at", "event_id"]
+
+HARVEST_RECORD_ROWS = RowSerializer(HarvestRecordSerializer)
 
 class HarvestAddRequestSerializer(serializers.Serializer):
     """TBD in OpenAPI. Minimal practical payload."""
@@ -13,6 +18,18 @@ class HarvestAddRequestSerializer(serializers.Serializer):
     category_name = serializers.CharField(max_length=255, required=False, allow_null=True)
     count = serializers.IntegerField(min_value=0)
     occurred_at = serializers.DateTimeField(required=False)
+    event_id = serializers.CharField(max_length=64, required=False, allow_null=True)
+
+def validate_harvest_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fast-path equivalent of HarvestAddRequestSerializer for bulk ingestion."""
+    return {
+        "device_id": require_str(row, "device_id", 64),
+        "category_id": optional_str(row, "category_id", 32),
+        "category_name": optional_str(row, "category_name", 255),
+        "count": require_int(row, "count", min_value=0),
+        "occurred_at": optional_datetime(row, "occurred_at"),
+        "event_id": optional_str(row, "event_id", 64) or None,
+    }
 
 class HarvestOverridePatchRequestSerializer(serializers.Serializer):
     total_count = serializers.IntegerField(min_value=0)
@@ -1,86 +1,186 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple, Optional
-from collections import defaultdict
-from datetime import datetime, date
+from typing import Any, Dict, List, Optional, Tuple
 from django.db import transaction  # type: ignore
+from django.db.models import Sum  # type: ignore
 from django.utils import timezone  # type: ignore
 
-from .models import HarvestRecord, HarvestAggregateOverride, HarvestTarget
+from apps.common.cache import HARVEST, bump
+from apps.common.ingest import chunked, insert_ignoring_duplicates, insert_once
+from apps.common.periods import period_annotations, period_from_row, period_keys
 
-def _period_daily(dt: datetime) -> str:
-    return dt.date().isoformat()
-
-def _period_weekly(dt: datetime) -> str:
-    iso = dt.isocalendar()
-    return f"{iso.year}-W{iso.week:02d}"
-
-def _period_monthly(dt: datetime) -> str:
-    return f"{dt.year:04d}-{dt.month:02d}"
+from .models import HarvestRecord, HarvestAggregateOverride, HarvestTarget, HarvestRollup
+from . import live, rollups
 
 @transaction.atomic
-def add_record(data: Dict[str, Any]) -> HarvestRecord:
+def record_event(data: Dict[str, Any]) -> Tuple[HarvestRecord, bool]:
+    """Insert one record; a replayed (device_id, event_id) returns the stored row.
+
+    Returns (record, created). Rollups only move when the row is new.
+    """
     occurred_at = data.get("occurred_at") or timezone.now()
-    rec = HarvestRecord.objects.create(
-        device_id=data["device_id"],
-        category_id=data.get("category_id"),
-        category_name=data.get("category_name"),
-        count=data["count"],
-        occurred_at=occurred_at,
+    event_id = data.get("event_id") or None
+    rec, created = insert_once(
+        HarvestRecord(
+            device_id=data["device_id"],
+            category_id=data.get("category_id"),
+            category_name=data.get("category_name"),
+            count=data["count"],
+            occurred_at=occurred_at,
+            event_id=event_id,
+        ),
+        {"device_id": data["device_id"], "event_id": event_id} if event_id else None,
     )
-    return rec
+    if created:
+        rollups.apply_deltas(rollups.deltas_for([(occurred_at, rec.category_id, rec.category_name, rec.count)]))
+    return rec, created
+
+def add_record(data: Dict[str, Any]) -> HarvestRecord:
+    return record_event(data)[0]
+
+def add_records_bulk(rows: List[Dict[str, Any]], chunk_size: int) -> Tuple[int, int]:
+    """Insert validated rows with bulk_create, one transaction per chunk.
+
+    Rows replaying an existing (device_id, event_id) are skipped. Rollup deltas
+    are folded per chunk over the rows really inserted, so each bucket is
+    upserted once. Returns (created, duplicates).
+    """
+    now = timezone.now()
+    created = 0
+    for chunk in chunked(rows, chunk_size):
+        objs = [
+            HarvestRecord(
+                device_id=r["device_id"],
+                category_id=r.get("category_id"),
+                category_name=r.get("category_name"),
+                count=r["count"],
+                occurred_at=r.get("occurred_at") or now,
+                event_id=r.get("event_id"),
+            )
+            for r in chunk
+        ]
+        with transaction.atomic():
+            inserted = insert_ignoring_duplicates(HarvestRecord, objs, chunk_size)
+            rollups.apply_deltas(rollups.deltas_for(
+                (o.occurred_at, o.category_id, o.category_name, o.count) for o in objs if o.pk in inserted
+            ))
+        created += len(inserted)
+    return created, len(rows) - created
 
 def _aggregate_records(period_type: str, category_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """SUM(count) grouped by (period[, category]) computed by the database.
+
+    Period truncation happens in SQL (timezone-aware), so only one row per
+    bucket crosses the wire instead of every HarvestRecord.
+    """
     qs = HarvestRecord.objects.all()
     if category_id is not None:
         qs = qs.filter(category_id=category_id)
 
-    bucket: Dict[str, int] = defaultdict(int)
-    bucket_cat: Dict[Tuple[str, str, Optional[str]], int] = defaultdict(int)
-
-    for r in qs.iterator():
-        if period_type == "daily":
-            p = _period_daily(r.occurred_at)
-        elif period_type == "weekly":
-            p = _period_weekly(r.occurred_at)
-        else:
-            p = _period_monthly(r.occurred_at)
-
-        bucket[p] += int(r.count)
-        cid = r.category_id or ""
-        bucket_cat[(p, cid, r.category_name)] += int(r.count)
+    keys = period_keys(period_type)
+    group_by = keys if category_id is None else keys + ["category_id", "category_name"]
+    rows = (
+        qs.annotate(**period_annotations(period_type))
+        .values(*group_by)
+        .annotate(total_count=Sum("count"))
+        .order_by()
+    )
 
     if category_id is None:
-        items = [{"period": p, "total_count": c} for p, c in bucket.items()]
+        items = [{"period": period_from_row(period_type, r), "total_count": int(r["total_count"])} for r in rows]
         items.sort(key=lambda x: x["period"], reverse=True)
         return items
 
     # by category
     items = []
-    for (p, cid, cname), c in bucket_cat.items():
+    for r in rows:
         items.append({
-            "period": p,
-            "category_id": cid,
-            "category_name": cname,
-            "total_count": c,
+            "period": period_from_row(period_type, r),
+            "category_id": r["category_id"] or "",
+            "category_name": r["category_name"],
+            "total_count": int(r["total_count"]),
         })
     items.sort(key=lambda x: (x["period"], x["category_id"]), reverse=True)
     return items
 
-def list_aggregate(period_type: str) -> List[Dict[str, Any]]:
-    return _aggregate_records(period_type, category_id=None)
+def _rollups_in_range(period_type: str, period_from: Optional[str], period_to: Optional[str]):
+    # (period_type, period) is the leading edge of the rollup unique index, so this is a range scan
+    qs = HarvestRollup.objects.filter(period_type=period_type)
+    if period_from is not None:
+        qs = qs.filter(period__gte=period_from)
+    if period_to is not None:
+        qs = qs.filter(period__lte=period_to)
+    return qs
+
+def aggregate_queryset(period_type: str, period_from: Optional[str] = None, period_to: Optional[str] = None):
+    """Overall totals per period (newest first), read from precomputed rollups.
+
+    `period_from` / `period_to` are inclusive period strings; they compare
+    correctly as text because every period format is zero padded.
+    """
+    qs = _rollups_in_range(period_type, period_from, period_to)
+    return (
+        qs.values("period")
+        .annotate(total_count=Sum("total_count"))
+        .order_by("-period")
+    )
 
-def list_aggregate_by_category(period_type: str, category_id: str) -> List[Dict[str, Any]]:
-    # Use overrides if exist for the period/category
-    # Build raw then replace period matches
-    raw = _aggregate_records(period_type, category_id=category_id)
-    overrides = HarvestAggregateOverride.objects.filter(period_type=period_type, category_id=category_id)
+def category_aggregate_queryset(
+    period_type: str,
+    category_id: str,
+    period_from: Optional[str] = None,
+    period_to: Optional[str] = None,
+):
+    return (
+        _rollups_in_range(period_type, period_from, period_to).filter(category_id=category_id)
+        .order_by("-period", "category_name")
+        .values_list("period", "category_id", "category_name", "total_count")
+    )
+
+def _category_rows(rows) -> List[Dict[str, Any]]:
+    return [
+        {"period": p, "category_id": cid, "category_name": cname or None, "total_count": int(total)}
+        for p, cid, cname, total in rows
+    ]
+
+def _overrides_for(period_type: str, category_id: str, items: List[Dict[str, Any]]):
+    return HarvestAggregateOverride.objects.filter(
+        period_type=period_type,
+        category_id=category_id,
+        period__in={i["period"] for i in items},
+    )
+
+def _apply_overrides(items: List[Dict[str, Any]], overrides) -> List[Dict[str, Any]]:
     ov_map = {o.period: o for o in overrides}
-    for item in raw:
+    for item in items:
         ov = ov_map.get(item["period"])
         if ov:
             item["total_count"] = ov.total_count
             item["category_name"] = ov.category_name
-    return raw
+    return items
+
+def category_items(period_type: str, category_id: str, rows) -> List[Dict[str, Any]]:
+    """Format rollup rows and replace totals with overrides for the same period."""
+    items = _category_rows(rows)
+    if not items:
+        return items
+    return _apply_overrides(items, _overrides_for(period_type, category_id, items))
+
+async def acategory_items(period_type: str, category_id: str, rows) -> List[Dict[str, Any]]:
+    """`category_items` with the async ORM."""
+    items = _category_rows(rows)
+    if not items:
+        return items
+    return _apply_overrides(items, [o async for o in _overrides_for(period_type, category_id, items)])
+
+def aggregate_items(rows) -> List[Dict[str, Any]]:
+    # SUM(bigint) comes back as Decimal on PostgreSQL
+    return [{"period": r["period"], "total_count": int(r["total_count"])} for r in rows]
+
+def list_aggregate(period_type: str) -> List[Dict[str, Any]]:
+    return aggregate_items(aggregate_queryset(period_type))
+
+def list_aggregate_by_category(period_type: str, category_id: str) -> List[Dict[str, Any]]:
+    return category_items(period_type, category_id, category_aggregate_queryset(period_type, category_id))
 
 @transaction.atomic
 def patch_override(period_type: str, category_id: str, period: str, total_count: int) -> HarvestAggregateOverride:
@@ -90,6 +190,8 @@ def patch_override(period_type: str, category_id: str, period: str, total_count:
         category_id=category_id,
         defaults={"total_count": total_count},
     )
+    bump(HARVEST)
+    live.publish_override(period_type, period, category_id, total_count)
     return obj
 
 @transaction.atomic
@@ -98,6 +200,7 @@ def update_target(target_type: str, target_count: int) -> HarvestTarget:
         target_type=target_type,
         defaults={"target_count": target_count},
     )
+    live.publish_target(target_type, target_count)
     return obj
 
 def get_target(target_type: str) -> Optional[HarvestTarget]:
@@ -0,0 +1,39 @@
+"""/stream/harvest : live harvest totals for the dashboard as Server-Sent Events (ASGI only)."""
+from __future__ import annotations
+import asyncio
+from typing import AsyncIterator, Optional
+
+from django.conf import settings  # type: ignore
+
+from apps.common import sse
+
+from .live import live
+
+async def harvest_frames(max_seconds: Optional[float] = None) -> AsyncIterator[str]:
+    """The current snapshot right away, then each coalesced update until `max_seconds` elapse."""
+    await live.start()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (max_seconds if max_seconds is not None else settings.EVENTS_STREAM_MAX_SECONDS)
+    yield sse.retry(3000)
+    seen = live.version
+    yield sse.frame("totals", live.snapshot)
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        if await live.wait(seen, min(settings.EVENTS_KEEPALIVE_SECONDS, remaining)):
+            # a slow client skips intermediate versions: it only ever holds the latest snapshot
+            seen = live.version
+            yield sse.frame("totals", live.snapshot)
+        else:
+            yield sse.comment("keepalive")
+
+async def harvest_stream(request):
+    """/stream/harvest GET (一般≧, OpenAPI未記載)
+
+    当日/当週/当月の収穫量（全体・カテゴリ別）と目標達成率を push する。
+    """
+    denied = await sse.authorize(request, "user")
+    if denied is not None:
+        return denied
+    return sse.event_stream(harvest_frames())
@@ -1,4 +1,5 @@
 import pytest
+from datetime import datetime
 from django.utils import timezone
 from apps.harvest import services
 
@@ -8,3 +9,140 @@ def test_add_record_and_aggregate_daily():
     services.add_record({"device_id": "DEV001", "count": 10, "occurred_at": timezone.now()})
     items = services.list_aggregate("daily")
     assert items[0]["total_count"] == 10
+
+def test_aggregate_buckets_in_local_time():
+    # 2024-12-29 23:30 JST == 2024-12-29 14:30 UTC; 2024-12-30 00:30 JST == 2024-12-29 15:30 UTC
+    tz = timezone.get_current_timezone()
+    services.add_record({"device_id": "DEV001", "category_id": "C1", "count": 2,
+                         "occurred_at": datetime(2024, 12, 29, 23, 30, tzinfo=tz)})
+    services.add_record({"device_id": "DEV001", "category_id": "C1", "count": 5,
+                         "occurred_at": datetime(2024, 12, 30, 0, 30, tzinfo=tz)})
+    services.add_record({"device_id": "DEV001", "category_id": "C2", "count": 7,
+                         "occurred_at": datetime(2024, 12, 30, 9, 0, tzinfo=tz)})
+
+    daily = services.list_aggregate("daily")
+    assert daily == [
+        {"period": "2024-12-30", "total_count": 12},
+        {"period": "2024-12-29", "total_count": 2},
+    ]
+    # 2024-12-30 belongs to ISO week 2025-W01
+    weekly = services.list_aggregate("weekly")
+    assert weekly == [
+        {"period": "2025-W01", "total_count": 12},
+        {"period": "2024-W52", "total_count": 2},
+    ]
+    monthly = services.list_aggregate_by_category("monthly", "C1")
+    assert monthly == [{"period": "2024-12", "category_id": "C1", "category_name": None, "total_count": 7}]
+
+def test_category_aggregate_applies_override():
+    tz = timezone.get_current_timezone()
+    services.add_record({"device_id": "DEV001", "category_id": "C1", "category_name": "A", "count": 4,
+                         "occurred_at": datetime(2025, 3, 1, 8, 0, tzinfo=tz)})
+    services.patch_override("daily", "C1", "2025-03-01", 9)
+    items = services.list_aggregate_by_category("daily", "C1")
+    assert items[0]["total_count"] == 9
+
+def test_rollups_track_inserts_and_verify_rebuild():
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+    from apps.harvest import rollups
+    from apps.harvest.models import HarvestRecord, HarvestRollup
+
+    tz = timezone.get_current_timezone()
+    for cid, count in [("C1", 3), ("C1", 4), (None, 5)]:
+        services.add_record({"device_id": "DEV001", "category_id": cid, "count": count,
+                             "occurred_at": datetime(2025, 5, 1, 12, 0, tzinfo=tz)})
+    assert services.list_aggregate("monthly") == [{"period": "2025-05", "total_count": 12}]
+    assert services.list_aggregate("daily") == services._aggregate_records("daily")
+    assert rollups.verify() == []
+
+    # raw rows written behind the service layer are detected and repaired
+    HarvestRecord.objects.create(device_id="DEV001", category_id="C1", count=1,
+                                 occurred_at=datetime(2025, 5, 2, 12, 0, tzinfo=tz))
+    with pytest.raises(CommandError):
+        call_command("harvest_rollups", "verify")
+    call_command("harvest_rollups", "rebuild")
+    assert rollups.verify() == []
+    assert HarvestRollup.objects.filter(period_type="daily", period="2025-05-02").get().total_count == 1
+
+@pytest.mark.django_db(transaction=True)
+def test_rollup_migration_backfills_existing_records():
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+    from apps.harvest import rollups
+
+    tz = timezone.get_current_timezone()
+    executor = MigrationExecutor(connection)
+    latest = executor.loader.graph.leaf_nodes("harvest_api")
+    executor.migrate([("harvest_api", "0001_initial")])
+    try:
+        old_apps = MigrationExecutor(connection).loader.project_state(("harvest_api", "0001_initial")).apps
+        HarvestRecord = old_apps.get_model("harvest_api", "HarvestRecord")
+        for cid, count in [("C1", 3), ("C1", 4), (None, 5)]:
+            HarvestRecord.objects.create(device_id="DEV001", category_id=cid, count=count,
+                                         occurred_at=datetime(2024, 12, 31, 23, 30, tzinfo=tz))
+    finally:
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(latest)
+    assert rollups.verify() == []
+    assert services.list_aggregate("monthly") == [{"period": "2024-12", "total_count": 12}]
+
+def test_replayed_event_id_is_ignored():
+    from apps.harvest import rollups
+
+    tz = timezone.get_current_timezone()
+    data = {"device_id": "DEV001", "category_id": "C1", "count": 3, "event_id": "e-1",
+            "occurred_at": datetime(2025, 6, 1, 12, 0, tzinfo=tz)}
+    rec, created = services.record_event(data)
+    again, created_again = services.record_event(dict(data, count=99))
+    assert created and not created_again
+    assert again.pk == rec.pk and again.count == 3
+
+    # rows without event_id are never deduplicated
+    services.record_event(dict(data, event_id=None))
+    created_n, duplicates = services.add_records_bulk(
+        [dict(data, event_id="e-1"), dict(data, event_id="e-2"), dict(data, event_id="e-2")], 1000)
+    assert (created_n, duplicates) == (1, 2)
+    assert services.list_aggregate("daily") == [{"period": "2025-06-01", "total_count": 9}]
+    assert rollups.verify() == []
+
+def test_live_counters_follow_writes_with_coalesced_snapshots(settings, django_capture_on_commit_callbacks):
+    from asgiref.sync import async_to_sync, sync_to_async
+    from apps.harvest.live import live
+
+    settings.HARVEST_STREAM_MIN_INTERVAL_MS = 50
+    now = timezone.now()
+    services.add_record({"device_id": "DEV001", "category_id": "C1", "category_name": "A", "count": 4, "occurred_at": now})
+    services.add_record({"device_id": "DEV001", "category_id": "C1", "count": 1,
+                         "occurred_at": datetime(2020, 1, 1, tzinfo=timezone.get_current_timezone())})
+    services.update_target("daily", 20)
+
+    def write():
+        with django_capture_on_commit_callbacks(execute=True):
+            services.add_record({"device_id": "DEV001", "category_id": "C1", "count": 3, "occurred_at": now})
+            services.add_record({"device_id": "DEV001", "category_id": "C2", "category_name": "B", "count": 2, "occurred_at": now})
+            services.patch_override("daily", "C2", live.snapshot["daily"]["period"], 7)
+
+    async def run():
+        import asyncio
+        await live.start()
+        seeded, seen = live.snapshot, live.version
+        await sync_to_async(write)()
+        assert await live.wait(seen, 2.0)
+        await asyncio.sleep(0.2)
+        coalesced = live.version - seen
+        snapshot = live.snapshot
+        await live.stop()
+        return seeded, coalesced, snapshot
+
+    seeded, coalesced, snapshot = async_to_sync(run)()
+    assert seeded["daily"]["total_count"] == 4 and seeded["daily"]["progress"] == 0.2
+    assert seeded["monthly"]["categories"] == [{"category_id": "C1", "category_name": "A", "total_count": 4}]
+    assert coalesced == 1  # three writes, one frame
+    daily = snapshot["daily"]
+    assert daily["total_count"] == 9 and daily["target_count"] == 20 and daily["progress"] == 0.45
+    assert daily["categories"] == [
+        {"category_id": "C1", "category_name": "A", "total_count": 7},
+        {"category_id": "C2", "category_name": "B", "total_count": 7},  # override applied
+    ]
@@ -1,6 +1,7 @@
 from django.urls import path  # type: ignore
 from .views import (
     HarvestAmountAddView,
+    HarvestAmountBulkView,
     HarvestAmountDailyView,
     HarvestAmountWeeklyView,
     HarvestAmountMonthlyView,
@@ -11,9 +12,11 @@ from .views import (
     HarvestTargetWeeklyView,
     HarvestTargetMonthlyView,
 )
+from .streams import harvest_stream
 
 urlpatterns = [
     path("harvest/amount/add", HarvestAmountAddView.as_view(), name="harvest-amount-add"),
+    path("harvest/amount/bulk", HarvestAmountBulkView.as_view(), name="harvest-amount-bulk"),
     path("harvest/amount/daily", HarvestAmountDailyView.as_view(), name="harvest-amount-daily"),
     path("harvest/amount/weekly", HarvestAmountWeeklyView.as_view(), name="harvest-amount-weekly"),
     path("harvest/amount/monthly", HarvestAmountMonthlyView.as_view(), name="harvest-amount-monthly"),
@@ -23,4 +26,5 @@ urlpatterns = [
     path("harvest/target/daily", HarvestTargetDailyView.as_view(), name="harvest-target-daily"),
     path("harvest/target/weekly", HarvestTargetWeeklyView.as_view(), name="harvest-target-weekly"),
     path("harvest/target/monthly", HarvestTargetMonthlyView.as_view(), name="harvest-target-monthly"),
+    path("stream/harvest", harvest_stream, name="stream-harvest"),
 ]
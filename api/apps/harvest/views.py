@@ -1,19 +1,28 @@
-from datetime import datetime
+from django.conf import settings  # type: ignore
 from django.utils import timezone  # type: ignore
 from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
 from rest_framework.exceptions import ValidationError  # type: ignore
+from rest_framework.parsers import JSONParser  # type: ignore
 
+from apps.common.asyncviews import AsyncAPIView
+from apps.common.cache import HARVEST, cache_response
+from apps.common.ingest import bulk_rows, validate_rows
+from apps.common.parsers import NDJSONParser
 from apps.common.responses import success_envelope
-from apps.common.pagination import parse_page_params, paginate_list
+from apps.common.pagination import apaginate_queryset, parse_page_params
+from apps.common.params import parse_period_range
+from apps.common.periods import period_of
 from apps.common.permissions import RoleAdminOnly, RoleAtLeastUser
+from apps.devices import registry
 
 from .serializers import (
     HarvestAddRequestSerializer,
     HarvestRecordSerializer,
     HarvestOverridePatchRequestSerializer,
     HarvestTargetUpdateRequestSerializer,
+    validate_harvest_row,
 )
 from . import services
 
@@ -23,13 +32,7 @@ def _get_period_from_query(request, period_type: str) -> str:
     period = request.query_params.get("period")
     if period:
         return period
-    now = timezone.now()
-    if period_type == "daily":
-        return now.date().isoformat()
-    if period_type == "weekly":
-        iso = now.isocalendar()
-        return f"{iso.year}-W{iso.week:02d}"
-    return f"{now.year:04d}-{now.month:02d}"
+    return period_of(period_type, timezone.now())
 
 class HarvestAmountAddView(APIView):
     """POST /harvest/amount/add (権限CSV未記載)"""
@@ -41,44 +44,88 @@ class HarvestAmountAddView(APIView):
     def post(self, request):
         ser = HarvestAddRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        rec = services.add_record(ser.validated_data)
-        return Response(success_envelope(request, HarvestRecordSerializer(rec).data), status=status.HTTP_201_CREATED)
+        registry.ensure_device(request, ser.validated_data["device_id"])
+        rec, created = services.record_event(ser.validated_data)
+        # 再送（同一 device_id + event_id）は既存レコードを 200 で返す
+        code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(success_envelope(request, HarvestRecordSerializer(rec).data), status=code)
 
-class HarvestAmountDailyView(APIView):
+class HarvestAmountBulkView(APIView):
+    """POST /harvest/amount/bulk (OpenAPI未記載・暫定)
+
+    JSON配列 / {"records": [...]} / NDJSON を受理し、行単位のエラーを返す（バッチ全体は中断しない）。
+    """
+    from apps.devices.permissions import RoleDeviceOrAdmin
+    permission_classes = [RoleDeviceOrAdmin]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        rows = bulk_rows(request.data)
+        scoped = registry.scoped(validate_harvest_row, registry.known_devices(), registry.bound_device(request))
+        valid, errors = validate_rows(rows, scoped)
+        accepted, duplicates = services.add_records_bulk([r for _, r in valid], settings.INGEST_BULK_CHUNK_SIZE)
+        data = {"accepted": accepted, "duplicates": duplicates, "rejected": len(errors), "errors": errors}
+        return Response(success_envelope(request, data), status=status.HTTP_201_CREATED)
+
+class HarvestAmountDailyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
 
-    def get(self, request):
+    @cache_response(HARVEST, period_type="daily")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_aggregate("daily")
-        data = paginate_list(items, page, page_size)
+        period_from, period_to = parse_period_range(request.query_params, "daily")
+        data = await apaginate_queryset(
+            services.aggregate_queryset("daily", period_from, period_to),
+            page,
+            page_size,
+            map_page=services.aggregate_items,
+        )
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class HarvestAmountWeeklyView(APIView):
+class HarvestAmountWeeklyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
-    def get(self, request):
+    @cache_response(HARVEST, period_type="weekly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_aggregate("weekly")
-        data = paginate_list(items, page, page_size)
+        period_from, period_to = parse_period_range(request.query_params, "weekly")
+        data = await apaginate_queryset(
+            services.aggregate_queryset("weekly", period_from, period_to),
+            page,
+            page_size,
+            map_page=services.aggregate_items,
+        )
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class HarvestAmountMonthlyView(APIView):
+class HarvestAmountMonthlyView(AsyncAPIView):
     permission_classes = [RoleAtLeastUser]
-    def get(self, request):
+    @cache_response(HARVEST, period_type="monthly")
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_aggregate("monthly")
-        data = paginate_list(items, page, page_size)
+        period_from, period_to = parse_period_range(request.query_params, "monthly")
+        data = await apaginate_queryset(
+            services.aggregate_queryset("monthly", period_from, period_to),
+            page,
+            page_size,
+            map_page=services.aggregate_items,
+        )
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class HarvestAmountDailyCategoryView(APIView):
+class HarvestAmountDailyCategoryView(AsyncAPIView):
     def get_permissions(self):
         if self.request.method == "GET":
             return [RoleAtLeastUser()]
         return [RoleAdminOnly()]
 
-    def get(self, request, categoryId: str):
+    @cache_response(HARVEST, period_type="daily")
+    async def get(self, request, categoryId: str):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_aggregate_by_category("daily", categoryId)
-        data = paginate_list(items, page, page_size)
+        period_from, period_to = parse_period_range(request.query_params, "daily")
+        data = await apaginate_queryset(
+            services.category_aggregate_queryset("daily", categoryId, period_from, period_to),
+            page,
+            page_size,
+            map_page=lambda rows: services.acategory_items("daily", categoryId, rows),
+        )
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
     def patch(self, request, categoryId: str):
@@ -94,16 +141,22 @@ class HarvestAmountDailyCategoryView(APIView):
         }
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class HarvestAmountWeeklyCategoryView(APIView):
+class HarvestAmountWeeklyCategoryView(AsyncAPIView):
     def get_permissions(self):
         if self.request.method == "GET":
             return [RoleAtLeastUser()]
         return [RoleAdminOnly()]
 
-    def get(self, request, categoryId: str):
+    @cache_response(HARVEST, period_type="weekly")
+    async def get(self, request, categoryId: str):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_aggregate_by_category("weekly", categoryId)
-        data = paginate_list(items, page, page_size)
+        period_from, period_to = parse_period_range(request.query_params, "weekly")
+        data = await apaginate_queryset(
+            services.category_aggregate_queryset("weekly", categoryId, period_from, period_to),
+            page,
+            page_size,
+            map_page=lambda rows: services.acategory_items("weekly", categoryId, rows),
+        )
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
     def patch(self, request, categoryId: str):
@@ -119,16 +172,22 @@ class HarvestAmountWeeklyCategoryView(APIView):
         }
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
-class HarvestAmountMonthlyCategoryView(APIView):
+class HarvestAmountMonthlyCategoryView(AsyncAPIView):
     def get_permissions(self):
         if self.request.method == "GET":
             return [RoleAtLeastUser()]
         return [RoleAdminOnly()]
 
-    def get(self, request, categoryId: str):
+    @cache_response(HARVEST, period_type="monthly")
+    async def get(self, request, categoryId: str):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_aggregate_by_category("monthly", categoryId)
-        data = paginate_list(items, page, page_size)
+        period_from, period_to = parse_period_range(request.query_params, "monthly")
+        data = await apaginate_queryset(
+            services.category_aggregate_queryset("monthly", categoryId, period_from, period_to),
+            page,
+            page_size,
+            map_page=lambda rows: services.acategory_items("monthly", categoryId, rows),
+        )
         return Response(success_envelope(request, data), status=status.HTTP_200_OK)
 
     def patch(self, request, categoryId: str):
@@ -0,0 +1,6 @@
+from django.apps import AppConfig  # type: ignore
+
+class IngestConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.ingest"
+    label = "ingest_api"
@@ -0,0 +1,85 @@
+"""Size/time-window micro-batching with a bounded queue.
+
+Producers (the MQTT network thread) block in `put()` when the queue is full,
+which stops the client from reading the socket and pushes back on the broker
+instead of growing memory. The consumer loop flushes a batch when it reaches
+`max_batch` messages or when `max_wait` seconds have passed since its first
+message, whichever comes first.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+@dataclass
+class Message:
+    kind: str  # harvest | defects | battery | alarm
+    device_id: str
+    payload: Any
+    mid: int = 0
+    qos: int = 0
+    received_at: float = field(default_factory=time.monotonic)
+
+class MicroBatcher:
+    def __init__(
+        self,
+        flush: Callable[[List[Message]], None],
+        max_batch: int = 500,
+        max_wait: float = 1.0,
+        max_queue: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._flush = flush
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Message]" = queue.Queue(maxsize=max_queue)
+        self._clock = clock
+
+    def put(self, msg: Message, timeout: Optional[float] = None) -> None:
+        """Enqueue, blocking while the queue is full (backpressure)."""
+        self._queue.put(msg, timeout=timeout)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self, stop: threading.Event) -> List[Message]:
+        batch: List[Message] = []
+        deadline: Optional[float] = None
+        while len(batch) < self.max_batch and not stop.is_set():
+            if deadline is None:
+                timeout = 0.1  # poll so that `stop` is noticed while idle
+            else:
+                timeout = deadline - self._clock()
+                if timeout <= 0:
+                    break
+            try:
+                msg = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is None:
+                    return batch
+                continue
+            batch.append(msg)
+            if deadline is None:
+                deadline = self._clock() + self.max_wait
+        return batch
+
+    def run(self, stop: threading.Event) -> None:
+        """Consume until `stop` is set. The caller drains once producers are stopped."""
+        while not stop.is_set():
+            batch = self._collect(stop)
+            if batch:
+                self._flush(batch)
+
+    def drain(self) -> None:
+        while True:
+            batch: List[Message] = []
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
@@ -0,0 +1,97 @@
+"""Route micro-batches of device messages to the existing service layer."""
+from __future__ import annotations
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.http import Http404  # type: ignore
+
+from apps.common.ingest import RowError, validate_rows
+from apps.defects import services as defects_services
+from apps.defects.serializers import validate_defects_row
+from apps.devices import registry
+from apps.devices import services as devices_services
+from apps.devices.serializers import validate_alarm_row, validate_battery_row
+from apps.harvest import services as harvest_services
+from apps.harvest.serializers import validate_harvest_row
+
+from .batcher import Message
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("harvest", "defects", "battery", "alarm")
+
+def _rows(messages: List[Message]) -> List[Any]:
+    """Expand payloads (object or array of objects); the topic decides device_id."""
+    rows: List[Any] = []
+    for m in messages:
+        payload = m.payload if isinstance(m.payload, list) else [m.payload]
+        for row in payload:
+            rows.append(dict(row, device_id=m.device_id) if isinstance(row, dict) else row)
+    return rows
+
+def _log_rejected(kind: str, errors: List[Dict[str, Any]]) -> None:
+    if errors:
+        logger.warning("mqtt %s: dropped %d invalid rows (first: %s)", kind, len(errors), errors[0])
+
+def handle_harvest(messages: List[Message]) -> int:
+    valid, errors = validate_rows(_rows(messages), registry.scoped(validate_harvest_row, registry.known_devices()))
+    _log_rejected("harvest", errors)
+    created, _ = harvest_services.add_records_bulk([r for _, r in valid], settings.INGEST_BULK_CHUNK_SIZE)
+    return created
+
+def handle_defects(messages: List[Message]) -> int:
+    valid, errors = validate_rows(_rows(messages), registry.scoped(validate_defects_row, registry.known_devices()))
+    _log_rejected("defects", errors)
+    outcomes = defects_services.add_records_bulk([r for _, r in valid], settings.INGEST_BULK_CHUNK_SIZE)
+    return sum(1 for _, created in outcomes if created)
+
+def handle_battery(messages: List[Message]) -> int:
+    # only the newest reading per device matters: coalesce before writing
+    latest: Dict[str, Dict[str, Any]] = {}
+    for m in messages:
+        payload = m.payload[-1] if isinstance(m.payload, list) and m.payload else m.payload
+        try:
+            latest[m.device_id] = validate_battery_row(payload if isinstance(payload, dict) else {})
+        except RowError as e:
+            _log_rejected("battery", [{"field": e.field, "reason": e.reason}])
+    written = 0
+    for device_id, data in latest.items():
+        try:
+            devices_services.upsert_battery(device_id, data)
+            written += 1
+        except Http404:
+            logger.warning("mqtt battery: unknown device %s", device_id)
+    return written
+
+def handle_alarm(messages: List[Message]) -> int:
+    written = 0
+    for m in messages:
+        valid, errors = validate_rows(_rows([m]), validate_alarm_row)
+        _log_rejected("alarm", errors)
+        for _, data in valid:
+            try:
+                devices_services.create_alarm(m.device_id, data)
+                written += 1
+            except Http404:
+                logger.warning("mqtt alarm: unknown device %s", m.device_id)
+    return written
+
+HANDLERS: Dict[str, Callable[[List[Message]], int]] = {
+    "harvest": handle_harvest,
+    "defects": handle_defects,
+    "battery": handle_battery,
+    "alarm": handle_alarm,
+}
+
+def handle_batch(messages: List[Message]) -> Dict[str, int]:
+    """Write one micro-batch in one transaction; returns rows written per kind.
+
+    Errors propagate and nothing is kept, so the worker can retry or split the batch.
+    """
+    by_kind: Dict[str, List[Message]] = defaultdict(list)
+    for m in messages:
+        by_kind[m.kind].append(m)
+    with transaction.atomic():
+        return {kind: HANDLERS[kind](msgs) for kind, msgs in by_kind.items()}
@@ -0,0 +1,29 @@
+import logging
+import signal
+from django.conf import settings  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+
+from apps.ingest.worker import IngestWorker, build_paho_client
+
+class Command(BaseCommand):
+    """Long-running MQTT → DB ingestion worker (SIGINT/SIGTERM for graceful shutdown)."""
+    help = "Consume device telemetry from the MQTT broker and write it in micro-batches."
+
+    def handle(self, *args, **options):
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+        client = build_paho_client()
+        worker = IngestWorker.from_settings(client)
+
+        def _stop(signum, frame):
+            self.stdout.write(f"received signal {signum}, shutting down")
+            worker.stop()
+
+        signal.signal(signal.SIGINT, _stop)
+        signal.signal(signal.SIGTERM, _stop)
+
+        client.connect_async(settings.MQTT_HOST, settings.MQTT_PORT, keepalive=60)
+        self.stdout.write(f"mqtt ingest: {settings.MQTT_HOST}:{settings.MQTT_PORT} topics={worker.topics()}")
+        worker.run()
+        self.stdout.write("mqtt ingest stopped")
@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from django.db import OperationalError
+from django.utils import timezone
+
+from apps.devices import services as devices_services
+from apps.devices.models import Alarm, BatteryStatus
+from apps.harvest.models import HarvestRecord
+from apps.ingest.batcher import Message
+from apps.ingest.handlers import handle_batch
+from apps.ingest.worker import IngestWorker
+
+class FakeClient:
+    """In-process stand-in for paho.mqtt.client.Client."""
+
+    def __init__(self):
+        self.on_connect = None
+        self.on_message = None
+        self.subscribed = []
+        self.unsubscribed = []
+        self.acked = []
+        self.connected = False
+        self._mid = 0
+
+    def loop_start(self):
+        self.connected = True
+        self.on_connect(self, None, {}, 0, None)
+
+    def loop_stop(self):
+        pass
+
+    def subscribe(self, topics):
+        self.subscribed.extend(t for t, _ in topics)
+
+    def unsubscribe(self, topics):
+        self.unsubscribed.extend(topics)
+
+    def disconnect(self):
+        self.connected = False
+
+    def ack(self, mid, qos):
+        self.acked.append(mid)
+
+    def deliver(self, topic, payload, qos=1):
+        self._mid += 1
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.on_message(self, None, SimpleNamespace(topic=topic, payload=body, mid=self._mid, qos=qos))
+        return self._mid
+
+def _start(worker):
+    t = threading.Thread(target=worker.run, daemon=True)
+    t.start()
+    return t
+
+def test_worker_batches_by_size_and_acks_after_flush():
+    batches = []
+    client = FakeClient()
+    worker = IngestWorker(client, batch_size=3, batch_window=5.0, handle=lambda b: batches.append(b) or {})
+    t = _start(worker)
+    assert "workez/devices/+/harvest" in client.subscribed
+
+    mids = [client.deliver("workez/devices/D1/harvest", {"count": i}) for i in range(3)]
+    for _ in range(50):
+        if batches:
+            break
+        time.sleep(0.01)
+    assert len(batches) == 1 and [m.payload["count"] for m in batches[0]] == [0, 1, 2]
+    assert client.acked == mids
+
+    # partial batch is flushed on graceful shutdown
+    last = client.deliver("workez/devices/D2/defects", {"count": 9})
+    worker.stop()
+    t.join(timeout=5)
+    assert not t.is_alive()
+    assert batches[-1][0].device_id == "D2" and client.acked[-1] == last
+    assert client.unsubscribed and not client.connected
+
+def test_worker_flushes_on_time_window_and_drops_garbage():
+    batches = []
+    client = FakeClient()
+    worker = IngestWorker(client, batch_size=100, batch_window=0.05, handle=lambda b: batches.append(b) or {})
+    t = _start(worker)
+    bad1 = client.deliver("workez/devices/D1/harvest", b"{not json")
+    bad2 = client.deliver("other/topic", {"count": 1})
+    client.deliver("workez/devices/D1/battery", {"percent": 5, "is_charging": False})
+    time.sleep(0.3)
+    assert len(batches) == 1
+    assert bad1 in client.acked and bad2 in client.acked
+    worker.stop()
+    t.join(timeout=5)
+
+def test_worker_retries_failed_flush_without_acking():
+    attempts = []
+
+    def flaky(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 2:
+            raise OperationalError("db down")
+        return {}
+
+    client = FakeClient()
+    worker = IngestWorker(client, batch_size=1, batch_window=0.01, handle=flaky, retry_max_delay=0.01)
+    t = _start(worker)
+    mid = client.deliver("workez/devices/D1/harvest", {"count": 1})
+    for _ in range(100):
+        if len(attempts) >= 2:
+            break
+        time.sleep(0.01)
+    worker.stop()
+    t.join(timeout=5)
+    assert attempts == [1, 1] and client.acked == [mid]
+
+def test_worker_isolates_and_acks_a_message_that_cannot_be_written():
+    written = []
+
+    def handle(batch):
+        if any(m.payload.get("count") == "bad" for m in batch):
+            raise ValueError("cannot write")
+        written.extend(m.payload["count"] for m in batch)
+        return {}
+
+    client = FakeClient()
+    worker = IngestWorker(client, batch_size=4, batch_window=5.0, handle=handle, retry_max_delay=0.01)
+    t = _start(worker)
+    mids = [client.deliver("workez/devices/D1/harvest", {"count": c}) for c in (1, 2, "bad", 3)]
+    for _ in range(100):
+        if len(client.acked) == 4:
+            break
+        time.sleep(0.01)
+    worker.stop()
+    t.join(timeout=5)
+    # no retry loop: the good messages are written once, the bad one is dropped, all are acked
+    assert written == [1, 2, 3]
+    assert sorted(client.acked) == mids
+
+@pytest.mark.django_db
+def test_handle_batch_writes_through_services():
+    devices_services.create_device({"id": "D1", "name": "D1"})
+    now = timezone.now().isoformat()
+    written = handle_batch([
+        Message("harvest", "D1", [{"count": 2, "category_id": "C1", "occurred_at": now}, {"count": -1}]),
+        Message("harvest", "D1", {"count": 3}),
+        Message("battery", "D1", {"percent": 80, "is_charging": False}),
+        Message("battery", "D1", {"percent": 79, "is_charging": True}),
+        Message("alarm", "D1", {"type": "network_error", "message": "lost uplink"}),
+        Message("alarm", "UNKNOWN", {"type": "network_error", "message": "x"}),
+    ])
+    assert written == {"harvest": 2, "battery": 1, "alarm": 1}
+    assert HarvestRecord.objects.filter(device_id="D1").count() == 2
+    assert BatteryStatus.objects.get(device_id="D1").percent == 79
+    assert Alarm.objects.count() == 1
+
+@pytest.mark.django_db
+def test_handle_batch_keeps_nothing_when_a_kind_fails(monkeypatch):
+    from apps.ingest import handlers
+
+    def broken(messages):
+        raise ValueError("cannot write")
+
+    devices_services.create_device({"id": "D1", "name": "D1"})
+    monkeypatch.setitem(handlers.HANDLERS, "alarm", broken)
+    with pytest.raises(ValueError):
+        handle_batch([Message("harvest", "D1", {"count": 2}), Message("alarm", "D1", {"type": "network_error"})])
+    assert HarvestRecord.objects.count() == 0
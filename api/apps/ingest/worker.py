@@ -0,0 +1,159 @@
+"""MQTT ingestion worker.
+
+Subscribes to `{prefix}/{device_id}/{harvest|defects|battery|alarm}` and
+micro-batches messages into bulk writes through the service layer.
+
+Delivery is at-least-once: messages are acknowledged (QoS 1, manual ack) only
+after their batch is committed. If the database is unavailable the flush is
+retried with backoff; meanwhile un-acked messages hold the broker's in-flight
+window and the bounded queue blocks the network thread, so load is pushed back
+to the broker rather than buffered in memory. Any other error is a problem
+with the data, which a retry would not fix: the batch (written all or nothing
+by `handle_batch`) is split in halves until the offending message is alone,
+and that message is logged and acked. Send `event_id` with defects (and other)
+payloads so redelivered messages are not double counted.
+"""
+from __future__ import annotations
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from django.conf import settings  # type: ignore
+from django.db import InterfaceError, OperationalError, close_old_connections  # type: ignore
+
+from .batcher import Message, MicroBatcher
+from .handlers import KINDS, handle_batch
+
+logger = logging.getLogger(__name__)
+
+def build_paho_client():
+    import paho.mqtt.client as mqtt  # type: ignore
+
+    client = mqtt.Client(
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        client_id=settings.MQTT_CLIENT_ID,
+        clean_session=False,  # keep the session so un-acked messages are redelivered
+        manual_ack=True,
+    )
+    if settings.MQTT_USERNAME:
+        client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
+    client.reconnect_delay_set(min_delay=1, max_delay=30)
+    return client
+
+class IngestWorker:
+    def __init__(
+        self,
+        client,
+        prefix: str = "workez/devices",
+        qos: int = 1,
+        batch_size: int = 500,
+        batch_window: float = 1.0,
+        queue_max: int = 10000,
+        handle: Callable[[List[Message]], Dict[str, int]] = handle_batch,
+        retry_max_delay: float = 30.0,
+    ):
+        self.client = client
+        self.prefix = prefix.rstrip("/")
+        self.qos = qos
+        self.handle = handle
+        self.retry_max_delay = retry_max_delay
+        self.stop_event = threading.Event()
+        self.batcher = MicroBatcher(self._flush, max_batch=batch_size, max_wait=batch_window, max_queue=queue_max)
+        client.on_connect = self._on_connect
+        client.on_message = self._on_message
+
+    @classmethod
+    def from_settings(cls, client) -> "IngestWorker":
+        return cls(
+            client,
+            prefix=settings.MQTT_TOPIC_PREFIX,
+            qos=settings.MQTT_QOS,
+            batch_size=settings.MQTT_BATCH_SIZE,
+            batch_window=settings.MQTT_BATCH_WINDOW_MS / 1000.0,
+            queue_max=settings.MQTT_QUEUE_MAX,
+        )
+
+    def topics(self) -> List[str]:
+        return [f"{self.prefix}/+/{kind}" for kind in KINDS]
+
+    def parse_topic(self, topic: str) -> Optional[Tuple[str, str]]:
+        head, _, rest = topic.partition(self.prefix + "/")
+        if head or not rest:
+            return None
+        parts = rest.split("/")
+        if len(parts) != 2 or not parts[0] or parts[1] not in KINDS:
+            return None
+        return parts[0], parts[1]
+
+    # -- paho callbacks (network thread) ------------------------------------
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None) -> None:
+        # (re)subscribe on every connect; the session may have been dropped
+        client.subscribe([(t, self.qos) for t in self.topics()])
+
+    def _on_message(self, client, userdata, message) -> None:
+        parsed = self.parse_topic(message.topic)
+        payload: Any = None
+        if parsed is not None:
+            try:
+                payload = json.loads(message.payload)
+            except ValueError:
+                parsed = None
+        if parsed is None:
+            logger.warning("mqtt: dropping undecodable message on %s", message.topic)
+            self._ack(message.mid, message.qos)
+            return
+        device_id, kind = parsed
+        # blocks while the queue is full -> the client stops reading the socket
+        self.batcher.put(Message(kind=kind, device_id=device_id, payload=payload, mid=message.mid, qos=message.qos))
+
+    # -- consumer side ------------------------------------------------------
+    def _ack(self, mid: int, qos: int) -> None:
+        if qos > 0:
+            self.client.ack(mid, qos)
+
+    def _flush(self, batch: List[Message]) -> None:
+        delay = 0.5
+        while True:
+            try:
+                close_old_connections()
+                self.handle(batch)
+                break
+            except (OperationalError, InterfaceError):
+                logger.exception("mqtt: failed to write a batch of %d messages", len(batch))
+                if self.stop_event.is_set():
+                    # leave un-acked; the broker redelivers them to the next session
+                    return
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, self.retry_max_delay)
+            except Exception:
+                if len(batch) > 1:
+                    # isolate the offending message; each half acks what it wrote
+                    half = len(batch) // 2
+                    self._flush(batch[:half])
+                    self._flush(batch[half:])
+                    return
+                m = batch[0]
+                logger.exception("mqtt: dropping a %s message from %s that cannot be written: %r", m.kind, m.device_id, m.payload)
+                break
+        for m in batch:
+            self._ack(m.mid, m.qos)
+
+    def run(self) -> None:
+        self.client.loop_start()
+        try:
+            self.batcher.run(self.stop_event)
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop new deliveries, flush and ack what was received, then disconnect."""
+        self.client.unsubscribe(self.topics())
+        self.batcher.drain()
+        self.client.disconnect()
+        self.client.loop_stop()
+        # messages that raced the unsubscribe; their acks may not reach the broker
+        self.batcher.drain()
+        close_old_connections()
+
+    def stop(self) -> None:
+        self.stop_event.set()
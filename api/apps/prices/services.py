@@ -1,7 +1,11 @@
 from __future__ import annotations
 from typing import Any, Dict, List
 from django.db import transaction  # type: ignore
+from django.db.models.functions import ExtractMonth, ExtractYear  # type: ignore
 from django.http import Http404  # type: ignore
+
+from apps.common.cache import PRICES, bump
+from apps.common.periods import PERIOD_MONTHLY, PERIOD_YEARLY, period_of_date
 from .models import PriceRecord
 
 @transaction.atomic
@@ -13,6 +17,7 @@ def create_price(category_id: str, data: Dict[str, Any]) -> PriceRecord:
         effective_from=data["effective_from"],
         effective_to=data.get("effective_to"),
     )
+    bump(PRICES)
     return rec
 
 def _latest_record(category_id: str) -> PriceRecord:
@@ -28,36 +33,44 @@ def update_price(category_id: str, data: Dict[str, Any]) -> PriceRecord:
         if k in data:
             setattr(rec, k, data[k])
     rec.save()
+    bump(PRICES)
     return rec
 
 @transaction.atomic
 def delete_price(category_id: str) -> int:
     qs = PriceRecord.objects.filter(category_id=category_id)
     deleted, _ = qs.delete()
+    bump(PRICES)
     return deleted
 
-def list_monthly() -> List[Dict[str, Any]]:
-    items = []
-    for rec in PriceRecord.objects.all().iterator():
-        period = f"{rec.effective_from.year:04d}-{rec.effective_from.month:02d}"
-        items.append({
-            "period": period,
+def _period_queryset(period_type: str):
+    # Newest period first; within a period keep the -effective_from model ordering
+    annotations = {"p_year": ExtractYear("effective_from")}
+    order = ["-p_year"]
+    if period_type == PERIOD_MONTHLY:
+        annotations["p_month"] = ExtractMonth("effective_from")
+        order.append("-p_month")
+    return PriceRecord.objects.annotate(**annotations).order_by(*order, "-category_id", "-effective_from")
+
+def monthly_queryset():
+    return _period_queryset(PERIOD_MONTHLY)
+
+def yearly_queryset():
+    return _period_queryset(PERIOD_YEARLY)
+
+def period_items(period_type: str, records) -> List[Dict[str, Any]]:
+    return [
+        {
+            "period": period_of_date(period_type, rec.effective_from),
             "category_id": rec.category_id,
             "category_name": rec.category_name,
             "unit_price_yen": rec.unit_price_yen,
-        })
-    items.sort(key=lambda x: (x["period"], x["category_id"]), reverse=True)
-    return items
+        }
+        for rec in records
+    ]
+
+def list_monthly() -> List[Dict[str, Any]]:
+    return period_items(PERIOD_MONTHLY, monthly_queryset())
 
 def list_yearly() -> List[Dict[str, Any]]:
-    items = []
-    for rec in PriceRecord.objects.all().iterator():
-        period = f"{rec.effective_from.year:04d}"
-        items.append({
-            "period": period,
-            "category_id": rec.category_id,
-            "category_name": rec.category_name,
-            "unit_price_yen": rec.unit_price_yen,
-        })
-    items.sort(key=lambda x: (x["period"], x["category_id"]), reverse=True)
-    return items
+    return period_items(PERIOD_YEARLY, yearly_queryset())
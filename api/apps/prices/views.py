@@ -2,8 +2,10 @@ from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
 
+from apps.common.asyncviews import AsyncAPIView
+from apps.common.cache import PRICES, cache_response
 from apps.common.responses import success_envelope
-from apps.common.pagination import parse_page_params, paginate_list
+from apps.common.pagination import apaginate_queryset, parse_page_params
 from apps.common.permissions import RoleAdminOnly
 
 from .serializers import (
@@ -33,16 +35,28 @@ class PricesCategoryDetailView(APIView):
         services.delete_price(categoryId)
         return Response(success_envelope(request, {"deleted": True, "category_id": categoryId}), status=status.HTTP_200_OK)
 
-class PricesMonthlyView(APIView):
+class PricesMonthlyView(AsyncAPIView):
     permission_classes = [RoleAdminOnly]
-    def get(self, request):
+    @cache_response(PRICES)
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_monthly()
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
-
-class PricesYearlyView(APIView):
+        data = await apaginate_queryset(
+            services.monthly_queryset(),
+            page,
+            page_size,
+            map_page=lambda rows: services.period_items("monthly", rows),
+        )
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
+
+class PricesYearlyView(AsyncAPIView):
     permission_classes = [RoleAdminOnly]
-    def get(self, request):
+    @cache_response(PRICES)
+    async def get(self, request):
         page, page_size = parse_page_params(request.query_params)
-        items = services.list_yearly()
-        return Response(success_envelope(request, paginate_list(items, page, page_size)), status=status.HTTP_200_OK)
+        data = await apaginate_queryset(
+            services.yearly_queryset(),
+            page,
+            page_size,
+            map_page=lambda rows: services.period_items("yearly", rows),
+        )
+        return Response(success_envelope(request, data), status=status.HTTP_200_OK)
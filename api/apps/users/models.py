@@ -21,6 +21,9 @@ class User(models.Model):
     class Meta:
         db_table = "app_users"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="app_users_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.email} ({self.role})"
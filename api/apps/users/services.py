@@ -1,9 +1,14 @@
 from __future__ import annotations
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 from django.db import transaction  # type: ignore
+from django.db.models import Count, Max  # type: ignore
 from django.shortcuts import get_object_or_404  # type: ignore
+from apps.common.conditional import Validator
+from apps.common.pagination import paginate_keyset
 from .models import User
 
+USER_CURSOR_ORDERING = ("-created_at", "-id")
+
 @transaction.atomic
 def create_user(data: Dict[str, Any]) -> User:
     user = User.objects.create(
@@ -14,13 +19,24 @@ def create_user(data: Dict[str, Any]) -> User:
     )
     return user
 
+def users_queryset():
+    return User.objects.all().order_by(*USER_CURSOR_ORDERING)
+
 def list_users(page: int, page_size: int) -> Tuple[list[User], int]:
-    qs = User.objects.all().order_by("-created_at")
+    qs = users_queryset()
     total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
     return list(qs[start:end]), total
 
+def users_validator() -> Validator:
+    """ETag state for the user list: count catches deletions, max(updated_at) the rest."""
+    agg = User.objects.aggregate(n=Count("id"), last=Max("updated_at"))
+    return (agg["n"], agg["last"]), None
+
+def list_users_by_cursor(cursor: str, page_size: int) -> Tuple[list[User], Optional[str]]:
+    return paginate_keyset(User.objects.all(), USER_CURSOR_ORDERING, cursor, page_size)
+
 @transaction.atomic
 def partial_update_user(user_id: str, data: Dict[str, Any]) -> User:
     user = get_object_or_404(User, pk=user_id)
@@ -2,9 +2,11 @@ from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework import status  # type: ignore
 
+from apps.common.conditional import conditional_get
 from apps.common.responses import success_envelope
-from apps.common.pagination import parse_page_params
+from apps.common.pagination import cursor_body, parse_cursor_param, parse_page_params
 from apps.common.permissions import RoleAdminOnly, RoleAtLeastUser
+from apps.common.renderers import stream_ndjson, streams_ndjson
 
 from .serializers import (
     CreateUsersRequestSerializer,
@@ -23,8 +25,16 @@ class UsersListCreateView(APIView):
         # createUsers: 一般≧
         return [RoleAtLeastUser()]
 
+    @conditional_get(lambda request: services.users_validator())
     def get(self, request):
+        if streams_ndjson(request):
+            return stream_ndjson(request, services.users_queryset(), lambda rows: UserSerializer(rows, many=True).data)
         page, page_size = parse_page_params(request.query_params)
+        cursor = parse_cursor_param(request.query_params)
+        if cursor is not None:
+            items, next_cursor = services.list_users_by_cursor(cursor, page_size)
+            data = cursor_body(UserSerializer(items, many=True).data, page_size, next_cursor)
+            return Response(success_envelope(request, data), status=status.HTTP_200_OK)
         items, total = services.list_users(page, page_size)
         data = {
             "items": UserSerializer(items, many=True).data,
@@ -0,0 +1,43 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run against a throwaway test database (same engine as the
+configured `default` database) so they never touch development data.
+"""
+from __future__ import annotations
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+def setup() -> None:
+    sys.path.insert(0, str(API_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django  # type: ignore
+    django.setup()
+
+@contextmanager
+def test_database() -> Iterator[None]:
+    from django.db import connection  # type: ignore
+    from django.test.utils import setup_test_environment, teardown_test_environment  # type: ignore
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+def timed(fn, repeat: int = 3) -> float:
+    """Best-of-N wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
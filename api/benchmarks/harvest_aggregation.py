@@ -0,0 +1,117 @@
+"""Benchmark: DB-side harvest aggregation vs. the baseline per-row Python loop.
+
+    python benchmarks/harvest_aggregation.py --rows 10000 1000000 10000000
+
+Set DATABASE_URL to benchmark PostgreSQL; SQLite is used otherwise.
+"""
+from __future__ import annotations
+import argparse
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import _django
+
+# --- baseline (5c4957d, apps/harvest/services.py), copied verbatim ----------
+# It buckets `occurred_at` as the ORM returns it, i.e. in UTC; the current
+# engine buckets in TIME_ZONE, so results are compared with the time zone
+# overridden to UTC.
+
+def _period_daily(dt: datetime) -> str:
+    return dt.date().isoformat()
+
+def _period_weekly(dt: datetime) -> str:
+    iso = dt.isocalendar()
+    return f"{iso.year}-W{iso.week:02d}"
+
+def _period_monthly(dt: datetime) -> str:
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+def legacy_aggregate(period_type: str, category_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    from apps.harvest.models import HarvestRecord
+
+    qs = HarvestRecord.objects.all()
+    if category_id is not None:
+        qs = qs.filter(category_id=category_id)
+
+    bucket: Dict[str, int] = defaultdict(int)
+    bucket_cat: Dict[Tuple[str, str, Optional[str]], int] = defaultdict(int)
+
+    for r in qs.iterator():
+        if period_type == "daily":
+            p = _period_daily(r.occurred_at)
+        elif period_type == "weekly":
+            p = _period_weekly(r.occurred_at)
+        else:
+            p = _period_monthly(r.occurred_at)
+
+        bucket[p] += int(r.count)
+        cid = r.category_id or ""
+        bucket_cat[(p, cid, r.category_name)] += int(r.count)
+
+    if category_id is None:
+        items = [{"period": p, "total_count": c} for p, c in bucket.items()]
+        items.sort(key=lambda x: x["period"], reverse=True)
+        return items
+
+    # by category
+    items = []
+    for (p, cid, cname), c in bucket_cat.items():
+        items.append({
+            "period": p,
+            "category_id": cid,
+            "category_name": cname,
+            "total_count": c,
+        })
+    items.sort(key=lambda x: (x["period"], x["category_id"]), reverse=True)
+    return items
+
+# --- end of baseline ---------------------------------------------------------
+
+def populate(rows: int, chunk: int = 10_000) -> None:
+    from django.utils import timezone  # type: ignore
+    from apps.harvest.models import HarvestRecord
+
+    HarvestRecord.objects.all().delete()
+    rnd = random.Random(1)
+    start = timezone.now() - timedelta(days=3 * 365)
+    span = 3 * 365 * 24 * 3600
+    done = 0
+    while done < rows:
+        n = min(chunk, rows - done)
+        HarvestRecord.objects.bulk_create([
+            HarvestRecord(
+                device_id=f"DEV{rnd.randrange(50):03d}",
+                category_id=f"C{rnd.randrange(8)}",
+                category_name=None,
+                count=rnd.randrange(1, 20),
+                occurred_at=start + timedelta(seconds=rnd.randrange(span)),
+            )
+            for _ in range(n)
+        ], batch_size=chunk)
+        done += n
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _django.setup()
+    from django.utils import timezone  # type: ignore
+    from apps.harvest import services
+
+    with _django.test_database():
+        print(f"{'rows':>10} {'period':>8} {'legacy[s]':>10} {'db[s]':>10} {'speedup':>8}")
+        for rows in args.rows:
+            populate(rows)
+            for period_type in ("daily", "weekly", "monthly"):
+                with timezone.override(dt_timezone.utc):
+                    assert legacy_aggregate(period_type) == services._aggregate_records(period_type)
+                legacy = _django.timed(lambda: legacy_aggregate(period_type), args.repeat)
+                db = _django.timed(lambda: services._aggregate_records(period_type), args.repeat)
+                print(f"{rows:>10} {period_type:>8} {legacy:>10.3f} {db:>10.3f} {legacy / db:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
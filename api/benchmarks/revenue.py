@@ -0,0 +1,89 @@
+"""Benchmark: revenue via rollups + price-interval index vs. the legacy per-row scan.
+
+    python benchmarks/revenue.py --rows 100000 1000000 --prices 10 1000
+
+Set DATABASE_URL to benchmark PostgreSQL; SQLite is used otherwise.
+"""
+from __future__ import annotations
+import argparse
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import _django
+
+from harvest_aggregation import populate
+
+def legacy_revenue(period_len: int) -> List[Dict[str, Any]]:
+    """The pre-index implementation: linear price scan for every harvest row (local-day rule)."""
+    from django.utils import timezone  # type: ignore
+    from apps.harvest.models import HarvestRecord
+    from apps.prices.models import PriceRecord
+
+    table: Dict[str, list] = defaultdict(list)
+    for p in PriceRecord.objects.all().order_by("category_id", "effective_from"):
+        table[p.category_id].append(p)
+    bucket: Dict[str, int] = defaultdict(int)
+    for r in HarvestRecord.objects.all().iterator():
+        prices = table.get(r.category_id) if r.category_id else None
+        if not prices:
+            continue
+        d = timezone.localdate(r.occurred_at)
+        best = None
+        for p in prices:
+            if p.effective_from <= d and (p.effective_to is None or p.effective_to >= d):
+                best = p
+        if best is None:
+            continue
+        bucket[d.isoformat()[:period_len]] += int(r.count) * int(best.unit_price_yen)
+    items = [{"period": p, "revenue_yen": v} for p, v in bucket.items()]
+    items.sort(key=lambda x: x["period"], reverse=True)
+    return items
+
+def populate_prices(per_category: int) -> None:
+    from apps.prices.models import PriceRecord
+
+    PriceRecord.objects.all().delete()
+    rnd = random.Random(2)
+    start = date.today() - timedelta(days=4 * 365)
+    objs = []
+    for c in range(8):
+        offsets = sorted(rnd.sample(range(4 * 365), min(per_category, 4 * 365)))
+        for off in offsets:
+            bounded = rnd.random() < 0.5
+            objs.append(PriceRecord(
+                category_id=f"C{c}",
+                unit_price_yen=rnd.randrange(50, 500),
+                effective_from=start + timedelta(days=off),
+                effective_to=start + timedelta(days=off + rnd.randrange(1, 90)) if bounded else None,
+            ))
+    PriceRecord.objects.bulk_create(objs, batch_size=5000)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--prices", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _django.setup()
+    from apps.analytics import services
+    from apps.harvest import rollups
+
+    with _django.test_database():
+        print(f"{'rows':>10} {'prices':>7} {'period':>8} {'legacy[s]':>10} {'index[s]':>10} {'speedup':>8}")
+        for rows in args.rows:
+            populate(rows)
+            rollups.rebuild()
+            for per_category in args.prices:
+                populate_prices(per_category)
+                for name, period_len, fn in (("monthly", 7, services.list_revenue_monthly),
+                                             ("yearly", 4, services.list_revenue_yearly)):
+                    assert legacy_revenue(period_len) == fn()
+                    legacy = _django.timed(lambda: legacy_revenue(period_len), args.repeat)
+                    new = _django.timed(fn, args.repeat)
+                    print(f"{rows:>10} {per_category:>7} {name:>8} {legacy:>10.3f} {new:>10.3f} {legacy / new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark: list serialization cost per 1k rows, ModelSerializer + JSONRenderer vs. values() rows + FastJSONRenderer.
+
+    python benchmarks/serialization.py --rows 1000 10000 100000
+
+Each column times query + serialize + render of the whole list and reports
+milliseconds per 1,000 rows. Set DATABASE_URL to benchmark PostgreSQL;
+SQLite is used otherwise.
+"""
+from __future__ import annotations
+import argparse
+import random
+from datetime import timedelta
+
+import _django
+
+from harvest_aggregation import populate
+
+def populate_alarms(rows: int, chunk: int = 10_000) -> None:
+    from django.utils import timezone  # type: ignore
+    from apps.devices.models import Alarm, Device
+
+    Device.objects.all().delete()
+    Device.objects.bulk_create([Device(id=f"DEV{i:03d}", name=f"device {i}") for i in range(max(rows, 1))], batch_size=chunk)
+    rnd = random.Random(1)
+    now = timezone.now()
+    done = 0
+    while done < rows:
+        n = min(chunk, rows - done)
+        Alarm.objects.bulk_create([
+            Alarm(
+                device_id="DEV000",
+                type="sensor_failure",
+                message=f"alarm {done + i}",
+                occurred_at=now - timedelta(seconds=rnd.randrange(365 * 24 * 3600)),
+            )
+            for i in range(n)
+        ], batch_size=chunk)
+        done += n
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _django.setup()
+    from rest_framework.renderers import JSONRenderer  # type: ignore
+    from apps.common.renderers import FastJSONRenderer
+    from apps.devices.models import Alarm, Device
+    from apps.devices.serializers import ALARM_ITEM_ROWS, DEVICE_ROWS, AlarmItemSerializer, DeviceSerializer
+    from apps.harvest.models import HarvestRecord
+    from apps.harvest.serializers import HARVEST_RECORD_ROWS, HarvestRecordSerializer
+
+    cases = [
+        ("device", Device.objects.order_by("id"), DeviceSerializer, DEVICE_ROWS),
+        ("alarm", Alarm.objects.order_by("-occurred_at", "-alarm_id"), AlarmItemSerializer, ALARM_ITEM_ROWS),
+        ("harvest", HarvestRecord.objects.order_by("-occurred_at"), HarvestRecordSerializer, HARVEST_RECORD_ROWS),
+    ]
+    slow_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+
+    with _django.test_database():
+        print(f"{'rows':>10} {'model':>8} {'drf[ms/1k]':>11} {'rows[ms/1k]':>12} {'+orjson[ms/1k]':>15} {'speedup':>8}")
+        for rows in args.rows:
+            populate(rows)
+            populate_alarms(rows)
+            for name, qs, serializer_class, row_serializer in cases:
+                qs = qs.all()
+                assert row_serializer.many(row_serializer.values(qs)) == serializer_class(qs, many=True).data
+                drf = _django.timed(lambda: slow_renderer.render({"items": serializer_class(qs.all(), many=True).data}), args.repeat)
+                values = _django.timed(lambda: slow_renderer.render({"items": row_serializer.many(row_serializer.values(qs.all()))}), args.repeat)
+                fast = _django.timed(lambda: fast_renderer.render({"items": row_serializer.many(row_serializer.values(qs.all()))}), args.repeat)
+                per_1k = 1000 * 1000 / rows
+                print(f"{rows:>10} {name:>8} {drf * per_1k:>11.2f} {values * per_1k:>12.2f} {fast * per_1k:>15.2f} {drf / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     "apps.defects.apps.DefectsConfig",
     "apps.prices.apps.PricesConfig",
     "apps.analytics.apps.AnalyticsConfig",
+    "apps.ingest.apps.IngestConfig",
 ]
 
 MIDDLEWARE = [
@@ -79,6 +80,13 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # DRF base config: envelope & auth
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": (
+        # DRF's JSONRenderer output, encoded with orjson when installed (apps/common/renderers.py)
+        "apps.common.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        # opt-in with Accept: application/x-ndjson (apps/common/renderers.py)
+        "apps.common.renderers.NDJSONRenderer",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "apps.common.auth.ApiKeyAuthentication",
     ),
@@ -92,7 +100,59 @@ REST_FRAMEWORK = {
 ADMIN_API_KEY = env("ADMIN_API_KEY", default="")
 USER_API_KEY = env("USER_API_KEY", default="")
 DEVICE_API_KEY = env("DEVICE_API_KEY", default="")
+# Per-device keys (apps/devices/keys.py): in-process cache of resolved keys
+API_KEY_CACHE_SIZE = env.int("API_KEY_CACHE_SIZE", default=10000)
+API_KEY_CACHE_TTL = env.int("API_KEY_CACHE_TTL", default=60)
+# Known device ids for ingestion (apps/devices/registry.py); also reloaded on device create/delete
+DEVICE_REGISTRY_TTL = env.int("DEVICE_REGISTRY_TTL", default=300)
+
+# Fleet view: battery below this percent counts as low (/fleet/devices?low_battery=true)
+LOW_BATTERY_PERCENT = env.int("LOW_BATTERY_PERCENT", default=20)
 
 # Pagination defaults (OpenAPI parameters page/page_size)
 DEFAULT_PAGE_SIZE = env.int("DEFAULT_PAGE_SIZE", default=50)
 MAX_PAGE_SIZE = env.int("MAX_PAGE_SIZE", default=200)
+
+# Batch ingestion (/harvest/amount/bulk etc.)
+INGEST_BULK_CHUNK_SIZE = env.int("INGEST_BULK_CHUNK_SIZE", default=1000)
+INGEST_BULK_MAX_ROWS = env.int("INGEST_BULK_MAX_ROWS", default=50000)
+
+# Raw record export (/admin/export/*) and streamed NDJSON lists: rows per server-side cursor fetch / encoded chunk
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=5000)
+
+# Response cache for aggregate GETs (apps/common/cache.py)
+RESPONSE_CACHE_TTL = env.int("RESPONSE_CACHE_TTL", default=300)
+RESPONSE_CACHE_MAX_ENTRIES = env.int("RESPONSE_CACHE_MAX_ENTRIES", default=1000)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "workez",
+        "TIMEOUT": RESPONSE_CACHE_TTL,
+        "OPTIONS": {"MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES},
+    }
+}
+
+# Live updates over SSE (apps/common/events.py, served by the ASGI app)
+# local: same process only / postgres: LISTEN/NOTIFY across processes
+EVENTS_BACKEND = env("EVENTS_BACKEND", default="local")
+EVENTS_CHANNEL = env("EVENTS_CHANNEL", default="workez_events")
+EVENTS_CLIENT_BUFFER = env.int("EVENTS_CLIENT_BUFFER", default=100)
+EVENTS_KEEPALIVE_SECONDS = env.int("EVENTS_KEEPALIVE_SECONDS", default=15)
+# Django 4.2 does not notice client disconnects on streams; cap each connection (EventSource reconnects)
+EVENTS_STREAM_MAX_SECONDS = env.int("EVENTS_STREAM_MAX_SECONDS", default=300)
+# /stream/harvest (apps/harvest/live.py): at most one snapshot per interval; periodic reseed from rollups
+HARVEST_STREAM_MIN_INTERVAL_MS = env.int("HARVEST_STREAM_MIN_INTERVAL_MS", default=1000)
+HARVEST_STREAM_RESEED_SECONDS = env.int("HARVEST_STREAM_RESEED_SECONDS", default=300)
+HARVEST_STREAM_BUFFER = env.int("HARVEST_STREAM_BUFFER", default=1000)
+
+# MQTT ingestion worker (python manage.py mqtt_ingest)
+MQTT_HOST = env("MQTT_HOST", default="localhost")
+MQTT_PORT = env.int("MQTT_PORT", default=1883)
+MQTT_USERNAME = env("MQTT_USERNAME", default="")
+MQTT_PASSWORD = env("MQTT_PASSWORD", default="")
+MQTT_CLIENT_ID = env("MQTT_CLIENT_ID", default="workez-ingest")
+MQTT_TOPIC_PREFIX = env("MQTT_TOPIC_PREFIX", default="workez/devices")
+MQTT_QOS = env.int("MQTT_QOS", default=1)
+MQTT_BATCH_SIZE = env.int("MQTT_BATCH_SIZE", default=500)
+MQTT_BATCH_WINDOW_MS = env.int("MQTT_BATCH_WINDOW_MS", default=1000)
+MQTT_QUEUE_MAX = env.int("MQTT_QUEUE_MAX", default=10000)
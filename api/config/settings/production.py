@@ -13,5 +13,20 @@ DATABASES = {
     "default": db_env.db("DATABASE_URL"),
 }
 
+# Shared cache so data-version bumps reach every worker (and the ingest process).
+# Without REDIS_URL each process keeps its own locmem cache (stale up to RESPONSE_CACHE_TTL).
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env("REDIS_URL"),
+            "TIMEOUT": RESPONSE_CACHE_TTL,
+            "KEY_PREFIX": "workez",
+        }
+    }
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 SECURE_SSL_REDIRECT = env.bool("SECURE_SSL_REDIRECT", default=True)
+
+# Writes happen in gunicorn workers and the MQTT worker; the ASGI stream process listens via NOTIFY.
+EVENTS_BACKEND = env("EVENTS_BACKEND", default="postgres")
@@ -0,0 +1,19 @@
+"""gunicorn worker class for serving `config.asgi` (see gunicorn.conf.py)."""
+import os
+
+from uvicorn.workers import UvicornWorker  # type: ignore
+
+class AsgiWorker(UvicornWorker):
+    """uvicorn worker under gunicorn's process management.
+
+    Django does not implement the ASGI lifespan protocol, so it is switched off
+    instead of being probed on every start. ASGI_LIMIT_CONCURRENCY caps the
+    requests in flight per worker (503 beyond it): each one may hold a database
+    connection, so keep workers x limit below the server's max_connections.
+    Unset or empty means no limit.
+    """
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "lifespan": "off",
+        "limit_concurrency": int(os.getenv("ASGI_LIMIT_CONCURRENCY") or 0) or None,
+    }
@@ -0,0 +1,24 @@
+"""gunicorn settings (loaded automatically from the working directory).
+
+The API runs as two pools (see docker-compose.yml and deploy/nginx/nginx.conf):
+
+    gunicorn config.asgi:application                                  # GET/HEAD, uvicorn workers
+    GUNICORN_WORKER_CLASS=sync gunicorn config.wsgi:application       # everything else
+
+The async read endpoints (aggregates, battery, alarm status) wait on the
+database without holding an ASGI worker. Sync code under ASGI (ingestion,
+admin, DRF authentication) goes through `sync_to_async` and shares the worker
+process with those reads, so device writes would queue behind heavy
+aggregates; nginx sends every non-GET request to the sync WSGI pool instead.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "3"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "config.workers.AsgiWorker")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
@@ -9,6 +9,19 @@ def _set_api_keys(settings):  # noqa: D401
     settings.DEVICE_API_KEY = "device-test-key"
     return settings
 
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # response cache, data versions, resolved device keys and the device registry would outlive the per-test DB rollback
+    from django.core.cache import cache  # type: ignore
+    from apps.devices import keys, registry
+    cache.clear()
+    keys.clear_cache()
+    registry.clear()
+    yield
+    cache.clear()
+    keys.clear_cache()
+    registry.clear()
+
 @pytest.fixture
 def api_client():
     return APIClient()
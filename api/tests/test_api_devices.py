@@ -1,3 +1,4 @@
+from datetime import date
 import pytest
 
 pytestmark = pytest.mark.django_db
@@ -13,3 +14,239 @@ def test_create_device_and_battery_flow(admin_client, device_client, user_client
     # get battery by user
     resp3 = user_client.get("/devices/D1/battery")
     assert resp3.status_code == 200
+
+def test_status_endpoints_revalidate_with_etag_and_last_modified(user_client, django_assert_num_queries):
+    from apps.devices import services
+
+    services.create_device({"id": "D1", "name": "Device1"})
+    services.upsert_battery("D1", {"percent": 50, "is_charging": False})
+
+    resp = user_client.get("/devices/D1/battery")
+    etag, last_modified = resp["ETag"], resp["Last-Modified"]
+    # unchanged: one validator query, no payload read
+    with django_assert_num_queries(1):
+        assert user_client.get("/devices/D1/battery", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert user_client.get("/devices/D1/battery", HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    services.upsert_battery("D1", {"percent": 40, "is_charging": False})
+    resp = user_client.get("/devices/D1/battery", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and resp.json()["data"]["percent"] == 40
+
+    resp = user_client.get("/devices/D1/alerm")
+    etag = resp["ETag"]
+    assert user_client.get("/devices/D1/alerm", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    services.create_alarm("D1", {"type": "battery_low", "message": "low", "severity": "warning"})
+    resp = user_client.get("/devices/D1/alerm", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and resp.json()["data"]["has_active_alarm"] is True
+
+    # missing resources skip validation and keep their 404
+    assert user_client.get("/devices/NOPE/battery", HTTP_IF_NONE_MATCH="*").status_code == 404
+
+def test_per_device_keys_are_cached_and_revocable(admin_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from apps.devices import services
+
+    services.create_device({"id": "D1", "name": "Device1"})
+    resp = admin_client.post("/devices/D1/keys", {"label": "field unit"}, format="json")
+    assert resp.status_code == 201
+    issued = resp.json()["data"]
+    assert issued["key"].startswith("dk_") and issued["device_id"] == "D1"
+    assert "key" not in admin_client.get("/devices/D1/keys").json()["data"]["items"][0]
+
+    device = APIClient()
+    device.credentials(HTTP_X_API_KEY=issued["key"])
+    assert device.post("/devices/D1/battery", {"percent": 50, "is_charging": False}, format="json").status_code == 201
+    # key resolved from the in-process cache: no key lookup on later requests
+    with CaptureQueriesContext(connection) as ctx:
+        device.post("/devices/D1/battery", {"percent": 49, "is_charging": False}, format="json")
+    assert not [q for q in ctx.captured_queries if "device_api_keys" in q["sql"]]
+
+    assert admin_client.delete(f"/devices/D1/keys/{issued['id']}").status_code == 200
+    assert device.post("/devices/D1/battery", {"percent": 48, "is_charging": False}, format="json").status_code in (401, 403)
+
+def test_device_keys_are_bound_and_ingestion_checks_known_devices(admin_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from apps.devices import keys, services
+
+    for device_id in ("D1", "D2"):
+        services.create_device({"id": device_id, "name": device_id})
+    _, raw = keys.issue_key("D1")
+    device = APIClient()
+    device.credentials(HTTP_X_API_KEY=raw)
+
+    assert device.post("/devices/D1/battery", {"percent": 50, "is_charging": False}, format="json").status_code == 201
+    assert device.post("/devices/D2/battery", {"percent": 50, "is_charging": False}, format="json").status_code == 403
+    assert device.post("/harvest/amount/add", {"device_id": "D2", "count": 1}, format="json").status_code == 403
+
+    # existence check comes from the registry: no SELECT on devices
+    with CaptureQueriesContext(connection) as ctx:
+        assert device.post("/harvest/amount/add", {"device_id": "D1", "count": 1}, format="json").status_code == 201
+        assert device.post("/devices/D1/alerm", {"type": "battery_low", "message": "low"}, format="json").status_code == 201
+    assert not [q for q in ctx.captured_queries if 'FROM "devices"' in q["sql"]]
+
+    rows = [{"device_id": "D1", "count": 1}, {"device_id": "D2", "count": 1}]
+    data = device.post("/defects/amount/bulk", rows, format="json").json()["data"]
+    assert data["accepted"] == 1 and data["results"][1]["field"] == "device_id"
+
+    rows = [{"device_id": "D1", "count": 1}, {"device_id": "NOPE", "count": 1}]
+    data = admin_client.post("/harvest/amount/bulk", rows, format="json").json()["data"]
+    assert data["accepted"] == 1 and data["errors"] == [{"index": 1, "field": "device_id", "reason": "unknown device"}]
+
+    # devices created after the registry was loaded are picked up via the data version
+    services.create_device({"id": "D3", "name": "D3"})
+    assert admin_client.post("/harvest/amount/add", {"device_id": "D3", "count": 1}, format="json").status_code == 201
+
+def test_fleet_snapshot_with_filters(user_client, django_assert_num_queries):
+    from apps.devices import services
+
+    for i in range(4):
+        services.create_device({"id": f"D{i}", "name": f"dev{i}", "status": "maintenance" if i == 3 else "active"})
+    services.upsert_battery("D0", {"percent": 10, "is_charging": False})
+    services.upsert_battery("D1", {"percent": 80, "is_charging": True})
+    services.create_alarm("D1", {"type": "battery_low", "message": "a", "severity": "warning"})
+    services.create_alarm("D1", {"type": "network_error", "message": "b", "severity": "critical"})
+
+    with django_assert_num_queries(1):
+        resp = user_client.get("/fleet/devices")
+    items = resp.json()["data"]["items"]
+    assert [d["device_id"] for d in items] == ["D0", "D1", "D2", "D3"]
+    assert items[0]["battery"]["percent"] == 10 and items[2]["battery"] is None
+    assert items[1]["alarm"] == {**items[1]["alarm"], "has_active_alarm": True, "open_alarms": 2, "severity": "critical"}
+
+    def ids(query):
+        return [d["device_id"] for d in user_client.get(f"/fleet/devices?{query}").json()["data"]["items"]]
+    assert ids("low_battery=true") == ["D0"]
+    assert ids("has_active_alarm=true") == ["D1"]
+    assert ids("has_active_alarm=false&status=active") == ["D0", "D2"]
+    assert ids("status=maintenance") == ["D3"]
+    assert user_client.get("/fleet/devices?low_battery=maybe").status_code == 400
+
+    data = user_client.get("/fleet/devices?page=1&page_size=3").json()["data"]
+    assert data["total"] == 4 and len(data["items"]) == 3
+
+@pytest.mark.django_db(transaction=True)
+def test_read_endpoints_are_async_over_asgi():
+    import asyncio
+    from asgiref.sync import iscoroutinefunction
+    from django.test import AsyncClient
+    from apps.analytics.views import AnalyticsHarvestMonthlyView, AnalyticsRevenueMonthlyView, AnalyticsRevenueYealyView
+    from apps.devices import services
+    from apps.devices.views import DevicesAlermView, DevicesBatteryView
+    from apps.harvest.views import HarvestAmountDailyCategoryView, HarvestAmountDailyView
+    from apps.prices import services as prices
+    from apps.prices.views import PricesMonthlyView, PricesYearlyView
+
+    for view in (
+        DevicesBatteryView, DevicesAlermView, HarvestAmountDailyView, HarvestAmountDailyCategoryView,
+        AnalyticsHarvestMonthlyView, AnalyticsRevenueMonthlyView, AnalyticsRevenueYealyView,
+        PricesMonthlyView, PricesYearlyView,
+    ):
+        assert iscoroutinefunction(view.as_view())
+    services.create_device({"id": "D1", "name": "Device1"})
+    services.upsert_battery("D1", {"percent": 50, "is_charging": False})
+    prices.create_price("C1", {"category_name": "Tomato", "unit_price_yen": 120, "effective_from": date(2024, 5, 1)})
+    client = AsyncClient()
+    user = {"X-API-KEY": "user-test-key"}
+    admin = {"X-API-KEY": "admin-test-key"}
+    device = {"X-API-KEY": "device-test-key"}
+
+    async def run():
+        reads = await asyncio.gather(*(client.get(path, headers=user) for path in (
+            "/devices/D1/battery",
+            "/devices/D1/alerm",
+            "/harvest/amount/daily?last=7",
+            "/harvest/amount/daily/category/C1",
+            "/devices/NOPE/battery",
+            "/harvest/amount/daily?last=0",
+        )))
+        admin_reads = await asyncio.gather(*(client.get(path, headers=admin) for path in (
+            "/analytics/harvest/monthly",
+            "/analytics/revenue/monthly?last=3",
+            "/analytics/revenue/yealy?from=2024",
+            "/prices/monthly",
+            "/prices/yearly",
+        )))
+        etag = reads[0]["ETag"]
+        revalidated = await client.get("/devices/D1/battery", headers={**user, "If-None-Match": etag})
+        # sync handlers on the same views (ingestion) keep working
+        body = {"percent": 40, "is_charging": False}
+        write = await client.post("/devices/D1/battery", body, content_type="application/json", headers=device)
+        forbidden = await client.get("/harvest/amount/daily", headers=device)
+        return reads, admin_reads, revalidated, write, forbidden
+
+    reads, admin_reads, revalidated, write, forbidden = asyncio.run(run())
+    battery, alarm, daily, category, missing, bad = reads
+    assert battery.status_code == 200 and battery.json()["data"]["percent"] == 50
+    assert alarm.status_code == 200 and alarm.json()["data"]["has_active_alarm"] is False
+    assert daily.status_code == 200 and daily.json()["data"]["items"] == []
+    assert category.status_code == 200
+    assert missing.status_code == 404 and missing.json()["error"]["code"]
+    assert bad.status_code == 400
+    assert all(r.status_code == 200 for r in admin_reads)
+    monthly_prices, yearly_prices = (r.json()["data"]["items"] for r in admin_reads[3:])
+    assert monthly_prices == [{"period": "2024-05", "category_id": "C1", "category_name": "Tomato", "unit_price_yen": 120}]
+    assert yearly_prices[0]["period"] == "2024"
+    assert revalidated.status_code == 304
+    assert write.status_code == 201
+    assert forbidden.status_code == 403
+
+def test_device_stream_auth_and_filters(api_client, settings):
+    import asyncio
+    from apps.devices import services
+
+    services.create_device({"id": "D1", "name": "Device1"})
+    settings.EVENTS_STREAM_MAX_SECONDS = 0
+    assert api_client.get("/stream/devices").status_code == 401
+    api_client.credentials(HTTP_X_API_KEY="device-test-key")
+    assert api_client.get("/stream/devices").status_code == 403
+
+    api_client.credentials(HTTP_X_API_KEY="user-test-key")
+    bad = api_client.get("/stream/devices?device_id=D1,NOPE&types=alarm")
+    assert bad.status_code == 400
+    assert bad.json()["error"]["details"][0]["value"] == "NOPE"
+    assert api_client.get("/stream/devices?types=temperature").status_code == 400
+
+    resp = api_client.get("/stream/devices?device_id=D1&types=alarm,battery")
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "text/event-stream"
+    assert resp["Cache-Control"] == "no-cache"
+    assert resp.is_async
+
+    async def drain():
+        return [chunk async for chunk in resp.streaming_content]
+
+    assert asyncio.run(drain()) == [b"retry: 3000\n\n"]
+
+def test_lists_stream_ndjson_on_request(user_client, settings):
+    import json
+    from apps.devices import services
+
+    settings.EXPORT_CHUNK_SIZE = 2
+    services.create_device({"id": "D1", "name": "Device1"})
+    for i in range(5):
+        services.create_alarm("D1", {"type": "sensor_failure", "message": f"m{i}"})
+    ndjson = {"HTTP_ACCEPT": "application/x-ndjson", "HTTP_X_REQUEST_ID": "req-1"}
+
+    resp = user_client.get("/devices/D1/alerm/detail", **ndjson)
+    assert resp.status_code == 200 and resp["Content-Type"] == "application/x-ndjson"
+    chunks = list(resp.streaming_content)
+    assert len(chunks) == 4  # 2 + 2 + 1 rows, then the trailer
+    lines = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [line["message"] for line in lines[:5]] == ["m4", "m3", "m2", "m1", "m0"]
+    assert lines[5] == {"meta": {"request_id": "req-1", "total": 5}}
+
+    # with paging parameters: one page, rendered from the regular envelope
+    resp = user_client.get("/devices/D1/alerm/detail?page=2&page_size=2", **ndjson)
+    lines = [json.loads(line) for line in resp.content.splitlines()]
+    assert [line["message"] for line in lines[:2]] == ["m2", "m1"]
+    assert lines[2] == {"meta": {"request_id": "req-1", "page": 2, "page_size": 2, "total": 5}}
+
+    # aggregates and errors use the same renderer
+    resp = user_client.get("/harvest/amount/daily", **ndjson)
+    assert resp.content.splitlines() == [b'{"meta":{"request_id":"req-1","page":1,"page_size":50,"total":0}}']
+    resp = user_client.get("/devices/NOPE/alerm/detail", **ndjson)
+    assert resp.status_code == 404 and len(resp.content.splitlines()) == 1
@@ -3,6 +3,9 @@ import pytest
 pytestmark = pytest.mark.django_db
 
 def test_harvest_add_and_daily(device_client, user_client, admin_client):
+    from apps.devices import services as devices_services
+    devices_services.create_device({"id": "D1", "name": "Device1"})
+
     # prepare price (admin) - CSV: POST /prices/category/{categoryId}
     admin_client.post("/prices/category/C1", {"unit_price_yen": 100, "effective_from": "2025-01-01"}, format="json")
 
@@ -13,3 +16,270 @@ def test_harvest_add_and_daily(device_client, user_client, admin_client):
     # daily list (user)
     resp2 = user_client.get("/harvest/amount/daily?page=1&page_size=10")
     assert resp2.status_code == 200
+
+def test_harvest_daily_paginates_in_database(user_client, django_assert_max_num_queries):
+    from datetime import datetime, timedelta
+    from django.utils import timezone
+    from apps.harvest import services
+
+    base = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.get_current_timezone())
+    for i in range(5):
+        services.add_record({"device_id": "D1", "category_id": "C1", "count": i + 1, "occurred_at": base + timedelta(days=i)})
+
+    resp = user_client.get("/harvest/amount/daily?page=2&page_size=2")
+    data = resp.json()["data"]
+    assert data["total"] == 5
+    assert data["items"] == [
+        {"period": "2025-06-03", "total_count": 3},
+        {"period": "2025-06-02", "total_count": 2},
+    ]
+
+    # last page: total is known from the page itself, no COUNT query
+    with django_assert_max_num_queries(1):
+        resp = user_client.get("/harvest/amount/daily?page=3&page_size=2")
+    assert resp.json()["data"]["total"] == 5
+
+    resp = user_client.get("/harvest/amount/daily/category/C1?page=1&page_size=1")
+    assert resp.json()["data"]["items"] == [
+        {"period": "2025-06-05", "category_id": "C1", "category_name": None, "total_count": 5},
+    ]
+
+def test_harvest_bulk_json_and_ndjson(device_client):
+    from apps.devices import services as devices_services
+    from apps.harvest.models import HarvestRecord
+    from apps.harvest.rollups import verify
+
+    for device_id in ("D1", "D2"):
+        devices_services.create_device({"id": device_id, "name": device_id})
+
+    rows = [
+        {"device_id": "D1", "category_id": "C1", "count": 2, "occurred_at": "2025-06-01T09:00:00+09:00"},
+        {"device_id": "D1", "count": -1},
+        {"device_id": "D1", "category_id": "C1", "count": 3, "occurred_at": "2025-06-01T10:00:00+09:00"},
+        "garbage",
+    ]
+    resp = device_client.post("/harvest/amount/bulk", rows, format="json")
+    assert resp.status_code == 201
+    data = resp.json()["data"]
+    assert data["accepted"] == 2 and data["rejected"] == 2
+    assert [(e["index"], e["field"]) for e in data["errors"]] == [(1, "count"), (3, "non_field")]
+
+    body = '{"device_id": "D2", "count": 4}\n{not json}\n\n{"device_id": "D2", "count": 1, "occurred_at": "2025-06-02T08:00:00"}\n'
+    resp = device_client.post("/harvest/amount/bulk", body, content_type="application/x-ndjson")
+    assert resp.status_code == 201
+    data = resp.json()["data"]
+    assert data["accepted"] == 2 and data["errors"][0]["index"] == 1
+
+    assert HarvestRecord.objects.count() == 4
+    assert verify() == []
+
+def test_harvest_bulk_rejects_malformed_numbers_and_dates(device_client):
+    from apps.devices import services as devices_services
+    from apps.harvest.models import HarvestRecord
+
+    devices_services.create_device({"id": "D1", "name": "D1"})
+    rows = [
+        {"device_id": "D1", "count": "--5"},
+        {"device_id": "D1", "count": "\u00b2"},
+        {"device_id": "D1", "count": 1, "occurred_at": "2025-13-45T00:00:00"},
+        {"device_id": "D1", "count": 2 ** 31},
+        {"device_id": "D1", "count": "9" * 5000},
+        {"device_id": "D1", "count": 1, "occurred_at": "0001-01-01T00:00:00+09:00"},
+        {"device_id": "D1", "count": str(2 ** 31 - 1)},
+    ]
+    resp = device_client.post("/harvest/amount/bulk", rows, format="json")
+    assert resp.status_code == 201
+    data = resp.json()["data"]
+    assert data["accepted"] == 1 and data["rejected"] == 6
+    assert [(e["index"], e["field"]) for e in data["errors"]] == [
+        (0, "count"), (1, "count"), (2, "occurred_at"), (3, "count"), (4, "count"), (5, "occurred_at"),
+    ]
+    assert HarvestRecord.objects.get().count == 2 ** 31 - 1
+
+def test_aggregate_responses_are_cached_and_revalidated(user_client, django_assert_num_queries):
+    from datetime import datetime
+    from django.utils import timezone
+    from apps.harvest import services
+
+    at = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.get_current_timezone())
+    services.add_record({"device_id": "D1", "category_id": "C1", "count": 2, "occurred_at": at})
+    resp = user_client.get("/harvest/amount/daily")
+    etag = resp["ETag"]
+    assert resp.status_code == 200 and etag.startswith('W/"')
+
+    # served from cache: no DB access for the payload nor for revalidation
+    with django_assert_num_queries(0):
+        assert user_client.get("/harvest/amount/daily").json()["data"] == resp.json()["data"]
+        assert user_client.get("/harvest/amount/daily", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert user_client.get("/harvest/amount/daily?page_size=5")["ETag"] != etag
+
+    services.add_record({"device_id": "D1", "category_id": "C1", "count": 3, "occurred_at": at})
+    resp = user_client.get("/harvest/amount/daily", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and resp["ETag"] != etag
+    assert resp.json()["data"]["items"] == [{"period": "2025-06-01", "total_count": 5}]
+
+    services.patch_override("daily", "C1", "2025-06-01", 9)
+    resp = user_client.get("/harvest/amount/daily/category/C1")
+    assert resp.json()["data"]["items"][0]["total_count"] == 9
+
+def test_aggregate_endpoints_accept_period_ranges(user_client, admin_client):
+    from datetime import datetime
+    from django.utils import timezone
+    from apps.common.periods import period_of
+    from apps.defects import services as defects_services
+    from apps.harvest import services
+
+    tz = timezone.get_current_timezone()
+    for month in (1, 2, 3, 4):
+        at = datetime(2025, month, 10, 12, 0, tzinfo=tz)
+        services.add_record({"device_id": "D1", "category_id": "C1", "count": month, "occurred_at": at})
+        defects_services.add_record({"device_id": "D1", "count": month, "occurred_at": at})
+    now = timezone.now()
+    services.add_record({"device_id": "D1", "category_id": "C1", "count": 7, "occurred_at": now})
+
+    def periods(url, client=user_client):
+        resp = client.get(url)
+        assert resp.status_code == 200, resp.content
+        return [i["period"] for i in resp.json()["data"]["items"]]
+
+    assert periods("/harvest/amount/monthly?from=2025-02&to=2025-03") == ["2025-03", "2025-02"]
+    # a date selects the period containing it
+    assert periods("/harvest/amount/weekly?from=2025-03-01&to=2025-04-30") == ["2025-W15", "2025-W11"]
+    assert periods("/harvest/amount/daily/category/C1?to=2025-02-10") == ["2025-02-10", "2025-01-10"]
+    assert periods("/defects/amount/monthly?from=2025-03") == ["2025-04", "2025-03"]
+    assert periods("/harvest/amount/monthly?last=2") == [period_of("monthly", now)]
+    assert periods("/harvest/amount/monthly?last=2&to=2025-04") == ["2025-04", "2025-03"]
+    assert periods("/defects/ratio/monthly?last=1&to=2025-02") == ["2025-02"]
+    assert periods("/analytics/revenue/yealy?to=2024", admin_client) == []
+
+    for query, field in [("from=2025-13", "from"), ("last=0", "last"), ("last=2&from=2025-01", "last"), ("from=2025-04&to=2025-01", "from"),
+                         ("to=9999-12", "to"), ("to=9999-12-31", "to"), ("from=0001-01", "from"), ("last=1000&to=1900-05", "last")]:
+        resp = user_client.get(f"/harvest/amount/monthly?{query}")
+        assert resp.status_code == 400, query
+        assert resp.json()["error"]["details"][0]["field"] == field
+    for url in ("/harvest/amount/daily?last=1000&to=1901-01-01", "/harvest/amount/weekly?to=9999-W52", "/defects/ratio/monthly?to=9999-12"):
+        assert user_client.get(url).status_code == 400, url
+    assert user_client.get("/harvest/amount/daily?to=9998-12-31").status_code == 200
+
+def test_relative_ranges_are_cached_per_resolved_period(user_client, monkeypatch):
+    from datetime import datetime
+    from django.utils import timezone
+    from apps.harvest import services
+
+    tz = timezone.get_current_timezone()
+    for day in (1, 2):
+        services.add_record({"device_id": "D1", "count": day, "occurred_at": datetime(2025, 6, day, 12, 0, tzinfo=tz)})
+    monkeypatch.setattr(timezone, "now", lambda: datetime(2025, 6, 1, 18, 0, tzinfo=tz))
+    resp = user_client.get("/harvest/amount/daily?last=1")
+    etag = resp["ETag"]
+    assert [i["period"] for i in resp.json()["data"]["items"]] == ["2025-06-01"]
+
+    # the next day `last=1` is another range: neither the cached body nor the ETag still applies
+    monkeypatch.setattr(timezone, "now", lambda: datetime(2025, 6, 2, 18, 0, tzinfo=tz))
+    resp = user_client.get("/harvest/amount/daily?last=1", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and resp["ETag"] != etag
+    assert [i["period"] for i in resp.json()["data"]["items"]] == ["2025-06-02"]
+
+def test_admin_export_streams_csv_in_chunks(admin_client, settings):
+    import csv
+    import io
+    from datetime import datetime, timedelta
+    from django.utils import timezone
+    from apps.common import export
+    from apps.harvest import services
+
+    settings.EXPORT_CHUNK_SIZE = 2
+    base = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.get_current_timezone())
+    for i in range(5):
+        services.add_record({"device_id": "D1", "category_id": "C1" if i % 2 else "C2", "count": i + 1,
+                             "occurred_at": base + timedelta(days=i)})
+
+    resp = admin_client.get("/admin/export/harvest?from=2025-03-02&to=2025-03-05", HTTP_ACCEPT="text/csv")
+    assert resp.status_code == 200
+    assert resp["Content-Type"].startswith("text/csv")
+    assert resp["Content-Disposition"].startswith('attachment; filename="harvest-')
+    chunks = list(resp.streaming_content)
+    assert len(chunks) == 2  # header + 2 rows, then the last 2 rows
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [r["count"] for r in rows] == ["2", "3", "4", "5"]
+    assert rows[0]["occurred_at"] == "2025-03-02T09:00:00+09:00" and rows[0]["event_id"] == ""
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(
+        admin_client.get("/admin/export/harvest?category_id=C1").streaming_content).decode())))
+    assert [r["count"] for r in rows] == ["2", "4"]
+
+    assert admin_client.get("/admin/export/defects?category_id=C1").status_code == 400
+    assert admin_client.get("/admin/export/nothing").status_code == 404
+    assert admin_client.get("/admin/export/alarms?to=yesterday").status_code == 400
+    parquet = admin_client.get("/admin/export/harvest?output=parquet")
+    assert parquet.status_code == (200 if export.pa is not None else 400)
+
+@pytest.mark.django_db(transaction=True)
+def test_exports_stream_chunk_by_chunk_over_asgi(settings, monkeypatch):
+    import asyncio
+    import csv
+    import io
+    import json
+    from django.core.handlers.asgi import ASGIHandler
+    from apps.admin import services as admin_services
+    from apps.common import renderers
+    from apps.devices import services as device_services
+    from apps.harvest import services
+
+    settings.EXPORT_CHUNK_SIZE = 2
+    for i in range(5):
+        services.add_record({"device_id": "D1", "category_id": "C1", "count": i + 1})
+    device_services.create_device({"id": "D1", "name": "Device1"})
+    for i in range(5):
+        device_services.create_alarm("D1", {"type": "sensor_failure", "message": f"m{i}"})
+
+    # "read" when a chunk is produced, "sent" when the handler writes a body message
+    events = []
+    export_batches, dumps = admin_services.export_batches, renderers.dumps
+
+    def logged_batches(*args, **kwargs):
+        for batch in export_batches(*args, **kwargs):
+            events.append("read")
+            yield batch
+
+    def logged_dumps(obj):
+        events.append("read")
+        return dumps(obj)
+
+    monkeypatch.setattr(admin_services, "export_batches", logged_batches)
+    monkeypatch.setattr(renderers, "dumps", logged_dumps)
+
+    async def get(path, key, accept):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"x-api-key", key.encode()), (b"accept", accept.encode())],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message.get("body"):
+                events.append("sent")
+            messages.append(message)
+
+        await ASGIHandler()(scope, receive, send)
+        return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+    status, body = asyncio.run(get("/admin/export/harvest", "admin-test-key", "text/csv"))
+    assert status == 200
+    assert [r["count"] for r in csv.DictReader(io.StringIO(body.decode()))] == ["1", "2", "3", "4", "5"]
+    # the first chunk went out before the last one was read, not after draining the export
+    assert events.index("sent") < len(events) - 1 - events[::-1].index("read")
+
+    events.clear()
+    status, body = asyncio.run(get("/devices/D1/alerm/detail", "user-test-key", "application/x-ndjson"))
+    assert status == 200
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [line["message"] for line in lines[:5]] == ["m4", "m3", "m2", "m1", "m0"]
+    assert lines[5]["meta"]["total"] == 5
+    assert events.index("sent") < len(events) - 1 - events[::-1].index("read")
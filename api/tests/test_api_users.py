@@ -13,3 +13,34 @@ def test_create_user_and_list(admin_client, user_client):
     body = resp2.json()
     assert body["status"] == "success"
     assert "items" in body["data"]
+
+def test_list_users_cursor_mode(admin_client):
+    for i in range(3):
+        admin_client.post("/users", {"email": f"c{i}@example.com", "name": f"C{i}"}, format="json")
+
+    resp = admin_client.get("/users?cursor=&page_size=2")
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert "total" not in data and len(data["items"]) == 2
+    assert data["next_cursor"]
+
+    resp2 = admin_client.get(f"/users?cursor={data['next_cursor']}&page_size=2")
+    data2 = resp2.json()["data"]
+    assert len(data2["items"]) == 1 and data2["next_cursor"] is None
+    emails = {u["email"] for u in data["items"] + data2["items"]}
+    assert emails == {"c0@example.com", "c1@example.com", "c2@example.com"}
+
+    assert admin_client.get("/users?cursor=%%%").status_code == 400
+
+def test_list_users_etag_tracks_changes(admin_client):
+    from apps.users import services
+
+    user = services.create_user({"email": "e@example.com", "name": "E"})
+    etag = admin_client.get("/users")["ETag"]
+    assert admin_client.get("/users", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    # different page -> different representation
+    assert admin_client.get("/users?page_size=1", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    services.delete_user(str(user.id))
+    resp = admin_client.get("/users", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200 and resp.json()["data"]["items"] == []
@@ -0,0 +1,14 @@
+import importlib
+import sys
+
+import pytest
+
+def test_asgi_worker_accepts_empty_concurrency_limit(monkeypatch):
+    pytest.importorskip("uvicorn")
+    sys.modules.pop("config.workers", None)
+    monkeypatch.setenv("ASGI_LIMIT_CONCURRENCY", "")  # as shipped in .env.example / generate_env.sh
+    workers = importlib.import_module("config.workers")
+    assert workers.AsgiWorker.CONFIG_KWARGS["limit_concurrency"] is None
+
+    monkeypatch.setenv("ASGI_LIMIT_CONCURRENCY", "50")
+    assert importlib.reload(workers).AsgiWorker.CONFIG_KWARGS["limit_concurrency"] == 50
@@ -0,0 +1,61 @@
+"""EXPLAIN-based checks that each hot service-layer query is served by an index.
+
+Runs on SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN). On PostgreSQL
+sequential scans are disabled for the test transaction so the planner's choice
+does not depend on the size of the (empty) test tables.
+"""
+from datetime import date, timedelta
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from apps.defects.models import DefectsRecord
+from apps.devices.models import Alarm, Device
+from apps.harvest.models import HarvestRecord, HarvestRollup
+from apps.prices.models import PriceRecord
+from apps.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+INDEX_MARKERS = ("USING INDEX", "USING COVERING INDEX", "INDEX SCAN", "INDEX ONLY SCAN", "BITMAP INDEX SCAN")
+
+def assert_index_scan(qs, *index_names):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+    plan = qs.explain()
+    assert any(m in plan.upper() for m in INDEX_MARKERS), plan
+    if index_names:
+        assert any(name in plan for name in index_names), plan
+
+def test_harvest_by_category_newest_first():
+    assert_index_scan(HarvestRecord.objects.filter(category_id="C1").order_by("-occurred_at")[:50], "harvest_cat_occurred_idx")
+
+def test_harvest_occurred_at_range():
+    since = timezone.now() - timedelta(days=30)
+    assert_index_scan(HarvestRecord.objects.filter(occurred_at__gte=since), "harvest_occurred_idx")
+
+def test_harvest_rollups_by_category():
+    qs = HarvestRollup.objects.filter(period_type="daily", category_id="C1").order_by("-period")
+    assert_index_scan(qs, "harvest_rollup_cat_idx")
+
+def test_open_alarms_for_device():
+    device = Device.objects.create(id="D1", name="D1")
+    qs = device.alarms.filter(status=Alarm.STATUS_OPEN).order_by("-occurred_at")[:20]
+    assert_index_scan(qs, "alarm_open_dev_idx", "alarm_dev_status_idx")
+
+def test_alarm_history_for_device():
+    device = Device.objects.create(id="D1", name="D1")
+    assert_index_scan(device.alarms.order_by("-occurred_at", "-alarm_id")[:50], "alarm_dev_occurred_idx")
+
+def test_defects_occurred_at_range():
+    since = timezone.now() - timedelta(days=30)
+    assert_index_scan(DefectsRecord.objects.filter(occurred_at__gte=since), "defects_occurred_idx")
+
+def test_latest_price_for_category():
+    # served by the (category_id, effective_from) unique index
+    qs = PriceRecord.objects.filter(category_id="C1", effective_from__lte=date(2025, 1, 1)).order_by("-effective_from")[:1]
+    assert_index_scan(qs)
+
+def test_users_newest_first():
+    assert_index_scan(User.objects.order_by("-created_at", "-id")[:50], "app_users_created_idx")
@@ -0,0 +1,160 @@
+"""Load test: device write latency while heavy aggregate reads run concurrently.
+
+Runs against a live server. Reader threads request aggregate endpoints with a
+unique query parameter each time, so the response cache never answers them.
+Writer threads post harvest events and battery updates the way devices do.
+The script prints latency percentiles for both. Run it against PostgreSQL and
+compare deployments with the same settings, e.g.
+
+    GUNICORN_WORKER_CLASS=sync gunicorn config.wsgi:application --bind :8000   # one WSGI pool
+    gunicorn config.asgi:application --bind :8001                              # ASGI reads
+    BASE_URL=http://127.0.0.1:8000 python tools/load_test.py --seed-rows 200000
+    BASE_URL=http://127.0.0.1:8001 WRITE_BASE_URL=http://127.0.0.1:8000 python tools/load_test.py
+
+WRITE_BASE_URL (default BASE_URL) sends the writes to another pool, as nginx
+does in docker-compose. ADMIN_API_KEY (setup), USER_API_KEY (reads) and
+DEVICE_API_KEY (writes) are read from the environment.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+READ_PATHS = [
+    "/harvest/amount/daily?last=1000",
+    "/harvest/amount/weekly?last=200",
+    "/harvest/amount/monthly/category/C1?last=60",
+    "/defects/amount/weekly?last=200",
+    "/defects/ratio/monthly?last=60",
+]
+DEVICES = [f"LOAD{i:03d}" for i in range(10)]
+
+def request(base_url: str, method: str, path: str, key: str, body: Optional[object] = None) -> int:
+    data = None if body is None else json.dumps(body).encode()
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    req.add_header("X-API-KEY", key)
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def setup(base_url: str, admin_key: str, seed_rows: int) -> None:
+    for device_id in DEVICES:
+        # 400 when the device already exists
+        request(base_url, "POST", "/devices", admin_key, {"id": device_id, "name": device_id})
+    rnd = random.Random(1)
+    now = datetime.now(timezone.utc)
+    done = 0
+    while done < seed_rows:
+        n = min(5000, seed_rows - done)
+        rows = [
+            {
+                "device_id": rnd.choice(DEVICES),
+                "category_id": f"C{rnd.randrange(8)}",
+                "count": rnd.randrange(1, 20),
+                "occurred_at": (now - timedelta(seconds=rnd.randrange(3 * 365 * 24 * 3600))).isoformat(),
+            }
+            for _ in range(n)
+        ]
+        status = request(base_url, "POST", "/harvest/amount/bulk", admin_key, rows)
+        if status >= 400:
+            sys.exit(f"seeding failed: HTTP {status}")
+        request(base_url, "POST", "/defects/amount/bulk", admin_key, [{**r, "count": 1} for r in rows[: n // 10]])
+        done += n
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def add(self, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.errors += 1
+
+    def summary(self, name: str, duration: float) -> str:
+        lat = sorted(self.latencies)
+        if len(lat) < 2:
+            return f"{name:>7} n={len(lat)}"
+        q = statistics.quantiles(lat, n=100)
+        ms = lambda s: f"{s * 1000:8.1f}"  # noqa: E731
+        return (
+            f"{name:>7} n={len(lat):>6} rps={len(lat) / duration:7.1f}"
+            f" p50={ms(q[49])} p95={ms(q[94])} p99={ms(q[98])} max={ms(lat[-1])} [ms] errors={self.errors}"
+        )
+
+def reader(base_url: str, key: str, stop: threading.Event, rec: Recorder, seq: List[int]) -> None:
+    while not stop.is_set():
+        with rec.lock:
+            seq[0] += 1
+            n = seq[0]
+        path = READ_PATHS[n % len(READ_PATHS)]
+        t0 = time.perf_counter()
+        status = request(base_url, "GET", f"{path}{'&' if '?' in path else '?'}_n={n}", key)
+        rec.add(time.perf_counter() - t0, status == 200)
+
+def writer(base_url: str, key: str, stop: threading.Event, rec: Recorder, rnd: random.Random) -> None:
+    while not stop.is_set():
+        device_id = rnd.choice(DEVICES)
+        if rnd.random() < 0.5:
+            path, body = "/harvest/amount/add", {"device_id": device_id, "category_id": f"C{rnd.randrange(8)}", "count": 1}
+        else:
+            path, body = f"/devices/{device_id}/battery", {"percent": rnd.randrange(101), "is_charging": False}
+        t0 = time.perf_counter()
+        status = request(base_url, "POST", path, key, body)
+        rec.add(time.perf_counter() - t0, status in (200, 201))
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--seed-rows", type=int, default=0, help="harvest rows to upload before measuring")
+    args = parser.parse_args()
+
+    base_url = os.getenv("BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+    write_url = os.getenv("WRITE_BASE_URL", base_url).rstrip("/")
+    keys: Dict[str, str] = {k: os.getenv(f"{k.upper()}_API_KEY", "") for k in ("admin", "user", "device")}
+    missing = [f"{k.upper()}_API_KEY" for k, v in keys.items() if not v]
+    if missing:
+        print(f"missing: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    setup(write_url, keys["admin"], args.seed_rows)
+    stop = threading.Event()
+    reads, writes = Recorder(), Recorder()
+    seq = [0]
+    threads = [threading.Thread(target=reader, args=(base_url, keys["user"], stop, reads, seq)) for _ in range(args.readers)]
+    threads += [
+        threading.Thread(target=writer, args=(write_url, keys["device"], stop, writes, random.Random(i)))
+        for i in range(args.writers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"reads {base_url}, writes {write_url}: {args.readers} readers, {args.writers} writers, {args.duration:.0f}s")
+    print(writes.summary("writes", args.duration))
+    print(reads.summary("reads", args.duration))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -67,9 +67,10 @@ DJANGO_SECRET_KEY=${secret_key}
 DJANGO_DEBUG=${debug}
 DJANGO_ALLOWED_HOSTS=${allowed_hosts}
 
-# ---- Gunicorn (used in compose command) ----
+# ---- Gunicorn (api/gunicorn.conf.py, uvicorn workers) ----
 GUNICORN_WORKERS=3
 GUNICORN_TIMEOUT=60
+ASGI_LIMIT_CONCURRENCY=
 EOF
 
   chmod 600 "$path" || true